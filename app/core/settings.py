@@ -16,6 +16,13 @@ class Settings(BaseModel):
     # Umbral y top-k
     tau_low: float = float(os.getenv("TAU_LOW", "0.4"))
     top_k: int = int(os.getenv("TOP_K", "20"))
+    classify_batch_max: int = int(os.getenv("CLASSIFY_BATCH_MAX", "256"))  # queries por batch
+    # Ejecuta denso / BM25 / clasificador en paralelo dentro de cada request
+    classify_parallel: bool = os.getenv("CLASSIFY_PARALLEL", "0") == "1"
+    classify_stage_workers: int = int(os.getenv("CLASSIFY_STAGE_WORKERS", "8"))
+    # Caché LRU+TTL de resultados de /classify (0 = desactivada)
+    classify_cache_size: int = int(os.getenv("CLASSIFY_CACHE_SIZE", "4096"))
+    classify_cache_ttl_s: float = float(os.getenv("CLASSIFY_CACHE_TTL_S", "300"))
 
     # Rutas de artefactos
     models_dir: str = os.getenv("MODELS_DIR", "models")
@@ -30,11 +37,32 @@ class Settings(BaseModel):
     embeddings_model: str = os.getenv(
         "EMBEDDINGS_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
     )
+    embeddings_batch_size: int = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "256"))
+    # Caché en disco de embeddings por (modelo, sha256 del texto); solo backend st
+    embeddings_cache: bool = os.getenv("EMBEDDINGS_CACHE", "1") == "1"
+    embeddings_cache_dir: str = os.getenv("EMBEDDINGS_CACHE_DIR", "")  # vacío = <DATA_DIR>/cache
+    # Índice denso: brute (numpy) | flat | hnsw | ivf (faiss, construido por build_embeddings)
+    dense_index_backend: str = os.getenv("DENSE_INDEX_BACKEND", "brute")
+    dense_hnsw_ef_search: int = int(os.getenv("DENSE_HNSW_EF_SEARCH", "64"))
+    dense_ivf_nprobe: int = int(os.getenv("DENSE_IVF_NPROBE", "8"))
+    # Almacenamiento del backend brute: float32 | float16 | int8 (escala por fila)
+    dense_index_dtype: str = os.getenv("DENSE_INDEX_DTYPE", "float32")
+    # Abre class_embeddings_{lang}.norm.npy / tabla de ids en modo mmap si existen
+    dense_index_mmap: bool = os.getenv("DENSE_INDEX_MMAP", "1") == "1"
+    # Índice BM25 persistido (clave: sha de taxonomy.json + versión del tokenizador)
+    bm25_cache: bool = os.getenv("BM25_CACHE", "1") == "1"
+    bm25_cache_dir: str = os.getenv("BM25_CACHE_DIR", "")  # vacío = <dir taxonomía>/cache
+    # Override de pesos BM25F por campo ("prefLabel:3,altLabel:1.5"); no requiere reconstruir
+    bm25_field_weights: str = os.getenv("BM25_FIELD_WEIGHTS", "")
 
     # Classifier training defaults (used by retrain script fallback)
     clf_max_iter: int = int(os.getenv("CLF_MAX_ITER", "300"))
     clf_calibration: str = os.getenv("CLF_CALIBRATION", "none")  # none|platt|isotonic
     clf_cv_folds: int = int(os.getenv("CLF_CV_FOLDS", "3"))
+    # Puntúa solo las clases candidatas (denso + BM25) leyendo coef_/intercept_ del modelo
+    clf_candidate_scoring: bool = os.getenv("CLF_CANDIDATE_SCORING", "0") == "1"
+    # Inferencia lineal compilada (vocabulario + coef_) sin transform/predict_proba de sklearn
+    clf_compiled: bool = os.getenv("CLF_COMPILED", "1") == "1"
 
     # Observability / limits
     enable_metrics: bool = os.getenv("ENABLE_METRICS", "1") == "1"
@@ -52,8 +80,21 @@ class Settings(BaseModel):
     taxo_w_context: float = float(os.getenv("TAXO_W_CONTEXT", "5"))  # definition/scope/note/example
     taxo_w_vec: float = float(os.getenv("TAXO_W_VEC", "0"))  # peso de similitud vectorial (0 = off)
     taxo_top_k: int = int(os.getenv("TAXO_TOP_K", "25"))
-    taxo_w_fuzzy: float = float(os.getenv("TAXO_W_FUZZY", "0"))  # peso adicional fuzzy ratio
+    taxo_w_fuzzy: float = float(os.getenv("TAXO_W_FUZZY", "10"))  # peso adicional fuzzy ratio
     taxo_fuzzy_min_ratio: float = float(os.getenv("TAXO_FUZZY_MIN_RATIO", "70"))  # umbral mínimo 0-100
+    # Fallback fuzzy: fracción mínima de bigramas de la query en el prefLabel (0 = sin filtro)
+    taxo_fuzzy_min_overlap: float = float(os.getenv("TAXO_FUZZY_MIN_OVERLAP", "0.2"))
+    # Hilos de rapidfuzz.process.cdist (-1 = todos los cores)
+    taxo_fuzzy_workers: int = int(os.getenv("TAXO_FUZZY_WORKERS", "1"))
+    # Autocomplete: priorizar conceptos con más feedback (<carpeta de taxonomy.json>/feedback)
+    taxo_ac_popularity: bool = os.getenv("TAXO_AC_POPULARITY", "1") == "1"
+    # Autocomplete: completar con coincidencias al inicio de cualquier palabra de la etiqueta
+    taxo_ac_infix: bool = os.getenv("TAXO_AC_INFIX", "1") == "1"
+    # Sesiones de autocomplete (cursor): máximo en memoria (0 = desactivadas) y caducidad
+    taxo_ac_sessions: int = int(os.getenv("TAXO_AC_SESSIONS", "2000"))
+    taxo_ac_session_ttl_s: float = float(os.getenv("TAXO_AC_SESSION_TTL_S", "300"))
+    # Índice de trigramas para los candidatos de search (0 = recorrer todas las claves)
+    taxo_ngram_index: bool = os.getenv("TAXO_NGRAM_INDEX", "1") == "1"
 
     # Feature & infra toggles
     enable_docs: bool = os.getenv("FASTAPI_ENABLE_DOCS", "1") == "1"
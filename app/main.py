@@ -11,6 +11,7 @@ from app.core.settings import settings
 from app.routers import taxonomy, feedback, classify, admin, ready
 from app.services.taxonomy_store import TaxonomyStore
 from app.services import classifier as _clf, retrieval as _retrieval, retrieval_bm25 as _bm25
+from app.services import model_registry as _model_registry
 from app import observability
 
 # Metrics (Prometheus) optional
@@ -89,7 +90,10 @@ class ObservabilityMiddleware(BaseHTTPMiddleware):  # pragma: no cover (integrat
         if settings.max_query_chars > 0 and request.method == "POST":
             # naive size check for body length (already in memory)
             body_bytes = await request.body()
-            if len(body_bytes) > settings.max_query_chars * 4:  # approximate safety margin
+            max_bytes = settings.max_query_chars * 4  # approximate safety margin
+            if request.url.path == "/classify/batch":
+                max_bytes *= max(1, settings.classify_batch_max)
+            if len(body_bytes) > max_bytes:
                 return PlainTextResponse("payload too large", status_code=413)
         # Identify client (basic): IP or fallback to 'global'
         client_ip = request.client.host if request.client else "global"
@@ -155,8 +159,11 @@ def metrics():  # pragma: no cover
 def enriched_health():  # lightweight aggregation
     # Gather basic model / artifact info (best-effort)
     artifacts = []
-    for f in ["tfidf.joblib", "lr_calibrated.joblib", "lr.joblib", "classes.joblib"]:
-        path = os.path.join(settings.models_dir, f)
+    model_dir = str(_model_registry.resolve(settings.models_dir))
+    for f in [
+        "tfidf.joblib", "lr_calibrated.joblib", "lr.joblib", "calibration.joblib", "classes.joblib"
+    ]:
+        path = os.path.join(model_dir, f)
         if os.path.exists(path):
             artifacts.append(f)
     # embeddings dim (try loading small header via numpy memmap if needed)
@@ -172,7 +179,7 @@ def enriched_health():  # lightweight aggregation
             except Exception:  # pragma: no cover
                 pass
     classes_count = None
-    cls_file = os.path.join(settings.models_dir, "classes.joblib")
+    cls_file = os.path.join(model_dir, "classes.joblib")
     if os.path.exists(cls_file):
         try:
             cls_ids = joblib.load(cls_file)
@@ -187,6 +194,7 @@ def enriched_health():  # lightweight aggregation
         "python_version": __import__("platform").python_version(),
         "artifacts": artifacts,
         "classes": classes_count,
+        "model_version": _model_registry.current_version(settings.models_dir),
         "embeddings_dim": embeddings_dim,
     }
 
@@ -205,17 +213,15 @@ def _startup_preload():  # pragma: no cover (integration)
         store.load()
         from app.routers.ready import mark_ready
         mark_ready(taxonomy=True)
-        # Preload classifier artifacts and retrieval indices for default language
-        default_lang = settings.default_lang
-        # Dense retrieval indices
-        try:
-            _retrieval.load_index(
-                f"{settings.data_dir}/class_embeddings_{default_lang}.npy",
-                f"{settings.data_dir}/class_ids.npy",
-            )
-            mark_ready(classifier=True)  # classifier loaded below but retrieval index ok
-        except Exception:
-            pass
+        # Preload classifier artifacts and retrieval indices for every supported language
+        from app.routers.ready import mark_lang_ready
+        # Dense retrieval indices (registro por idioma: todos quedan residentes)
+        for lang in settings.supported_langs:
+            try:
+                _retrieval.load_lang(lang)
+                mark_lang_ready(lang, dense=True)
+            except Exception:
+                pass
         # Classifier
         try:
             _clf.load(settings.models_dir)
@@ -223,11 +229,12 @@ def _startup_preload():  # pragma: no cover (integration)
         except Exception:
             pass
         # BM25 index
-        try:
-            _bm25.build_or_get(default_lang, taxonomy_path=f"{settings.data_dir}/taxonomy.json")
-            mark_ready(bm25=True)
-        except Exception:
-            pass
+        for lang in settings.supported_langs:
+            try:
+                _bm25.build_or_get(lang, taxonomy_path=f"{settings.data_dir}/taxonomy.json")
+                mark_lang_ready(lang, bm25=True)
+            except Exception:
+                pass
         print("{\"event\":\"startup_preload_ok\"}")
     except Exception as e:  # noqa: BLE001
         print(json.dumps({"event": "startup_preload_error", "error": str(e)}))
@@ -26,6 +26,15 @@ class ClassifyResponse(BaseModel):
     abstained: bool
     latency_ms: int
 
+class ClassifyBatchRequest(BaseModel):
+    queries: list[str]
+    top_k: int | None = 5
+    lang: str | None = "es"
+
+class ClassifyBatchResponse(BaseModel):
+    results: list[ClassifyResponse]
+    latency_ms: int
+
 class TaxoResult(BaseModel):
     id: str
     label: str
@@ -41,6 +50,7 @@ class AutocompleteResult(BaseModel):
 
 class AutocompleteResponse(BaseModel):
     results: list[AutocompleteResult]
+    cursor: str | None = None  # sesión para la siguiente tecla (si se pidió con ?cursor=)
 
 class TaxoConceptDetail(BaseModel):
     id: str
@@ -17,6 +17,11 @@ HTTP_5XX_COUNT = None
 FEEDBACK_TOTAL = None
 UNKNOWN_QUERIES_TOTAL = None
 MODEL_VERSION_INFO = None
+CLASSIFY_STAGE_LATENCY = None
+CLASSIFY_BATCH_SIZE = None
+CLASSIFY_CACHE_HITS = None
+CLASSIFY_CACHE_MISSES = None
+CLASSIFY_CACHE_EVICTIONS = None
 
 # Taxonomy search/autocomplete metrics
 TAXO_SEARCH_LATENCY = None
@@ -67,6 +72,33 @@ if settings.enable_metrics and Counter and Histogram:  # pragma: no cover - simp
         "Static gauge=1 labeled with current api_version and git_sha",
         ["version", "git_sha"]
     )
+    CLASSIFY_STAGE_LATENCY = Histogram(
+        "twic_classify_stage_latency_seconds",
+        "Latency of each /classify stage (dense, bm25, classifier)",
+        ["stage", "mode"],  # mode=parallel|sequential
+        buckets=[0.001,0.0025,0.005,0.01,0.02,0.05,0.1,0.2,0.5]
+    )
+    CLASSIFY_BATCH_SIZE = Histogram(
+        "twic_classify_batch_size",
+        "Queries per /classify/batch request",
+        [],
+        buckets=[1,2,4,8,16,32,64,128,256]
+    )
+    CLASSIFY_CACHE_HITS = Counter(
+        "twic_classify_cache_hits_total",
+        "/classify results served from the in-process cache",
+        []
+    )
+    CLASSIFY_CACHE_MISSES = Counter(
+        "twic_classify_cache_misses_total",
+        "/classify cache lookups that had to compute the result",
+        []
+    )
+    CLASSIFY_CACHE_EVICTIONS = Counter(
+        "twic_classify_cache_evictions_total",
+        "Entries evicted from the /classify cache (LRU capacity)",
+        []
+    )
     TAXO_SEARCH_LATENCY = Histogram(
         "twic_taxo_search_latency_seconds",
         "Latency of taxonomy search/autocomplete",
@@ -1,8 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pathlib import Path
 import hashlib
 from app.core.settings import settings
-from app.services import retrieval, retrieval_bm25
+from app.routers.ready import reset_lang_flags
+from app.services import classifier, model_registry, result_cache, retrieval, retrieval_bm25
 
 router = APIRouter()
 
@@ -17,14 +18,21 @@ def _checksum(p: str) -> str:
 
 @router.post("/admin/reload")
 def admin_reload(lang: str | None = None):
-    # 1) reset índices densos y BM25
-    retrieval.reset_index()
-    if lang:
-        retrieval_bm25.reset(lang)
-    else:
-        retrieval_bm25.reset(None)
-
-    # 2) intenta resetear el TaxonomyStore del router taxonomy (si existe)
+    # 1) reset índices densos y BM25 (solo del idioma pedido; el resto sigue residente)
+    retrieval.reset_index(lang)
+    retrieval_bm25.reset(lang)
+    reset_lang_flags(lang)
+
+    # 2) nueva generación de artefactos: invalida resultados de /classify cacheados
+    #    y fuerza a /classify a recargar índices en la próxima request
+    generation = result_cache.invalidate()
+    from app.routers import classify  # local import: evita ciclo router->router
+    classify._state.reset()
+    # el clasificador se recarga en segundo plano (doble buffer): las requests siguen
+    # con la versión actual hasta el swap, que vuelve a invalidar la caché de resultados
+    classifier.load_async(settings.models_dir, on_swap=result_cache.invalidate)
+
+    # 3) intenta resetear el TaxonomyStore del router taxonomy (si existe)
     taxo_reset = False
     try:
         from app.routers import taxonomy  # type: ignore
@@ -40,5 +48,34 @@ def admin_reload(lang: str | None = None):
         "ids": _checksum(f"{settings.data_dir}/class_ids.npy"),
         "taxonomy_store_reset": taxo_reset,
         "langs": [lang] if lang else ["es","en"],
+        "classify_cache_generation": generation,
+        "model_version": model_registry.current_version(settings.models_dir),
     }
     return {"reloaded": True, "files": rep}
+
+
+@router.get("/admin/models")
+def admin_models():
+    versions = []
+    for version in model_registry.list_versions(settings.models_dir):
+        manifest = model_registry.read_manifest(Path(settings.models_dir) / version) or {}
+        versions.append({"version": version, "created_at": manifest.get("created_at")})
+    return {
+        "current": model_registry.current_version(settings.models_dir),
+        "loaded": classifier.version(),
+        "versions": versions,
+    }
+
+
+@router.post("/admin/models/activate")
+def admin_models_activate(version: str):
+    """Apunta ``current`` a ``version`` (verificada) y la carga en segundo plano."""
+    if version not in model_registry.list_versions(settings.models_dir):
+        raise HTTPException(status_code=404, detail=f"unknown model version: {version}")
+    try:
+        model_registry.verify(Path(settings.models_dir) / version)
+        model_registry.set_current(settings.models_dir, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    classifier.load_async(settings.models_dir, on_swap=result_cache.invalidate)
+    return {"activated": version, "loaded": classifier.version()}
@@ -1,19 +1,32 @@
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable
+from typing import Any
 # ruff: noqa: I001
 
 from fastapi import APIRouter, HTTPException
 
 from app.core.settings import settings
-from app.models.schemas import Alternative, ClassifyRequest, ClassifyResponse, Prediction
-from app.services import classifier, preprocessing, retrieval, retrieval_bm25
-from app.services.fusion import combine_triple
+from app.models.schemas import (
+    Alternative,
+    ClassifyBatchRequest,
+    ClassifyBatchResponse,
+    ClassifyRequest,
+    ClassifyResponse,
+    Prediction,
+)
+from app.services import classifier, preprocessing, result_cache, retrieval, retrieval_bm25
+from app.services.fusion import FusionIndex, combine_triple
 from app.services.taxonomy_store import TaxonomyStore
+from app.routers.ready import mark_lang_ready
 from app.observability import (
     REQUEST_COUNT,
     CLASSIFY_SCORE_MAX,
     CLASSIFY_ABSTAIN,
     UNKNOWN_QUERIES_TOTAL,
+    CLASSIFY_STAGE_LATENCY,
+    CLASSIFY_BATCH_SIZE,
 )
 
 router = APIRouter()
@@ -22,60 +35,145 @@ logger = logging.getLogger("classify")
 
 class _ClassifyState:
     def __init__(self) -> None:
-        self.loaded_dense: dict[str, bool] = {"es": False, "en": False}
         self.loaded_bm25: dict[str, bool] = {"es": False, "en": False}
+        self.classifier_gen = -1  # classifier.generation() con la que se construyó fusion
         self.store: TaxonomyStore | None = None
+        self.fusion: FusionIndex | None = None
 
     def ensure(self, lang: str) -> TaxonomyStore:
+        changed = False
         if self.store is None:
             self.store = TaxonomyStore(f"{settings.data_dir}/taxonomy.json")
             self.store.load()
-        if not self.loaded_dense.get(lang, False):
-            retrieval.load_index(
-                f"{settings.data_dir}/class_embeddings_{lang}.npy",
-                f"{settings.data_dir}/class_ids.npy",
-            )
+            changed = True
+        if not retrieval.is_loaded(lang):
+            # Registro por idioma: cargar 'en' no desaloja 'es' (ni viceversa)
+            retrieval.load_lang(lang)
+            mark_lang_ready(lang, dense=True)
+            changed = True
+        if classifier.generation() == 0:
             classifier.load(settings.models_dir)
-            self.loaded_dense[lang] = True
+        if self.classifier_gen != classifier.generation():
+            # primera carga o swap en caliente de una versión nueva del modelo
+            self.classifier_gen = classifier.generation()
+            changed = True
         if not self.loaded_bm25.get(lang, False):
             retrieval_bm25.build_or_get(
                 lang, taxonomy_path=f"{settings.data_dir}/taxonomy.json"
             )
+            mark_lang_ready(lang, bm25=True)
             self.loaded_bm25[lang] = True
+            changed = True
+        if changed or self.fusion is None:
+            # Espacio entero compartido: se reconstruye solo cuando cambian artefactos
+            self.fusion = FusionIndex.build(
+                *(retrieval.index_ids(lg) for lg in retrieval.loaded_langs()),
+                *(retrieval_bm25.index_ids(lg) for lg in settings.supported_langs),
+                list(self.store.concepts),
+                valid=set(self.store.concepts),
+                classes=classifier.class_ids(),
+            )
         return self.store
 
+    def reset(self) -> None:
+        self.loaded_bm25 = {"es": False, "en": False}
+        self.classifier_gen = -1
+        self.store = None
+        self.fusion = None
+
 
 _state = _ClassifyState()
 
-@router.post("/classify", response_model=ClassifyResponse)
-def classify(body: ClassifyRequest) -> ClassifyResponse:
-    t0 = time.time()
-    if not body.query or not body.query.strip():
-        raise HTTPException(status_code=400, detail="query is required")
-    lang = (body.lang or settings.default_lang).lower()
+
+class _StageExecutor:
+    """Pool dedicado a las etapas de /classify (numpy/sklearn liberan el GIL)."""
+
+    inst: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def get(cls) -> ThreadPoolExecutor:
+        if cls.inst is None:
+            cls.inst = ThreadPoolExecutor(
+                max_workers=max(1, settings.classify_stage_workers),
+                thread_name_prefix="classify-stage",
+            )
+        return cls.inst
+
+
+def _timed(fn: Callable[[], Any]) -> tuple[Any, float]:
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def _run_stages(stages: dict[str, Callable[[], Any]]) -> tuple[dict[str, Any], dict[str, float]]:
+    """Ejecuta etapas independientes (en paralelo si ``CLASSIFY_PARALLEL=1``).
+
+    Devuelve resultados por etapa y su duración en ms (se publica también en métricas).
+    """
+    if settings.classify_parallel and len(stages) > 1:
+        mode = "parallel"
+        ex = _StageExecutor.get()
+        futures = {name: ex.submit(_timed, fn) for name, fn in stages.items()}
+        timed = {name: f.result() for name, f in futures.items()}
+    else:
+        mode = "sequential"
+        timed = {name: _timed(fn) for name, fn in stages.items()}
+    results = {name: out for name, (out, _dt) in timed.items()}
+    stage_ms = {name: round(dt * 1000, 3) for name, (_out, dt) in timed.items()}
+    if CLASSIFY_STAGE_LATENCY:
+        for name, (_out, dt) in timed.items():
+            CLASSIFY_STAGE_LATENCY.labels(name, mode).observe(dt)
+    return results, stage_ms
+
+def _candidate_mode(clf) -> bool:
+    return settings.clf_candidate_scoring and clf.supports_candidates()
+
+
+def _candidates(sem: list[tuple[str, float]], bm25: list[tuple[str, float]]) -> list[str]:
+    return list(dict.fromkeys([cid for cid, _ in sem] + [cid for cid, _ in bm25]))
+
+
+def _resolve_lang(lang: str | None) -> str:
+    lang = (lang or settings.default_lang).lower()
     if lang not in settings.supported_langs:
         lang = settings.default_lang
+    return lang
 
-    store = _state.ensure(lang)
 
-    q = preprocessing.normalize(body.query)
-    # 1) Denso (semántico)
-    q_emb = retrieval.embed_query(q)
-    sem = retrieval.topk(q_emb, k=settings.top_k)
-    # 2) Léxico (BM25)
-    bm25 = retrieval_bm25.topk(q, lang=lang, k=settings.top_k)
-    # 3) Clasificador
-    cls_vec = classifier.scores(q)
-
-    combined = combine_triple(
+def _respond(
+    store: TaxonomyStore,
+    lang: str,
+    sem: list[tuple[str, float]],
+    bm25: list[tuple[str, float]],
+    cls_vec,
+    top_k: int | None,
+    t0: float,
+    classes: list[str],
+    route: str | None = "/classify",
+    stage_ms: dict[str, float] | None = None,
+) -> ClassifyResponse:
+    """Fusiona las tres señales de una query y arma la respuesta (métricas incluidas).
+
+    ``classes`` alinea ``cls_vec`` con ids: todas las clases del modelo (de la misma
+    ``classifier.snapshot()`` que produjo los scores) o, en modo candidatos, solo las
+    candidatas puntuadas.
+    """
+    k_alt = top_k or 5
+    fusion_kwargs = dict(
         sem_scores=sem,
         bm25_scores=bm25,
         cls_scores=cls_vec,
-        classes=classifier.class_ids(),
+        classes=classes,
         w_sem=settings.alpha_sem,
         w_bm25=settings.beta_bm25,
         w_clf=settings.gamma_clf,
     )
+    if _state.fusion is not None:
+        # Top-(1 + alternativas) ya filtrado a ids de la taxonomía
+        combined = _state.fusion.combine(**fusion_kwargs, k=k_alt + 1)
+    else:
+        combined = combine_triple(**fusion_kwargs)
 
     if not combined:
         combined = sem or bm25 or []
@@ -83,7 +181,6 @@ def classify(body: ClassifyRequest) -> ClassifyResponse:
         raise HTTPException(status_code=503, detail="no candidates")
 
     # Filtra ids que no existan en la taxonomía (puede haber clases históricas)
-    assert store is not None
     before = len(combined)
     combined = [(cid, sc) for cid, sc in combined if cid in store.concepts]
     discarded = before - len(combined)
@@ -109,7 +206,6 @@ def classify(body: ClassifyRequest) -> ClassifyResponse:
         id=best_id, label=label, path=path, score=float(best_score), method="sem+bm25+clf"
     )
 
-    k_alt = body.top_k or 5
     alts = []
     for cid, sc in combined[1 : k_alt + 1]:
         c = store.concepts.get(cid)
@@ -127,19 +223,141 @@ def classify(body: ClassifyRequest) -> ClassifyResponse:
             "abstained": abstained,
             "alternatives": len(alts),
             "lang": lang,
+            "stage_ms": stage_ms,
         },
     )
-    if REQUEST_COUNT:
-        REQUEST_COUNT.labels("POST", "/classify", "200_abstain" if abstained else "200").inc()
-    if CLASSIFY_SCORE_MAX and not abstained:
-        CLASSIFY_SCORE_MAX.labels(lang).observe(float(best_score))
-    if CLASSIFY_ABSTAIN and abstained:
-        CLASSIFY_ABSTAIN.labels(lang).inc()
-    if UNKNOWN_QUERIES_TOTAL and abstained:
-        UNKNOWN_QUERIES_TOTAL.labels(lang).inc()
-    return ClassifyResponse(
+    resp = ClassifyResponse(
         prediction=prediction,
         alternatives=alts,
         abstained=abstained,
         latency_ms=latency_ms,
     )
+    _observe(resp, lang, route)
+    return resp
+
+
+def _observe(resp: ClassifyResponse, lang: str, route: str | None) -> None:
+    # route=None: consulta de un lote; la request HTTP ya la cuenta el middleware
+    if REQUEST_COUNT and route:
+        REQUEST_COUNT.labels("POST", route, "200_abstain" if resp.abstained else "200").inc()
+    if CLASSIFY_SCORE_MAX and resp.prediction is not None:
+        CLASSIFY_SCORE_MAX.labels(lang).observe(resp.prediction.score)
+    if CLASSIFY_ABSTAIN and resp.abstained:
+        CLASSIFY_ABSTAIN.labels(lang).inc()
+    if UNKNOWN_QUERIES_TOTAL and resp.abstained:
+        UNKNOWN_QUERIES_TOTAL.labels(lang).inc()
+
+
+@router.post("/classify", response_model=ClassifyResponse)
+def classify(body: ClassifyRequest) -> ClassifyResponse:
+    t0 = time.time()
+    if not body.query or not body.query.strip():
+        raise HTTPException(status_code=400, detail="query is required")
+    lang = _resolve_lang(body.lang)
+
+    q = preprocessing.normalize(body.query)
+    top_k = body.top_k or 5  # mismo default que _respond: None y 5 comparten entrada
+    cache_key = (result_cache.generation(), q, lang, top_k)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        resp = cached.model_copy(update={"latency_ms": int((time.time() - t0) * 1000)})
+        _observe(resp, lang, "/classify")
+        return resp
+
+    store = _state.ensure(lang)
+    clf = classifier.snapshot()  # misma versión del modelo durante toda la request
+    candidate_mode = _candidate_mode(clf)
+    stages = {
+        # 1) Denso (semántico)
+        "dense": lambda: retrieval.topk(retrieval.embed_query(q), k=settings.top_k, lang=lang),
+        # 2) Léxico (BM25)
+        "bm25": lambda: retrieval_bm25.topk(q, lang=lang, k=settings.top_k),
+    }
+    if not candidate_mode:
+        # 3) Clasificador (todas las clases)
+        stages["classifier"] = lambda: clf.scores(q)
+    out, stage_ms = _run_stages(stages)
+    if candidate_mode:
+        # 3) Clasificador restringido a los candidatos de denso + BM25
+        cls_out, cls_ms = _run_stages({
+            "classifier": lambda: clf.scores_for_batch(
+                [q], [_candidates(out["dense"], out["bm25"])]
+            )[0]
+        })
+        stage_ms.update(cls_ms)
+        cls_ids, cls_vec = cls_out["classifier"]
+    else:
+        cls_ids, cls_vec = clf.class_ids(), out["classifier"]
+
+    resp = _respond(
+        store, lang, out["dense"], out["bm25"], cls_vec, top_k, t0, cls_ids,
+        stage_ms=stage_ms,
+    )
+    result_cache.put(cache_key, resp)
+    return resp
+
+
+@router.post("/classify/batch", response_model=ClassifyBatchResponse)
+def classify_batch(body: ClassifyBatchRequest) -> ClassifyBatchResponse:
+    """Clasifica N queries calculando cada señal una sola vez para todo el lote."""
+    t0 = time.time()
+    if not body.queries:
+        raise HTTPException(status_code=400, detail="queries is required")
+    if len(body.queries) > settings.classify_batch_max:
+        raise HTTPException(
+            status_code=400,
+            detail=f"too many queries (max {settings.classify_batch_max})",
+        )
+    if any(not q or not q.strip() for q in body.queries):
+        raise HTTPException(status_code=400, detail="empty query in batch")
+    lang = _resolve_lang(body.lang)
+
+    store = _state.ensure(lang)
+
+    qs = [preprocessing.normalize(q) for q in body.queries]
+    clf = classifier.snapshot()
+    # Una llamada por señal para todo el lote
+    candidate_mode = _candidate_mode(clf)
+    stages = {
+        "dense": lambda: retrieval.topk_batch(
+            retrieval.embed_queries(qs), k=settings.top_k, lang=lang
+        ),
+        "bm25": lambda: retrieval_bm25.topk_batch(qs, lang=lang, k=settings.top_k),
+    }
+    if not candidate_mode:
+        stages["classifier"] = lambda: clf.scores_batch(qs)
+    out, stage_ms = _run_stages(stages)
+    sem_all, bm25_all = out["dense"], out["bm25"]
+    if candidate_mode:
+        cls_out, cls_ms = _run_stages({
+            "classifier": lambda: clf.scores_for_batch(
+                qs, [_candidates(sem, bm) for sem, bm in zip(sem_all, bm25_all, strict=True)]
+            )
+        })
+        stage_ms.update(cls_ms)
+        cls_all = cls_out["classifier"]
+    else:
+        all_ids = clf.class_ids()
+        cls_all = [(all_ids, row) for row in out["classifier"]]
+
+    results: list[ClassifyResponse] = []
+    for i in range(len(qs)):
+        try:
+            res = _respond(
+                store, lang, sem_all[i], bm25_all[i], cls_all[i][1], body.top_k, t0,
+                cls_all[i][0], route=None, stage_ms=stage_ms,
+            )
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            # Sin candidatos para esta query: se reporta como abstención sin alternativas
+            res = ClassifyResponse(
+                prediction=None,
+                alternatives=[],
+                abstained=True,
+                latency_ms=int((time.time() - t0) * 1000),
+            )
+        results.append(res)
+    if CLASSIFY_BATCH_SIZE:
+        CLASSIFY_BATCH_SIZE.observe(len(qs))
+    return ClassifyBatchResponse(results=results, latency_ms=int((time.time() - t0) * 1000))
@@ -3,6 +3,7 @@ import os
 from fastapi import APIRouter, Response
 
 from app.core.settings import settings
+from app.services import model_registry
 
 router = APIRouter()
 
@@ -11,6 +12,10 @@ _READY_FLAGS = {
     "classifier_loaded": False,
     "bm25_loaded": False,
 }
+# Disponibilidad por idioma (índice denso residente y BM25 construido)
+_LANG_FLAGS: dict[str, dict[str, bool]] = {
+    lang: {"dense": False, "bm25": False} for lang in settings.supported_langs
+}
 
 def mark_ready(
     taxonomy: bool | None = None,
@@ -24,13 +29,33 @@ def mark_ready(
     if bm25 is not None:
         _READY_FLAGS["bm25_loaded"] = bm25
 
+def mark_lang_ready(lang: str, dense: bool | None = None, bm25: bool | None = None):
+    flags = _LANG_FLAGS.setdefault(lang, {"dense": False, "bm25": False})
+    if dense is not None:
+        flags["dense"] = dense
+    if bm25 is not None:
+        flags["bm25"] = bm25
+        if bm25:
+            _READY_FLAGS["bm25_loaded"] = True
+
+def reset_lang_flags(lang: str | None = None) -> None:
+    """Marca como no cargados los índices de ``lang`` (o de todos) tras un reset."""
+    for lg, flags in _LANG_FLAGS.items():
+        if lang is None or lg == lang:
+            flags["dense"] = flags["bm25"] = False
+    # el agregado solo sigue activo si algún idioma conserva su BM25
+    _READY_FLAGS["bm25_loaded"] = any(f["bm25"] for f in _LANG_FLAGS.values())
+
 @router.get("/ready")
 def ready() -> Response:
     # Quick checks: taxonomy file & model artifacts existence + flags
     taxo_file = os.path.join(settings.data_dir, "taxonomy.json")
     taxonomy_ok = os.path.exists(taxo_file) and _READY_FLAGS["taxonomy_loaded"]
-    model_file = os.path.join(settings.models_dir, "lr.joblib")
-    classifier_ok = os.path.exists(model_file) and _READY_FLAGS["classifier_loaded"]
+    model_dir = model_registry.resolve(settings.models_dir)
+    classifier_ok = (
+        any((model_dir / f).exists() for f in ("lr.joblib", "lr_calibrated.joblib"))
+        and _READY_FLAGS["classifier_loaded"]
+    )
     bm25_ok = _READY_FLAGS["bm25_loaded"]  # built in memory
     all_ok = taxonomy_ok and classifier_ok
     status = 200 if all_ok else 503
@@ -39,5 +64,6 @@ def ready() -> Response:
         "taxonomy": taxonomy_ok,
         "classifier": classifier_ok,
         "bm25": bm25_ok,
+        "langs": {lang: dict(flags) for lang, flags in _LANG_FLAGS.items()},
     }
     return Response(content=str(payload), media_type="application/json", status_code=status)
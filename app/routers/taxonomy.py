@@ -77,15 +77,19 @@ def autocomplete(
     q: str,
     lang: str = Query(default=settings.default_lang),
     limit: int = Query(default=15, ge=1, le=50),
+    cursor: str | None = Query(
+        default=None,
+        description="Cursor de la respuesta anterior (vacío para abrir sesión)",
+    ),
 ) -> AutocompleteResponse:
     store = _get_store()
     t0 = time.perf_counter()
-    triples = store.autocomplete(q, lang, limit=limit)
+    if cursor is None:
+        hits = store.autocomplete(q, lang, limit=limit)
+    else:
+        hits, cursor = store.autocomplete_session(q, lang, limit=limit, cursor=cursor)
     dt = time.perf_counter() - t0
-    results: list[AutocompleteResult] = []
-    for _norm, cid, kind_label in triples:
-        kind, label = kind_label.split("|", 1)
-        results.append(AutocompleteResult(id=cid, label=label, kind=kind))
+    results = [AutocompleteResult(id=h.concept_id, label=h.label, kind=h.kind) for h in hits]
     if obs.TAXO_SEARCH_LATENCY:
         obs.TAXO_SEARCH_LATENCY.labels(lang=lang, source="autocomplete").observe(dt)
     if obs.TAXO_SEARCH_RESULTS:
@@ -101,7 +105,7 @@ def autocomplete(
         obs.TAXO_SEARCH_RESULTS.labels(lang=lang, source="autocomplete", bucket=bucket).inc()
     if obs.TAXO_SEARCH_EMPTY and not results:
         obs.TAXO_SEARCH_EMPTY.labels(lang=lang, source="autocomplete").inc()
-    return AutocompleteResponse(results=results)
+    return AutocompleteResponse(results=results, cursor=cursor)
 
 @router.get("/taxonomy/{concept_id}", response_model=TaxoConceptDetail)
 def get_concept(concept_id: str) -> TaxoConceptDetail:
@@ -0,0 +1,105 @@
+"""Mapa de calibración compacto (sigmoide / isotónica por clase).
+
+Sustituye al ``CalibratedClassifierCV`` guardado por ``retrain_classifier.py``:
+en lugar de ``cv_folds`` copias de la regresión logística, un único modelo base
+más un mapa por clase aplicado a su ``decision_function``. ``apply`` replica
+``_CalibratedClassifier.predict_proba`` (calibrador por columna, ``1 - p`` en
+binario, normalización por suma en multiclase).
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+class CalibrationMap:
+    def __init__(self, method: str, n_classes: int, params: dict[str, np.ndarray]) -> None:
+        if method not in ("sigmoid", "isotonic"):
+            raise ValueError(f"unsupported calibration method: {method}")
+        self.method = method
+        self.n_classes = n_classes
+        if method == "sigmoid":
+            self.a = np.asarray(params["a"], dtype=np.float64)
+            self.b = np.asarray(params["b"], dtype=np.float64)
+        else:
+            # Umbrales de todas las clases concatenados; ptr[c]:ptr[c+1] = clase c
+            self.x = np.asarray(params["x"], dtype=np.float64)
+            self.y = np.asarray(params["y"], dtype=np.float64)
+            self.ptr = np.asarray(params["ptr"], dtype=np.int64)
+            lo, hi = self.x[self.ptr[:-1]], self.x[self.ptr[1:] - 1]
+            self._lo, self._hi = lo, hi
+            # Clave global ordenada: un searchsorted para todas las clases a la vez
+            self._base = float(self.x.min()) if self.x.size else 0.0
+            self._step = float(self.x.max() - self._base) + 1.0 if self.x.size else 1.0
+            cls = np.repeat(np.arange(self.ptr.shape[0] - 1), np.diff(self.ptr))
+            self._key = (self.x - self._base) + cls * self._step
+
+    @property
+    def n_columns(self) -> int:
+        """Columnas de ``decision_function`` que calibra (1 en binario)."""
+        return (self.a if self.method == "sigmoid" else self._lo).shape[0]
+
+    @classmethod
+    def from_calibrated(cls, calibrated) -> CalibrationMap:
+        """Extrae el mapa de un ``CalibratedClassifierCV(ensemble=False)`` ajustado."""
+        if len(calibrated.calibrated_classifiers_) != 1:
+            raise ValueError("expected a single calibrated classifier (ensemble=False)")
+        calibrators = calibrated.calibrated_classifiers_[0].calibrators
+        n_classes = len(calibrated.classes_)
+        if calibrated.method == "sigmoid":
+            params = {
+                "a": np.array([float(c.a_) for c in calibrators]),
+                "b": np.array([float(c.b_) for c in calibrators]),
+            }
+        else:
+            xs = [np.asarray(c.X_thresholds_, dtype=np.float64) for c in calibrators]
+            ys = [np.asarray(c.y_thresholds_, dtype=np.float64) for c in calibrators]
+            params = {
+                "x": np.concatenate(xs),
+                "y": np.concatenate(ys),
+                "ptr": np.concatenate([[0], np.cumsum([len(x) for x in xs])]),
+            }
+        return cls(calibrated.method, n_classes, params)
+
+    def to_dict(self) -> dict:
+        """Arrays planos (sin objetos sklearn) para ``joblib.dump``."""
+        if self.method == "sigmoid":
+            params = {"a": self.a, "b": self.b}
+        else:
+            params = {"x": self.x, "y": self.y, "ptr": self.ptr}
+        return {"method": self.method, "n_classes": self.n_classes, **params}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> CalibrationMap:
+        return cls(data["method"], int(data["n_classes"]), data)
+
+    def raw(self, decision: np.ndarray, cols: np.ndarray | None = None) -> np.ndarray:
+        """Probabilidad calibrada por columna sin normalizar. ``decision``: (B, n)."""
+        decision = np.asarray(decision, dtype=np.float64)
+        cols = np.arange(decision.shape[1]) if cols is None else np.asarray(cols)
+        if self.method == "sigmoid":
+            return 1.0 / (1.0 + np.exp(self.a[cols] * decision + self.b[cols]))
+        t = np.clip(decision, self._lo[cols], self._hi[cols])
+        lo, hi = self.ptr[cols], self.ptr[cols + 1] - 1
+        key = (t - self._base) + cols * self._step
+        i = np.clip(np.searchsorted(self._key, key, side="right") - 1, lo, np.maximum(hi - 1, lo))
+        j = np.minimum(i + 1, hi)
+        x0, x1, y0, y1 = self.x[i], self.x[j], self.y[i], self.y[j]
+        span = np.where(x1 > x0, x1 - x0, 1.0)
+        return y0 + (np.clip(t, x0, x1) - x0) / span * (y1 - y0)
+
+    def apply(self, decision: np.ndarray) -> np.ndarray:
+        """(B, n_clases) como ``CalibratedClassifierCV.predict_proba``."""
+        decision = np.asarray(decision, dtype=np.float64)
+        if decision.ndim == 1:
+            decision = decision.reshape(-1, 1)
+        p = self.raw(decision)
+        if self.n_classes == 2:
+            p1 = p[:, -1]
+            proba = np.stack([1.0 - p1, p1], axis=1)
+        else:
+            denom = p.sum(axis=1, keepdims=True)
+            proba = np.divide(
+                p, denom, out=np.full_like(p, 1.0 / self.n_classes), where=denom != 0
+            )
+        proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+        return proba
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from pathlib import Path
+import math
+import threading
+from collections import Counter
+from collections.abc import Callable
 
 import joblib
 import numpy as np
 
+from app.core.settings import settings
+from app.services import model_registry
+from app.services.calibration import CalibrationMap
+
 
 class _ClassifierState:
     def __init__(self) -> None:
@@ -12,44 +19,158 @@ class _ClassifierState:
         self.model = None
         self.classes: list[str] = []
         self.calibrated: bool = False
+        self.version: str | None = None  # versión del registro (None = layout plano)
+        # Calibración compacta (modelo base único + mapa por clase); ver calibration.py
+        self.calibration: CalibrationMap | None = None
+        # Ruta rápida (modelos lineales): coeficientes leídos una vez en load()
+        self.coef_t: np.ndarray | None = None  # (n_features, n_clases_modelo)
+        self.intercept: np.ndarray | None = None
+        self.softmax: bool = False
+        self.class_pos: dict[str, int] = {}
+        # Vectorizador compilado (vocabulario + idf); None = se usa tfidf.transform
+        self.features: _CompiledTfidf | _CompiledUnion | None = None
 
     def load(self, models_dir: str) -> None:
-        p = Path(models_dir)
+        """Carga la versión activa de ``models_dir`` (verificando su manifest)."""
+        p = model_registry.resolve(models_dir)
+        manifest = model_registry.verify(p)
+        self.version = manifest["version"] if manifest else None
         self.tfidf = joblib.load(p / "tfidf.joblib")
         calib_path = p / "lr_calibrated.joblib"
-        if calib_path.exists():
+        map_path = p / "calibration.joblib"
+        self.calibration = None
+        if map_path.exists():
+            self.model = joblib.load(p / "lr.joblib")
+            self.calibration = CalibrationMap.from_dict(joblib.load(map_path))
+            self.calibrated = True
+        elif calib_path.exists():  # ensemble CalibratedClassifierCV (artefactos antiguos)
             self.model = joblib.load(calib_path)
             self.calibrated = True
         else:
             self.model = joblib.load(p / "lr.joblib")
             self.calibrated = False
         self.classes = list(joblib.load(p / "classes.joblib"))
+        self._compile_linear()
+
+    def _compile_linear(self) -> None:
+        """Extrae ``coef_``/``intercept_`` para puntuar solo clases candidatas.
+
+        Aplica a modelos lineales sin calibración o con mapa de calibración
+        compacto; con el ensemble ``CalibratedClassifierCV`` ``supports_candidates()``
+        es False y se usa ``predict_proba`` completo.
+        """
+        self.coef_t = self.intercept = self.features = None
+        self.class_pos = {cid: i for i, cid in enumerate(self.classes)}
+        model = self.model
+        if self.calibrated and self.calibration is None:
+            return
+        if not (hasattr(model, "coef_") and hasattr(model, "intercept_")):
+            return
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        n_model = len(getattr(model, "classes_", self.classes))
+        if n_model != len(self.classes) or coef.shape[0] not in (1, len(self.classes)):
+            return
+        # Por filas de feature: una query solo toca nnz(x) filas contiguas
+        self.coef_t = np.ascontiguousarray(coef.T)
+        self.intercept = np.asarray(model.intercept_, dtype=np.float64).reshape(-1)
+        self.softmax = _uses_softmax(model)
+        if settings.clf_compiled:
+            features = _compile_vectorizer(self.tfidf)
+            if features is not None and features.n_features == self.coef_t.shape[0]:
+                self.features = features
 
     def scores(self, text: str) -> np.ndarray:
+        return self.scores_batch([text])[0]
+
+    def scores_batch(self, texts: list[str]) -> np.ndarray:
+        """Matriz (B, n_clases) con un único ``transform`` + ``predict_proba``.
+
+        Con vectorizador compilado se evita sklearn: análisis + diccionario,
+        producto disperso con ``coef_`` y la misma link function que
+        ``predict_proba`` (diferencia < 1e-6).
+        """
         assert self.tfidf is not None and self.model is not None
-        x_vec = self.tfidf.transform([text])
-        if hasattr(self.model, "predict_proba"):
-            proba = self.model.predict_proba(x_vec)[0]
-            s = proba.astype("float32")
+        if self.features is not None:
+            s = np.zeros((len(texts), len(self.classes)), dtype="float32")
+            for r, (feats, vals) in enumerate(self._rows(texts)):
+                s[r] = self._proba(feats, vals)
+            return s
+        x_vec = self.tfidf.transform(texts)
+        if self.calibration is not None:
+            s = self.calibration.apply(self.model.decision_function(x_vec)).astype("float32")
+        elif hasattr(self.model, "predict_proba"):
+            s = self.model.predict_proba(x_vec).astype("float32")
         elif hasattr(self.model, "decision_function"):
             df = self.model.decision_function(x_vec)
             if df.ndim == 1:
-                p1 = float(1.0 / (1.0 + np.exp(-df[0])))
-                s = np.array([1.0 - p1, p1], dtype="float32")
+                p1 = (1.0 / (1.0 + np.exp(-df))).astype("float32")
+                s = np.stack([1.0 - p1, p1], axis=1)
             else:
-                s = df[0].astype("float32")
+                s = df.astype("float32")
         else:
             raise RuntimeError("Classifier lacks predict_proba/decision_function")
-        if s.shape[0] != len(self.classes):
-            if len(self.classes) == 2 and s.shape[0] == 1:
-                p1 = float(s[0])
-                s = np.array([1.0 - p1, p1], dtype="float32")
+        if s.shape[1] != len(self.classes):
+            if len(self.classes) == 2 and s.shape[1] == 1:
+                p1 = s[:, 0]
+                s = np.stack([1.0 - p1, p1], axis=1)
             else:
                 raise RuntimeError(
-                    f"score length {s.shape[0]} != classes {len(self.classes)}"
+                    f"score length {s.shape[1]} != classes {len(self.classes)}"
                 )
         return s
 
+    def _proba(self, feats: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        """``predict_proba`` de una fila dispersa (todas las clases del modelo)."""
+        assert self.coef_t is not None and self.intercept is not None
+        logits = vals @ self.coef_t[feats] + self.intercept
+        if self.calibration is not None:
+            return self.calibration.apply(logits[None, :])[0]
+        if self.coef_t.shape[1] == 1:
+            p1 = 1.0 / (1.0 + np.exp(-logits[0]))
+            return np.array([1.0 - p1, p1])
+        if self.softmax:
+            e = np.exp(logits - logits.max())
+            return e / e.sum()
+        proba = 1.0 / (1.0 + np.exp(-logits))
+        return proba / proba.sum()
+
+    def _rows(self, texts: list[str]):
+        """(features, valores) por texto: compilado o vía ``tfidf.transform``."""
+        if self.features is not None:
+            return [self.features.transform(t) for t in texts]
+        x_vec = self.tfidf.transform(texts).tocsr()
+        return [
+            (x_vec.indices[x_vec.indptr[r]:x_vec.indptr[r + 1]],
+             x_vec.data[x_vec.indptr[r]:x_vec.indptr[r + 1]])
+            for r in range(len(texts))
+        ]
+
+    def supports_candidates(self) -> bool:
+        return self.coef_t is not None
+
+    def scores_for_batch(
+        self, texts: list[str], candidates: list[list[str]]
+    ) -> list[tuple[list[str], np.ndarray]]:
+        """Puntúa solo las clases candidatas de cada texto.
+
+        Las probabilidades son las de ``predict_proba`` (mismo denominador sobre
+        todas las clases: softmax, suma OvR o suma calibrada), restringidas a los
+        candidatos; no se renormalizan, así que ``tau_low`` conserva su escala.
+        El producto disperso con ``coef_`` completo cuesta ``nnz(x) * n_clases``
+        (barato en un modelo lineal); lo que se ahorra es la matriz
+        ``(B, n_clases)`` y la fusión sobre clases que ninguna otra etapa propuso.
+        """
+        assert self.tfidf is not None and self.coef_t is not None and self.intercept is not None
+        out: list[tuple[list[str], np.ndarray]] = []
+        for (feats, vals), cands in zip(self._rows(texts), candidates, strict=True):
+            ids = [cid for cid in dict.fromkeys(cands) if cid in self.class_pos]
+            if not ids:
+                out.append(([], np.zeros(0, dtype="float32")))
+                continue
+            cols = np.fromiter((self.class_pos[cid] for cid in ids), dtype=np.intp, count=len(ids))
+            out.append((ids, self._proba(feats, vals)[cols].astype("float32")))
+        return out
+
     def class_ids(self) -> list[str]:
         return self.classes
 
@@ -57,17 +178,175 @@ class _ClassifierState:
         return self.calibrated
 
 
+class _CompiledTfidf:
+    """``TfidfVectorizer.transform`` de un texto sin validación ni CSR de sklearn.
+
+    Reutiliza el analizador del vectorizador (mismos tokens / n-gramas) y aplica
+    conteo, tf sublineal, idf y normalización como ``TfidfTransformer``.
+    """
+
+    def __init__(self, vec) -> None:
+        self.analyzer = vec.build_analyzer()
+        self.vocab: dict[str, int] = vec.vocabulary_
+        self.n_features = len(self.vocab)
+        self.binary = bool(getattr(vec, "binary", False))
+        self.sublinear = bool(getattr(vec, "sublinear_tf", False))
+        self.norm = getattr(vec, "norm", None)
+        self.idf = np.asarray(vec.idf_) if getattr(vec, "use_idf", False) else None
+        self.dtype = np.dtype(getattr(vec, "dtype", np.float64))
+
+    def transform(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        vocab = self.vocab
+        counts = Counter(j for j in map(vocab.get, self.analyzer(text)) if j is not None)
+        feats = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+        vals = np.fromiter((counts[j] for j in feats.tolist()), dtype=self.dtype, count=len(counts))
+        if self.binary:
+            vals[:] = 1
+        if self.sublinear:
+            vals = np.log(vals) + 1
+        if self.idf is not None:
+            vals = vals * self.idf[feats]
+        if self.norm == "l2":
+            total = math.sqrt(float(vals @ vals))
+        elif self.norm == "l1":
+            total = float(np.abs(vals).sum())
+        else:
+            total = 0.0
+        if total > 0:
+            vals = vals / total
+        return feats, vals
+
+
+class _CompiledUnion:
+    """``FeatureUnion`` de vectorizadores: features concatenadas con desplazamiento."""
+
+    def __init__(self, parts: list[tuple[_CompiledTfidf, int, float]]) -> None:
+        self.parts = parts  # (vectorizador, offset, peso)
+        self.n_features = sum(p.n_features for p, _, _ in parts)
+
+    def transform(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        feats, vals = [], []
+        for part, offset, weight in self.parts:
+            f, v = part.transform(text)
+            feats.append(f + offset)
+            vals.append(v * weight if weight != 1 else v)
+        return np.concatenate(feats), np.concatenate(vals)
+
+
+def _compile_one(vec) -> _CompiledTfidf | None:
+    if not (hasattr(vec, "vocabulary_") and hasattr(vec, "build_analyzer")):
+        return None
+    if getattr(vec, "use_idf", False) and not hasattr(vec, "idf_"):
+        return None
+    if getattr(vec, "norm", None) not in (None, "l1", "l2"):
+        return None
+    return _CompiledTfidf(vec)
+
+
+def _compile_vectorizer(vec) -> _CompiledTfidf | _CompiledUnion | None:
+    """Vectorizador compilado (TF-IDF / Count o su ``FeatureUnion``); None si no aplica."""
+    if not hasattr(vec, "transformer_list"):
+        return _compile_one(vec)
+    weights = getattr(vec, "transformer_weights", None) or {}
+    parts: list[tuple[_CompiledTfidf, int, float]] = []
+    offset = 0
+    for name, sub in vec.transformer_list:
+        if sub in ("drop", None):
+            continue
+        comp = _compile_one(sub)
+        if comp is None:
+            return None
+        parts.append((comp, offset, float(weights.get(name, 1.0))))
+        offset += comp.n_features
+    return _CompiledUnion(parts) if parts else None
+
+
+def _uses_softmax(model) -> bool:
+    """Replica la elección OvR/multinomial de ``LogisticRegression.predict_proba``."""
+    if len(getattr(model, "classes_", [])) <= 2:
+        return False
+    multi_class = getattr(model, "multi_class", None)
+    if multi_class is None:  # sklearn>=1.8: siempre softmax en multiclase
+        return True
+    if multi_class in ("ovr", "warn"):
+        return False
+    if multi_class == "multinomial":
+        return True
+    # auto/deprecated: sklearn<1.8 usaba OvR con liblinear
+    return getattr(model, "solver", "lbfgs") != "liblinear"
+
+
 _state = _ClassifierState()
+_generation = 0
+_load_lock = threading.Lock()  # serializa cargas; las lecturas nunca esperan
 
 
 def load(models_dir: str) -> None:  # public API
-    _state.load(models_dir)
+    """Doble buffer: construye un estado nuevo y lo publica con una sola asignación.
+
+    Las requests en curso siguen con la referencia que ya tenían (``snapshot()``);
+    nunca ven un estado a medio cargar.
+    """
+    global _state, _generation
+    with _load_lock:
+        new = _ClassifierState()
+        new.load(models_dir)
+        _state = new
+        _generation += 1
+    print(f"[classifier] loaded version={new.version} classes={len(new.classes)}")
+
+
+def load_async(
+    models_dir: str, on_swap: Callable[[], object] | None = None
+) -> threading.Thread:
+    """``load`` en segundo plano; si falla se conserva el estado anterior."""
+
+    def _run() -> None:
+        try:
+            load(models_dir)
+        except (OSError, ValueError, KeyError, EOFError) as e:
+            print(f"[classifier] reload failed ({e}); keeping version={_state.version}")
+            return
+        if on_swap is not None:
+            on_swap()
+
+    thread = threading.Thread(target=_run, name="classifier-reload", daemon=True)
+    thread.start()
+    return thread
+
+
+def snapshot() -> _ClassifierState:
+    """Estado actual; usarlo durante toda una request mantiene scores e ids alineados."""
+    return _state
+
+
+def generation() -> int:
+    """Se incrementa en cada swap (para reconstruir estructuras derivadas)."""
+    return _generation
+
+
+def version() -> str | None:
+    return _state.version
 
 
 def scores(text: str) -> np.ndarray:
     return _state.scores(text)
 
 
+def scores_batch(texts: list[str]) -> np.ndarray:
+    return _state.scores_batch(texts)
+
+
+def supports_candidates() -> bool:
+    return _state.supports_candidates()
+
+
+def scores_for_batch(
+    texts: list[str], candidates: list[list[str]]
+) -> list[tuple[list[str], np.ndarray]]:
+    return _state.scores_for_batch(texts, candidates)
+
+
 def class_ids() -> list[str]:
     return _state.class_ids()
 
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+import numpy as np
+
+try:  # optional ANN dependency (faiss-cpu)
+    import faiss  # type: ignore
+except ImportError:  # pragma: no cover
+    faiss = None  # type: ignore
+
+# Backends de índice denso para retrieval.topk:
+#   brute: numpy (coseno exacto, sin artefactos extra)
+#   flat:  faiss IndexFlatIP sobre vectores L2-normalizados (exacto)
+#   hnsw:  faiss IndexHNSWFlat (aproximado, grafo)
+#   ivf:   faiss IndexIVFFlat (aproximado, listas invertidas)
+# Los índices faiss se construyen en scripts/build_embeddings.py y se guardan junto a
+# class_embeddings_{lang}.npy como class_index_{lang}.{kind}.faiss.
+#
+# Formato mmap (compartido entre workers vía page cache, sin copia privada):
+#   class_embeddings_{lang}.norm.npy  float32 (N, D) ya L2-normalizada
+#   class_ids.offsets.npy             int64 (N+1) offsets en bytes
+#   class_ids.utf8.npy                uint8 blob con los ids en UTF-8
+# Si faltan o están desfasados se usa el formato clásico (np.load + pickle).
+
+FAISS_KINDS = ("flat", "hnsw", "ivf")
+
+
+def faiss_available() -> bool:
+    return faiss is not None
+
+
+def faiss_path(embeddings_path: str | Path, kind: str) -> Path:
+    p = Path(embeddings_path)
+    stem = p.stem.replace("class_embeddings", "class_index", 1)
+    return p.with_name(f"{stem}.{kind}.faiss")
+
+
+def _as_queries(q: np.ndarray) -> np.ndarray:
+    q = np.asarray(q, dtype=np.float32)
+    return q.reshape(1, -1) if q.ndim == 1 else q
+
+
+DENSE_DTYPES = ("float32", "float16", "int8")
+_CHUNK_ROWS = 16384  # filas por bloque al des-cuantizar (acota memoria temporal)
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-8)
+
+
+def _topk_rows(sims: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k por fila con ``argpartition`` + orden solo de los k elegidos."""
+    k = min(k, sims.shape[1])
+    if k <= 0:
+        empty = np.zeros((sims.shape[0], 0))
+        return empty.astype(sims.dtype), empty.astype(np.int64)
+    if k < sims.shape[1]:
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(sims.shape[1]), sims.shape).copy()
+    part = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+
+class BruteForceIndex:
+    """Coseno exacto en numpy sobre filas L2-normalizadas una sola vez en carga.
+
+    ``dtype`` controla el almacenamiento: float32 (default, producto BLAS directo),
+    float16 (mitad de memoria) o int8 con escala por fila (un cuarto). Los formatos
+    reducidos se des-cuantizan por bloques al buscar: ahorran RSS a costa de algo de
+    CPU por query (ver ``scripts/bench_dense_index.py`` para el delta de precisión).
+    """
+
+    kind = "brute"
+
+    def __init__(self, embeddings: np.ndarray, dtype: str = "float32") -> None:
+        if dtype not in DENSE_DTYPES:
+            raise ValueError(f"unknown dense dtype: {dtype}")
+        x = _l2_normalize(embeddings)
+        self.dtype = dtype
+        self.scales: np.ndarray | None = None
+        if dtype == "float16":
+            self.matrix = x.astype(np.float16)
+        elif dtype == "int8":
+            amax = np.abs(x).max(axis=1) if x.size else np.zeros(x.shape[0], np.float32)
+            self.scales = (np.maximum(amax, 1e-12) / 127.0).astype(np.float32)
+            self.matrix = np.rint(x / self.scales[:, None]).astype(np.int8)
+        else:
+            self.matrix = x
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.matrix.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def _sims(self, q: np.ndarray) -> np.ndarray:
+        if self.matrix.dtype == np.float32:
+            return q @ self.matrix.T
+        sims = np.empty((q.shape[0], self.ntotal), dtype=np.float32)
+        for lo in range(0, self.ntotal, _CHUNK_ROWS):
+            block = self.matrix[lo : lo + _CHUNK_ROWS].astype(np.float32)
+            sims[:, lo : lo + block.shape[0]] = q @ block.T
+        if self.scales is not None:
+            sims *= self.scales[None, :]
+        return sims
+
+    def search(self, q: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """(B, D) -> similitudes coseno e índices (B, k), ordenados desc."""
+        return _topk_rows(self._sims(_l2_normalize(_as_queries(q))), k)
+
+
+    @classmethod
+    def from_normalized(cls, matrix: np.ndarray) -> BruteForceIndex:
+        """Envuelve una matriz float32 ya normalizada (p.ej. mmap) sin copiarla."""
+        obj = cls.__new__(cls)
+        obj.dtype = "float32"
+        obj.scales = None
+        obj.matrix = np.asarray(matrix)
+        return obj
+
+
+class FaissIndex:
+    def __init__(self, index, kind: str) -> None:
+        self.index = index
+        self.kind = kind
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal)
+
+    def search(self, q: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        q = np.ascontiguousarray(_as_queries(q))
+        q = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-8)
+        sims, idx = self.index.search(q, min(k, self.ntotal))
+        return sims, idx
+
+
+def build_faiss(embeddings: np.ndarray, kind: str, *, hnsw_m: int = 32,
+                ivf_nlist: int | None = None):
+    """Construye un índice faiss de producto interno sobre filas L2-normalizadas."""
+    if faiss is None:
+        raise RuntimeError("faiss-cpu no instalado")
+    x = np.ascontiguousarray(embeddings, dtype=np.float32).copy()
+    faiss.normalize_L2(x)
+    n, dim = x.shape
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+    elif kind == "ivf":
+        # ~39 puntos de entrenamiento por centroide como mínimo (recomendación faiss)
+        nlist = ivf_nlist or max(1, min(int(4 * np.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(x)
+    else:
+        raise ValueError(f"unknown faiss index kind: {kind}")
+    index.add(x)
+    return index
+
+
+def write_faiss(index, path: str | Path) -> None:
+    assert faiss is not None
+    tmp = Path(f"{path}.tmp")
+    faiss.write_index(index, str(tmp))
+    tmp.replace(path)
+
+
+def _older_than(path: Path, src: str | Path) -> bool:
+    src = Path(src)
+    return src.exists() and src.stat().st_mtime > path.stat().st_mtime
+
+
+def open_index(embeddings: np.ndarray, embeddings_path: str, backend: str, *,
+               hnsw_ef_search: int = 64, ivf_nprobe: int = 8, dtype: str = "float32",
+               normalized: bool = False):
+    """Abre el backend pedido; si no es posible cae a ``BruteForceIndex``.
+
+    Con ``normalized`` (matriz de ``open_normalized``) el backend brute float32 usa
+    la matriz tal cual, sin copia.
+    """
+    if backend in FAISS_KINDS:
+        path = faiss_path(embeddings_path, backend)
+        if faiss is None:
+            print(f"[dense_index] faiss not installed; backend={backend} -> brute")
+        elif not path.exists():
+            print(f"[dense_index] missing {path}; backend={backend} -> brute")
+        elif _older_than(path, embeddings_path):
+            # mismas filas no bastan: otro encoder u otro orden dejan el ANN obsoleto
+            print(f"[dense_index] {path} stale vs {embeddings_path}; backend={backend} -> brute")
+        else:
+            index = faiss.read_index(str(path))
+            if index.ntotal != embeddings.shape[0]:
+                print(
+                    f"[dense_index] {path} ntotal={index.ntotal} != "
+                    f"{embeddings.shape[0]} rows (stale); -> brute"
+                )
+            else:
+                if backend == "hnsw":
+                    index.hnsw.efSearch = hnsw_ef_search
+                elif backend == "ivf":
+                    index.nprobe = ivf_nprobe
+                return FaissIndex(index, backend)
+    elif backend != "brute":
+        print(f"[dense_index] unknown backend={backend}; -> brute")
+    if normalized and dtype == "float32" and embeddings.dtype == np.float32:
+        return BruteForceIndex.from_normalized(embeddings)
+    return BruteForceIndex(embeddings, dtype=dtype)
+
+
+def normalized_path(embeddings_path: str | Path) -> Path:
+    p = Path(embeddings_path)
+    return p.with_name(f"{p.stem}.norm.npy")
+
+
+def write_normalized(embeddings: np.ndarray, embeddings_path: str | Path) -> Path:
+    out = normalized_path(embeddings_path)
+    _save_npy(_l2_normalize(embeddings), out)
+    return out
+
+
+def open_normalized(embeddings_path: str | Path) -> np.ndarray | None:
+    """Matriz normalizada en modo mmap, o None si falta o es anterior a la original."""
+    src, path = Path(embeddings_path), normalized_path(embeddings_path)
+    if not path.exists():
+        return None
+    mat = np.load(path, mmap_mode="r")
+    if src.exists():
+        raw = np.load(src, mmap_mode="r")  # solo lee la cabecera
+        if raw.shape != mat.shape or src.stat().st_mtime > path.stat().st_mtime:
+            print(f"[dense_index] {path} stale vs {src}; ignoring")
+            return None
+    if mat.dtype != np.float32 or mat.ndim != 2:
+        print(f"[dense_index] {path} dtype={mat.dtype} ndim={mat.ndim} unexpected; ignoring")
+        return None
+    return mat
+
+
+class StringTable(Sequence[str]):
+    """Lista de ids de solo lectura sobre offsets + blob UTF-8 (decodifica bajo demanda)."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray) -> None:
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return max(0, int(self.offsets.shape[0]) - 1)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("StringTable index out of range")
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[lo:hi].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.blob.tobytes()
+        offs = self.offsets.tolist()
+        for lo, hi in zip(offs[:-1], offs[1:], strict=True):
+            yield data[lo:hi].decode("utf-8")
+
+
+def string_table_paths(ids_path: str | Path) -> tuple[Path, Path]:
+    p = Path(ids_path)
+    return p.with_name(f"{p.stem}.offsets.npy"), p.with_name(f"{p.stem}.utf8.npy")
+
+
+def encode_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(offsets int64 N+1, blob uint8) para ``StringTable``."""
+    encoded = [str(s).encode("utf-8") for s in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_string_table(ids: list[str], ids_path: str | Path) -> None:
+    offsets, blob = encode_strings(ids)
+    offsets_path, blob_path = string_table_paths(ids_path)
+    _save_npy(blob, blob_path)
+    _save_npy(offsets, offsets_path)
+
+
+def open_string_table(ids_path: str | Path) -> StringTable | None:
+    """Tabla de ids en modo mmap, o None si falta o es anterior a ``ids_path``."""
+    src = Path(ids_path)
+    offsets_path, blob_path = string_table_paths(ids_path)
+    if not (offsets_path.exists() and blob_path.exists()):
+        return None
+    if src.exists() and src.stat().st_mtime > min(
+        offsets_path.stat().st_mtime, blob_path.stat().st_mtime
+    ):
+        print(f"[dense_index] {offsets_path} stale vs {src}; ignoring")
+        return None
+    offsets = np.load(offsets_path, mmap_mode="r")
+    blob = np.load(blob_path, mmap_mode="r")
+    if offsets.shape[0] == 0 or int(offsets[-1]) != blob.shape[0]:
+        print(f"[dense_index] {offsets_path} does not match {blob_path}; ignoring")
+        return None
+    return StringTable(offsets, blob)
+
+
+def _save_npy(arr: np.ndarray, path: Path) -> None:
+    # tmp + replace: un worker que abre en paralelo nunca ve un fichero a medias
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, np.ascontiguousarray(arr))
+    tmp.replace(path)
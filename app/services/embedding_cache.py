@@ -0,0 +1,133 @@
+"""Caché en disco de embeddings de texto por (modelo, hash del texto).
+
+Un fichero ``embeddings_<modelo>.npz`` por modelo en ``EMBEDDINGS_CACHE_DIR`` (por
+defecto ``<DATA_DIR>/cache``, junto a los índices BM25) con ``keys`` (sha256 del
+texto truncado a 16 bytes) y ``vecs`` (float32). Lo comparten
+``TaxonomyStore.load`` (etiquetas) y ``scripts/build_embeddings.py`` (textos de
+clase): cada uno encuentra ya hechos los vectores del otro si los textos coinciden.
+
+Solo se usa con el backend ``st``: los vectores placeholder salen de ``hash()``,
+que cambia entre procesos, y no coincidirían con los de las queries.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+import numpy as np
+
+from app.core.settings import settings
+from app.services import embeddings
+
+_KEY_BYTES = 16
+
+
+def cache_dir() -> Path:
+    return Path(settings.embeddings_cache_dir or Path(settings.data_dir) / "cache")
+
+
+def cache_path(model_name: str, base: str | Path | None = None) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name).strip("_")
+    return Path(base or cache_dir()) / f"embeddings_{slug}.npz"
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()[:_KEY_BYTES]
+
+
+class EmbeddingCache:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._rows: dict[bytes, int] = {}  # clave -> fila de _vecs (orden de inserción)
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as z:
+                keys, vecs = z["keys"], z["vecs"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[embedding_cache] {self.path} unreadable ({e}); starting empty")
+            return
+        raw = np.ascontiguousarray(keys, dtype=np.uint8).tobytes()
+        n = len(raw) // _KEY_BYTES
+        if n != vecs.shape[0]:
+            print(f"[embedding_cache] {self.path} inconsistent; starting empty")
+            return
+        self._rows = {raw[i * _KEY_BYTES : (i + 1) * _KEY_BYTES]: i for i in range(n)}
+        self._vecs = np.asarray(vecs, dtype=np.float32)
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            keys = np.frombuffer(b"".join(self._rows), dtype=np.uint8).reshape(-1, _KEY_BYTES)
+            with open(tmp, "wb") as fh:
+                np.savez(fh, keys=keys, vecs=self._vecs)
+            tmp.replace(self.path)  # atómico: otro proceso nunca lee un fichero a medias
+        except OSError as e:
+            print(f"[embedding_cache] could not persist {self.path} ({e})")
+
+    def embed(
+        self, texts: Sequence[str], encode: Callable[[list[str]], np.ndarray]
+    ) -> np.ndarray:
+        """Matriz ``(N, D)`` de ``texts``: filas en caché y el resto con una sola
+        llamada a ``encode`` (textos distintos), que se añaden y se persisten."""
+        keys = [text_key(t) for t in texts]
+        missing: dict[bytes, str] = {}
+        for key, text in zip(keys, texts, strict=True):
+            if key not in self._rows and key not in missing:
+                missing[key] = text
+        if missing:
+            new = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            new = new.reshape(len(missing), -1)
+            if self._vecs.shape[0] and self._vecs.shape[1] != new.shape[1]:
+                print(f"[embedding_cache] dim changed in {self.path}; discarding old vectors")
+                self._rows, self._vecs = {}, np.zeros((0, 0), dtype=np.float32)
+                # los aciertos de antes también se recodifican con el modelo nuevo
+                hits = dict(zip(keys, texts, strict=True))
+                for key in missing:
+                    hits.pop(key)
+                if hits:
+                    old = np.asarray(encode(list(hits.values())), dtype=np.float32)
+                    new = np.vstack([new, old.reshape(len(hits), -1)])
+                    missing.update(hits)
+            base = len(self._rows)
+            self._vecs = np.vstack([self._vecs, new]) if base else new
+            for i, key in enumerate(missing):
+                self._rows[key] = base + i
+            self.save()
+        if not keys:
+            return np.zeros((0, self._vecs.shape[1]), dtype=np.float32)
+        return self._vecs[[self._rows[k] for k in keys]]
+
+
+class _State:
+    def __init__(self) -> None:
+        self.caches: dict[Path, EmbeddingCache] = {}
+
+
+_state = _State()
+
+
+def embed_texts_cached(texts: list[str]) -> np.ndarray:
+    """``embeddings.embed_texts`` con la caché en disco del modelo activo (backend st)."""
+    if not settings.embeddings_cache or embeddings.ensure_model() != "st":
+        return embeddings.embed_texts(texts)
+    path = cache_path(settings.embeddings_model)
+    cache = _state.caches.get(path)
+    if cache is None:
+        cache = _state.caches[path] = EmbeddingCache(path)
+    return cache.embed(texts, embeddings.embed_texts)
+
+
+def reset() -> None:
+    """Olvida las cachés en memoria (se releen del disco en el siguiente uso)."""
+    _state.caches.clear()
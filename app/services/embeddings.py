@@ -63,10 +63,38 @@ def embed_text(text: str) -> np.ndarray:
     return _placeholder_embed(text)
 
 
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Return a (N, D) embedding matrix for several texts in one backend call.
+
+    Row i matches ``embed_text(texts[i])``. The st backend encodes in batches of
+    ``EMBEDDINGS_BATCH_SIZE``.
+    """
+    if getattr(settings, "embeddings_backend", "placeholder") == "st":
+        if _state.model is None:
+            _init_sentence_transformers(settings.embeddings_model)  # type: ignore[attr-defined]
+        if _state.model is not None:
+            mat = _state.model.encode(  # shape (N, D)
+                list(texts),
+                normalize_embeddings=True,
+                batch_size=settings.embeddings_batch_size,
+            )
+            return np.asarray(mat, dtype=np.float32).reshape(len(texts), -1)
+    if not texts:
+        return np.zeros((0, embedding_dimension()), dtype=np.float32)
+    return np.vstack([_placeholder_embed(t) for t in texts])
+
+
 def backend_name() -> str:
     return getattr(settings, "embeddings_backend", "placeholder")
 
 
+def ensure_model() -> str:
+    """Load the st model if configured; return the effective backend name."""
+    if backend_name() == "st" and _state.model is None:
+        _init_sentence_transformers(settings.embeddings_model)  # type: ignore[attr-defined]
+    return backend_name()
+
+
 def embedding_dimension() -> int:
     if backend_name() == "st" and _state.dim is not None:
         return _state.dim
@@ -85,3 +85,104 @@ def combine_triple(
 
     out.sort(key=lambda x: x[1], reverse=True)
     return out
+
+
+class FusionIndex:
+    """Espacio entero compartido para fusionar señales sin dicts por request.
+
+    Se construye una vez en carga con la unión de ids del clasificador, índice denso,
+    BM25 y taxonomía. ``combine`` equivale a ``combine_triple`` (mismos pesos y
+    tolerancia a ids faltantes) pero suma arrays densos y devuelve solo el top-k vía
+    ``argpartition``. Con ``valid`` (ids de la taxonomía) descarta clases históricas
+    antes de elegir el top-k. ``classes`` (la lista del modelo) se mapea una sola vez
+    en la construcción; el índice es inmutable y se comparte entre threads.
+    """
+
+    def __init__(
+        self, ids: list[str], valid: set[str] | None = None,
+        classes: list[str] | None = None,
+    ) -> None:
+        self.ids = ids
+        self.pos: Dict[str, int] = {cid: i for i, cid in enumerate(ids)}
+        self.valid = (
+            np.fromiter((cid in valid for cid in ids), dtype=bool, count=len(ids))
+            if valid is not None
+            else np.ones(len(ids), dtype=bool)
+        )
+        self._cls_cache: tuple[list[str], np.ndarray] | None = (
+            (classes, self._lookup(classes)[0]) if classes is not None else None
+        )
+
+    @classmethod
+    def build(
+        cls, *id_lists: list[str], valid: set[str] | None = None,
+        classes: list[str] | None = None,
+    ) -> FusionIndex:
+        lists = (classes or [], *id_lists)
+        return cls(list(dict.fromkeys(cid for ids in lists for cid in ids)), valid, classes)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _lookup(self, ids: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Índices enteros de ``ids`` + máscara de los que existen en el espacio."""
+        idx = np.fromiter((self.pos.get(cid, -1) for cid in ids), dtype=np.intp, count=len(ids))
+        return idx, idx >= 0
+
+    def _class_index(self, classes: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # La lista completa del modelo usa el mapeo de la construcción; cualquier otra
+        # (candidatas por request, snapshot de un modelo anterior) se mapea en local
+        cached = self._cls_cache
+        if cached is not None and cached[0] is classes:
+            idx = cached[1]
+        else:
+            idx, _ = self._lookup(classes)
+        return idx, idx >= 0
+
+    def _scatter(self, out: np.ndarray, seen: np.ndarray, scores: List[Tuple[str, float]],
+                 w: float) -> None:
+        if not scores:
+            return
+        idx, ok = self._lookup([cid for cid, _ in scores])
+        vals = np.fromiter((sc for _, sc in scores), dtype=np.float64, count=len(scores))
+        ok &= np.isfinite(vals)
+        out[idx[ok]] += w * vals[ok]
+        seen[idx[ok]] = True
+
+    def combine(
+        self,
+        sem_scores: List[Tuple[str, float]],
+        bm25_scores: List[Tuple[str, float]],
+        cls_scores: np.ndarray,
+        classes: list[str],
+        w_sem: float, w_bm25: float, w_clf: float,
+        k: int,
+    ) -> List[Tuple[str, float]]:
+        ws = max(1e-8, float(w_sem))
+        wb = max(1e-8, float(w_bm25))
+        wc = max(1e-8, float(w_clf))
+        s = ws + wb + wc
+        ws, wb, wc = ws / s, wb / s, wc / s
+
+        n = len(self.ids)
+        fused = np.zeros(n, dtype=np.float64)
+        seen = np.zeros(n, dtype=bool)
+        self._scatter(fused, seen, sem_scores, ws)
+        self._scatter(fused, seen, bm25_scores, wb)
+        cidx, ok = self._class_index(classes)
+        seen[cidx[ok]] = True
+        m = min(len(cidx), int(cls_scores.shape[0]))
+        cidx, ok = cidx[:m], ok[:m]
+        cvals = np.asarray(cls_scores[:m], dtype=np.float64)
+        ok &= np.isfinite(cvals)
+        fused[cidx[ok]] += wc * cvals[ok]
+
+        cand = np.flatnonzero(seen & self.valid)
+        if cand.size == 0 or k <= 0:
+            return []
+        sc = fused[cand]
+        if cand.size > k:
+            part = np.argpartition(-sc, k - 1)[:k]
+            cand, sc = cand[part], sc[part]
+        order = np.argsort(-sc, kind="stable")
+        return [(self.ids[int(cand[i])], float(sc[i])) for i in order]
@@ -0,0 +1,142 @@
+"""Registro versionado de artefactos del clasificador.
+
+Layout::
+
+    models/
+      current                 # nombre de la versión activa (se reemplaza con os.replace)
+      20251014T120000Z/
+        manifest.json         # {"version", "created_at", "files": {nombre: {sha256, bytes}}}
+        tfidf.joblib  lr.joblib  classes.joblib  [calibration.joblib]  metadata.json
+
+Cada versión se escribe en un directorio temporal y se renombra completa, y el
+puntero ``current`` se cambia con un único ``os.replace``: un lector nunca ve una
+versión a medio copiar. Sin ``current`` se usa el layout plano anterior
+(``models/*.joblib``).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+MANIFEST = "manifest.json"
+CURRENT = "current"
+ARTIFACTS = (
+    "tfidf.joblib",
+    "lr.joblib",
+    "lr_calibrated.joblib",
+    "calibration.joblib",
+    "classes.joblib",
+    "metadata.json",
+)
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def current_version(models_dir: str | Path) -> str | None:
+    pointer = Path(models_dir) / CURRENT
+    if not pointer.exists():
+        return None
+    return pointer.read_text(encoding="utf-8").strip() or None
+
+
+def resolve(models_dir: str | Path) -> Path:
+    """Directorio de artefactos activo: ``models/<current>`` o el layout plano."""
+    version = current_version(models_dir)
+    return Path(models_dir) / version if version else Path(models_dir)
+
+
+def list_versions(models_dir: str | Path) -> list[str]:
+    root = Path(models_dir)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / MANIFEST).is_file())
+
+
+def read_manifest(version_dir: str | Path) -> dict | None:
+    path = Path(version_dir) / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def verify(version_dir: str | Path) -> dict | None:
+    """Comprueba tamaños y sha256 del manifest; ``ValueError`` si no cuadran.
+
+    Devuelve el manifest (None en el layout plano, que no tiene).
+    """
+    version_dir = Path(version_dir)
+    manifest = read_manifest(version_dir)
+    if manifest is None:
+        return None
+    for name, meta in manifest.get("files", {}).items():
+        path = version_dir / name
+        if not path.is_file():
+            raise ValueError(f"{version_dir.name}: missing artifact {name}")
+        if path.stat().st_size != meta["bytes"] or _sha256(path) != meta["sha256"]:
+            raise ValueError(f"{version_dir.name}: checksum mismatch for {name}")
+    return manifest
+
+
+def set_current(models_dir: str | Path, version: str) -> None:
+    root = Path(models_dir)
+    if version not in list_versions(root):
+        raise ValueError(f"unknown model version: {version}")
+    _write_atomic(root / CURRENT, version + "\n")
+
+
+def publish(
+    models_dir: str | Path,
+    src_dir: str | Path,
+    version: str | None = None,
+    activate: bool = True,
+) -> str:
+    """Copia los artefactos de ``src_dir`` como nueva versión (y la activa).
+
+    Solo se copian los nombres de ``ARTIFACTS`` presentes en ``src_dir``.
+    """
+    root, src = Path(models_dir), Path(src_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    version = version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    base, n = version, 1
+    while (root / version).exists():
+        n += 1
+        version = f"{base}-{n}"
+    names = [name for name in ARTIFACTS if (src / name).is_file()]
+    if "classes.joblib" not in names or not {"lr.joblib", "lr_calibrated.joblib"} & set(names):
+        raise ValueError(f"{src}: incomplete model artifacts ({names})")
+    tmp = root / f".{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    try:
+        files = {}
+        for name in names:
+            shutil.copy2(src / name, tmp / name)
+            files[name] = {"sha256": _sha256(tmp / name), "bytes": (tmp / name).stat().st_size}
+        manifest = {
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "files": files,
+        }
+        (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, root / version)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if activate:
+        set_current(root, version)
+    return version
@@ -0,0 +1,122 @@
+"""Índice de n-gramas de caracteres para búsqueda de substrings.
+
+Cada texto se descompone en sus n-gramas (trigramas por defecto) y cada n-grama
+guarda la lista ordenada de textos que lo contienen. Un texto que contiene la
+query como substring contiene también todos sus n-gramas, así que la intersección
+de esas listas es un superconjunto exacto de los resultados; ``find`` la verifica
+con ``in``. El coste depende del tamaño de las listas de la query y no del
+número total de textos.
+
+Los n-gramas se codifican como un entero (21 bits por code point, n <= 3) y las
+postings se guardan en formato CSR (``codes`` ordenados, ``ptr``, ``docs``), de
+modo que el índice se construye con operaciones numpy sobre todo el corpus.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+
+# Con menos candidatos que esto se deja de intersecar y se verifica directamente
+_VERIFY_BELOW = 32
+_BITS = 21  # cubre todo el rango Unicode (0x10FFFF)
+
+
+def _codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+
+class NGramIndex:
+    def __init__(self, texts: Sequence[str], n: int = 3) -> None:
+        if not 1 <= n <= 3:
+            raise ValueError(f"n must be in 1..3, got {n}")
+        self.n = n
+        self.texts = list(texts)
+        lens = np.fromiter((len(t) for t in self.texts), dtype=np.int64, count=len(self.texts))
+        cp = _codepoints("".join(self.texts))
+        # Posiciones donde empieza un n-grama completo dentro de su texto
+        doc = np.repeat(np.arange(len(self.texts), dtype=np.int32), lens)
+        ends = np.cumsum(lens)
+        m = max(cp.shape[0] - n + 1, 0)
+        pos = np.arange(m)
+        valid = pos + n <= ends[doc[:m]] if m else np.zeros(0, dtype=bool)
+        codes = self._encode(cp, m)[valid]
+        doc = doc[:m][valid]
+        # Pares (n-grama, texto) únicos, ordenados por n-grama y después por texto
+        order = np.lexsort((doc, codes))
+        codes, doc = codes[order], doc[order]
+        keep = np.ones(codes.shape[0], dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (doc[1:] != doc[:-1])
+        codes, self.docs = codes[keep], doc[keep]
+        first = np.ones(codes.shape[0], dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        starts = np.flatnonzero(first)
+        self.codes = codes[starts]
+        self.ptr = np.append(starts, codes.shape[0]).astype(np.int64)
+
+    def _encode(self, cp: np.ndarray, m: int) -> np.ndarray:
+        codes = np.zeros(m, dtype=np.int64)
+        for j in range(self.n):
+            codes = (codes << _BITS) | cp[j : j + m]
+        return codes
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _postings(self, query: str) -> tuple[list[np.ndarray], int] | None:
+        """Postings de los n-gramas distintos de ``query`` presentes en el índice.
+
+        Devuelve ``(postings, nº de n-gramas de la query)``; ``None`` si la query es
+        más corta que ``n``.
+        """
+        cp = _codepoints(query)
+        m = cp.shape[0] - self.n + 1
+        if m <= 0:
+            return None
+        codes = np.unique(self._encode(cp, m))
+        at = np.searchsorted(self.codes, codes)
+        found = at < self.codes.shape[0]
+        found[found] = self.codes[at[found]] == codes[found]
+        lists = [self.docs[self.ptr[i] : self.ptr[i + 1]] for i in at[found].tolist()]
+        return lists, int(codes.shape[0])
+
+    def candidates(self, query: str) -> np.ndarray | None:
+        """Índices (ascendentes) de textos con todos los n-gramas de ``query``.
+
+        ``None`` si la query es más corta que ``n`` (no hay n-gramas que filtren).
+        """
+        found = self._postings(query)
+        if found is None:
+            return None
+        lists, n_grams = found
+        if len(lists) < n_grams:
+            return np.empty(0, dtype=np.int32)
+        lists.sort(key=len)
+        out = lists[0]
+        for ids in lists[1:]:
+            if out.shape[0] < _VERIFY_BELOW:
+                break
+            out = np.intersect1d(out, ids, assume_unique=True)
+        return out
+
+    def overlap(self, query: str) -> tuple[np.ndarray, int]:
+        """Nº de n-gramas distintos de ``query`` presentes en cada texto.
+
+        Devuelve ``(conteos por texto, nº de n-gramas de la query)``; con una query
+        más corta que ``n`` ambos son cero.
+        """
+        found = self._postings(query)
+        if found is None:
+            return np.zeros(len(self.texts), dtype=np.int64), 0
+        lists, n_grams = found
+        # Cada texto aparece una vez por posting: contar apariciones = n-gramas compartidos
+        docs = np.concatenate(lists) if lists else np.empty(0, dtype=np.int32)
+        return np.bincount(docs, minlength=len(self.texts)), n_grams
+
+    def find(self, query: str) -> list[int]:
+        """Índices (ascendentes) de los textos que contienen ``query``."""
+        cand = self.candidates(query)
+        texts = self.texts
+        if cand is None:
+            return [i for i, text in enumerate(texts) if query in text]
+        return [i for i in cand.tolist() if query in texts[i]]
@@ -0,0 +1,247 @@
+"""Trie de prefijos compacto con top-k precalculado por nodo (autocomplete).
+
+Las claves se guardan ordenadas, así que cada nodo del trie equivale a un rango
+contiguo ``[lo, hi)`` de claves con ese prefijo. Solo se materializan:
+
+* nodos "pesados" (más de ``k`` claves), con su top-k por ``rank``;
+* hijos "ligeros" de un nodo pesado (como mucho ``k`` claves), con todas sus
+  claves ya ordenadas por ``rank``.
+
+Una consulta baja desde la raíz por los nodos pesados (un acceso al dict por
+carácter). Si el prefijo es un nodo, su lista ordenada es la respuesta; si cae
+dentro de un hijo ligero, se acota el rango con búsqueda binaria y se filtra su
+lista (≤ k elementos); si un nodo pesado no tiene ese hijo, no hay resultados.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Sequence
+
+import numpy as np
+
+_MAX_CHAR = "\U0010ffff"
+# (lo, hi, índices del rango ordenados por rank: todos, o el top-k de un nodo pesado)
+Cursor = tuple[int, int, tuple[int, ...]]
+# Hasta este nº de etiquetas, WordPrefixIndex.narrow comprueba el texto directamente
+_NARROW_SCAN = 64
+
+
+class PrefixTrie:
+    def __init__(self, keys: Sequence[str], rank: Sequence[int], k: int = 50) -> None:
+        """``keys`` ordenadas; ``rank``: prioridad por clave (menor = antes)."""
+        self.keys = list(keys)
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.k = k
+        # prefijo -> (lo, hi, índices ordenados por rank: top-k o el rango completo)
+        self._nodes: dict[str, tuple[int, int, tuple[int, ...]]] = {}
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _ranked(self, lo: int, hi: int, k: int | None = None) -> tuple[int, ...]:
+        order = lo + np.argsort(self.rank[lo:hi], kind="stable")
+        return tuple(order[:k].tolist())
+
+    def _build(self) -> None:
+        keys, k = self.keys, self.k
+        stack = [("", 0, len(keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            self._nodes[prefix] = (lo, hi, self._ranked(lo, hi, k))
+            if hi - lo <= k:
+                continue
+            depth = len(prefix)
+            i = lo
+            while i < hi and len(keys[i]) == depth:  # claves == prefijo van primero
+                i += 1
+            while i < hi:
+                child = prefix + keys[i][depth]
+                j = bisect_left(keys, child + _MAX_CHAR, i, hi)
+                stack.append((child, i, j))
+                i = j
+
+    def _find(self, prefix: str) -> tuple[str, tuple[int, int, tuple[int, ...]]] | None:
+        """Nodo materializado más profundo en el camino de ``prefix`` (None: sin claves)."""
+        node, k, nodes = self._nodes[""], self.k, self._nodes
+        depth = 0
+        while depth < len(prefix) and node[1] - node[0] > k:
+            depth += 1
+            node = nodes.get(prefix[:depth])
+            if node is None:
+                return None
+        return prefix[:depth], node
+
+    def range(self, prefix: str) -> tuple[int, int]:
+        """Rango ``[lo, hi)`` de claves que empiezan por ``prefix`` (vacío: lo == hi)."""
+        found = self._find(prefix)
+        if found is None:
+            return 0, 0
+        path, (lo, hi, _) = found
+        if len(path) < len(prefix):
+            lo = bisect_left(self.keys, prefix, lo, hi)
+            hi = bisect_left(self.keys, prefix + _MAX_CHAR, lo, hi)
+        return lo, hi
+
+    def cursor(self, prefix: str, prev: Cursor | None = None) -> Cursor:
+        """Rango de ``prefix`` y sus claves ordenadas por ``rank`` (top-k si es pesado).
+
+        ``prev``: cursor de un prefijo de ``prefix`` (la tecla anterior). El rango se
+        acota con búsqueda binaria dentro del anterior y, si ya era ligero, su lista
+        solo se filtra: ni se baja por el trie desde la raíz ni se vuelve a ordenar.
+        """
+        if prev is None:
+            found = self._find(prefix)
+            if found is None:
+                return 0, 0, ()
+            path, (lo, hi, ranked) = found
+            if len(path) == len(prefix):
+                return lo, hi, ranked
+        else:
+            lo, hi, ranked = prev
+        new_lo = bisect_left(self.keys, prefix, lo, hi)
+        new_hi = bisect_left(self.keys, prefix + _MAX_CHAR, new_lo, hi)
+        if new_hi - new_lo > self.k:
+            # con más de k claves el prefijo es siempre un nodo materializado
+            return self._nodes[prefix]
+        if hi - lo > self.k:  # el anterior era pesado: ``ranked`` no lo cubre entero
+            node = self._nodes.get(prefix)
+            ranked = node[2] if node is not None else self._ranked(new_lo, new_hi)
+            return new_lo, new_hi, ranked
+        return new_lo, new_hi, tuple(i for i in ranked if new_lo <= i < new_hi)
+
+    def top(self, prefix: str, limit: int, cursor: Cursor | None = None) -> list[int]:
+        """Índices de las ``limit`` mejores claves con ese prefijo, por ``rank``.
+
+        ``cursor``: resultado de ``cursor(prefix, ...)``; evita volver a buscar el nodo.
+        """
+        if limit <= 0:
+            return []
+        lo, hi, ranked = cursor if cursor is not None else self.cursor(prefix)
+        if limit <= len(ranked) or hi - lo <= len(ranked):
+            return list(ranked[:limit])
+        return list(self._ranked(lo, hi, limit))
+
+
+class WordPrefixIndex:
+    """Inicios de palabra de cada etiqueta sobre un ``PrefixTrie``.
+
+    Cada palabra es una entrada ``(palabra, etiqueta)`` ordenada por palabra, con
+    rank ``(posición de la palabra, longitud de la etiqueta, rank de la etiqueta)``
+    empaquetado en un int64: el top-k de un nodo son las etiquetas donde el prefijo
+    aparece antes y que son más cortas.
+
+    ``search`` recorre primero ese top-k del primer token verificando el resto de
+    tokens sobre el texto; solo si no basta (tokens muy comunes que rara vez
+    coinciden juntos) cruza los rangos completos con máscaras densas por etiqueta.
+    """
+
+    def __init__(self, texts: Sequence[str], label_rank: Sequence[int], k: int = 50) -> None:
+        """``texts`` normalizados (``preprocessing.normalize``); ``label_rank`` desempata."""
+        self.texts = list(texts)
+        n = len(self.texts)
+        # Textos normalizados: palabras separadas por un único espacio
+        counts = np.fromiter(
+            (t.count(" ") + 1 if t else 0 for t in self.texts), dtype=np.int64, count=n
+        )
+        words = " ".join(self.texts).split()
+        label = np.repeat(np.arange(n, dtype=np.int64), counts)
+        pos = np.arange(len(words)) - np.repeat(np.cumsum(counts) - counts, counts)
+        lens = np.fromiter(map(len, self.texts), dtype=np.int64, count=n)
+        order = np.empty(n, dtype=np.int64)  # posición de cada etiqueta según label_rank
+        order[np.argsort(np.asarray(label_rank, dtype=np.int64), kind="stable")] = np.arange(n)
+        # 20 bits posición | 20 bits longitud | 24 bits orden: únicos por entrada
+        keys = (pos << 44) | ((np.minimum(lens, (1 << 20) - 1) << 24) | order)[label]
+        sort = np.argsort(np.asarray(words, dtype=str), kind="stable")
+        self.label = label[sort].astype(np.int32)
+        self.trie = PrefixTrie([words[i] for i in sort.tolist()], keys[sort], k=k)
+
+    def search(
+        self, tokens: Sequence[str], limit: int, exclude: set[int] = frozenset()
+    ) -> list[int]:
+        """Etiquetas con una palabra que empieza por cada token, sin las de ``exclude``.
+
+        Orden: la palabra que casa con el primer token (posición, longitud).
+        """
+        if not tokens or limit <= 0:
+            return []
+        lo, hi = self.trie.range(tokens[0])
+        if lo == hi:
+            return []
+        rest = tokens[1:]
+        entries = self.trie.top(tokens[0], self.trie.k)
+        out = self._labels(entries, limit, exclude, rest)
+        if len(out) >= limit or len(entries) == hi - lo:
+            return out
+        idx = np.arange(lo, hi)
+        if rest:
+            idx = idx[self._mask(rest)[self.label[lo:hi]]]
+        rank = self.trie.rank[idx]
+        want = 4 * (limit + len(exclude))  # margen para etiquetas repetidas / excluidas
+        if idx.shape[0] > want:
+            part = np.argpartition(rank, want)[:want]
+            out = self._labels(idx[part[np.argsort(rank[part])]].tolist(), limit, exclude)
+            if len(out) >= limit:
+                return out
+        return self._labels(idx[np.argsort(rank)].tolist(), limit, exclude)
+
+    def matches(self, tokens: Sequence[str]) -> np.ndarray:
+        """Todas las etiquetas que casan con ``tokens``, en el orden de ``search``.
+
+        Coste proporcional al rango del primer token (sin atajo por el top-k).
+        """
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+        lo, hi = self.trie.range(tokens[0])
+        idx = np.arange(lo, hi)
+        if len(tokens) > 1:
+            idx = idx[self._mask(tokens[1:])[self.label[lo:hi]]]
+        labels = self.label[idx[np.argsort(self.trie.rank[idx])]]
+        _, first = np.unique(labels, return_index=True)
+        return labels[np.sort(first)]
+
+    def narrow(self, labels: np.ndarray, tokens: Sequence[str]) -> np.ndarray:
+        """``labels`` (salida de ``matches``) que además casan con ``tokens``.
+
+        Mantiene el orden, así que vale para una query que solo cambia o añade
+        tokens a partir del segundo: el primero, que fija el orden, es el mismo.
+        """
+        if len(labels) <= _NARROW_SCAN:
+            # Pocas etiquetas: comprobar el texto sale más barato que las máscaras
+            texts = self.texts
+            keep = [
+                all(any(w.startswith(t) for w in texts[label].split()) for t in tokens)
+                for label in labels.tolist()
+            ]
+            return labels[np.asarray(keep, dtype=bool)]
+        return labels[self._mask(tokens)[labels]]
+
+    def _mask(self, tokens: Sequence[str]) -> np.ndarray:
+        """Máscara por etiqueta: tiene una palabra que empieza por cada token."""
+        keep = np.ones(len(self.texts), dtype=bool)
+        for tok in tokens:
+            a, b = self.trie.range(tok)
+            mask = np.zeros(len(self.texts), dtype=bool)
+            mask[self.label[a:b]] = True
+            keep &= mask
+        return keep
+
+    def _labels(
+        self, entries: Sequence[int], limit: int, exclude: set[int], rest: Sequence[str] = ()
+    ) -> list[int]:
+        """Etiquetas distintas de ``entries`` (en orden) que contienen los tokens ``rest``."""
+        out: list[int] = []
+        seen = set(exclude)
+        for e in entries:
+            label = int(self.label[e])
+            if label in seen:
+                continue
+            seen.add(label)
+            if rest:
+                words = self.texts[label].split()
+                if not all(any(w.startswith(t) for w in words) for t in rest):
+                    continue
+            out.append(label)
+            if len(out) >= limit:
+                break
+        return out
@@ -1,8 +1,14 @@
 from __future__ import annotations
 import re, unicodedata
+from functools import lru_cache
 _ws = re.compile(r"\s+")
 _non_alnum = re.compile(r"[^0-9a-záéíóúüñ ]", flags=re.IGNORECASE)
 
+# Tamaño del memo de normalize(): etiquetas de taxonomía + queries repetidas
+_CACHE_SIZE = 1 << 16
+# Textos más largos no se memorizan: acota la memoria del memo (~65k x 256 chars)
+_CACHE_MAX_CHARS = 256
+
 def _strip_accents(s: str) -> str:
     # NFKD + remove combining marks
     nk = unicodedata.normalize("NFKD", s)
@@ -14,6 +20,54 @@ def _simple_singular(token: str) -> str:
         return token[:-1]
     return token
 
+
+class _CharTable(dict):
+    """Tabla ``str.translate`` que se rellena bajo demanda, un carácter cada vez.
+
+    Cada carácter se clasifica con ``_non_alnum`` (-> espacio) y, con ``accents``,
+    se le aplica ``_strip_accents``: mismas reglas que la versión con regex, pero
+    evaluadas una sola vez por carácter distinto. Los caracteres que sobreviven
+    nunca son espacios ni desaparecen, así que filtrar antes o después de colapsar
+    espacios da el mismo resultado.
+    """
+
+    def __init__(self, accents: bool) -> None:
+        super().__init__()
+        self.accents = accents
+
+    def __missing__(self, code: int) -> str:
+        ch = chr(code)
+        if _non_alnum.match(ch):
+            out = " "
+        else:
+            out = _strip_accents(ch) if self.accents else ch
+        self[code] = out
+        return out
+
+
+_tables = {True: _CharTable(True), False: _CharTable(False)}
+# ASCII: minúsculas + no alfanumérico -> espacio en un solo bytes.translate
+_ascii_table = bytes(
+    c + 32 if 65 <= c <= 90 else c if 48 <= c <= 57 or 97 <= c <= 122 else 32
+    for c in range(256)
+)
+
+
+def _normalize_uncached(text: str, accents: bool, singular: bool) -> str:
+    if text.isascii():
+        # NFKC y strip de acentos son la identidad en ASCII
+        tokens = text.encode("ascii").translate(_ascii_table).decode("ascii").split()
+    else:
+        text = unicodedata.normalize("NFKC", text).lower()
+        tokens = text.translate(_tables[accents]).split()
+    if singular:
+        tokens = [_simple_singular(tok) for tok in tokens]
+    return " ".join(tokens)
+
+
+_normalize = lru_cache(maxsize=_CACHE_SIZE)(_normalize_uncached)
+
+
 def normalize(text: str, *, accents: bool = True, singular: bool = True) -> str:
     """Normalización expandida para búsqueda / embeddings.
     - Unicode NFKC
@@ -21,12 +75,11 @@ def normalize(text: str, *, accents: bool = True, singular: bool = True) -> str:
     - Strip espacios
     - Remove chars no alfanum (mantiene acentos primarios, luego opcionalmente se quitan)
     - Singularización muy simple (quitar 's' final) para heurística plural->singular
+
+    Implementado con tablas ``translate`` (vía rápida para ASCII) y un memo LRU
+    acotado en entradas y en longitud de texto; la salida es idéntica a la de la
+    versión con regex.
     """
-    text = unicodedata.normalize("NFKC", text).lower()
-    text = _non_alnum.sub(" ", text)
-    text = _ws.sub(" ", text).strip()
-    if accents:
-        text = _strip_accents(text)
-    if singular:
-        text = " ".join(_simple_singular(tok) for tok in text.split())
-    return text
+    if len(text) > _CACHE_MAX_CHARS:
+        return _normalize_uncached(text, bool(accents), bool(singular))
+    return _normalize(text, bool(accents), bool(singular))
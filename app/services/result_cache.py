@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from app import observability as obs
+from app.core.settings import settings
+
+# Caché LRU+TTL en proceso para resultados de /classify.
+# Las claves incluyen la generación de artefactos: ``invalidate()`` (llamado desde
+# /admin/reload) la incrementa, de modo que ninguna entrada previa vuelve a servirse.
+
+
+class TTLCache:
+    def __init__(self, max_size: int, ttl_s: float, *, metrics: bool = True) -> None:
+        """``metrics``: contar hits/misses/evictions en las métricas de /classify."""
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.metrics = metrics
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        if self.max_size <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < now:  # expirada
+                del self._data[key]
+                item = None
+            if item is None:
+                if self.metrics and obs.CLASSIFY_CACHE_MISSES:
+                    obs.CLASSIFY_CACHE_MISSES.inc()
+                return None
+            self._data.move_to_end(key)
+        if self.metrics and obs.CLASSIFY_CACHE_HITS:
+            obs.CLASSIFY_CACHE_HITS.inc()
+        return item[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        expires = time.monotonic() + self.ttl_s
+        evicted = 0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted and self.metrics and obs.CLASSIFY_CACHE_EVICTIONS:
+            obs.CLASSIFY_CACHE_EVICTIONS.inc(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _CacheState:
+    def __init__(self) -> None:
+        self.cache = TTLCache(settings.classify_cache_size, settings.classify_cache_ttl_s)
+        self.generation = 0
+
+
+_state = _CacheState()
+
+
+def generation() -> int:
+    """Id de generación de artefactos vigente (parte de la clave de caché)."""
+    return _state.generation
+
+
+def get(key: Hashable) -> Any | None:
+    return _state.cache.get(key)
+
+
+def put(key: Hashable, value: Any) -> None:
+    _state.cache.put(key, value)
+
+
+def invalidate() -> int:
+    _state.generation += 1
+    _state.cache.clear()
+    print(f"[result_cache] invalidated generation={_state.generation}")
+    return _state.generation
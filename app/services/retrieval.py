@@ -1,37 +1,114 @@
 from __future__ import annotations
 # ruff: noqa: I001
 
+from collections.abc import Sequence
+
 import numpy as np
 
-from app.services.embeddings import embed_text
+from app.core.settings import settings
+from app.services import dense_index
+from app.services.embeddings import embed_text, embed_texts
+
+class _LangIndex:
+    def __init__(self, index, ids: Sequence[str]) -> None:
+        self.index: dense_index.BruteForceIndex | dense_index.FaissIndex = index
+        self.ids = ids
+
 
 class _RetrievalState:
-    embeddings: np.ndarray | None = None
-    ids: list[str] = []
+    # lang -> índice residente; cargar un idioma nunca desaloja a otro
+    indexes: dict[str, _LangIndex] = {}
 
 
 _state = _RetrievalState()
 
-def load_index(embeddings_path: str, ids_path: str) -> None:
-    _state.embeddings = np.load(embeddings_path)
-    _state.ids = list(np.load(ids_path, allow_pickle=True))
+def _load_ids(ids_path: str, n_rows: int) -> Sequence[str]:
+    if settings.dense_index_mmap:
+        table = dense_index.open_string_table(ids_path)
+        if table is not None and len(table) == n_rows:
+            return table
+        if table is not None:
+            print(f"[retrieval] string table len={len(table)} != {n_rows} rows; using {ids_path}")
+    return list(np.load(ids_path, allow_pickle=True))
+
+def load_index(
+    embeddings_path: str,
+    ids_path: str,
+    backend: str | None = None,
+    lang: str | None = None,
+) -> None:
+    lang = lang or settings.default_lang
+    # Formato mmap: la matriz normalizada vive en el page cache, compartida entre workers.
+    # Si no existe, el índice guarda su propia copia normalizada/cuantizada.
+    normalized = dense_index.open_normalized(embeddings_path) if settings.dense_index_mmap else None
+    embeddings = normalized if normalized is not None else np.load(embeddings_path, mmap_mode="r")
+    ids = _load_ids(ids_path, int(embeddings.shape[0]))
+    index = dense_index.open_index(
+        embeddings,
+        embeddings_path,
+        backend or settings.dense_index_backend,
+        hnsw_ef_search=settings.dense_hnsw_ef_search,
+        ivf_nprobe=settings.dense_ivf_nprobe,
+        dtype=settings.dense_index_dtype,
+        normalized=normalized is not None,
+    )
+    _state.indexes = {**_state.indexes, lang: _LangIndex(index, ids)}  # swap atómico
     print(
-        f"[retrieval] loaded: {embeddings_path} shape={_state.embeddings.shape} "
-        f"ids={len(_state.ids)}"
+        f"[retrieval] loaded lang={lang}: {embeddings_path} shape={embeddings.shape} "
+        f"ids={len(ids)} backend={index.kind} mmap={normalized is not None}"
     )
 
-def reset_index() -> None:
-    _state.embeddings = None
-    _state.ids = []
-    print("[retrieval] reset_index()")
+def load_lang(lang: str, data_dir: str | None = None) -> None:
+    """Carga el índice de ``lang`` desde las rutas estándar si aún no está residente."""
+    if lang in _state.indexes:
+        return
+    data_dir = data_dir or settings.data_dir
+    load_index(f"{data_dir}/class_embeddings_{lang}.npy", f"{data_dir}/class_ids.npy", lang=lang)
+
+def reset_index(lang: str | None = None) -> None:
+    if lang is None:
+        _state.indexes = {}
+        print("[retrieval] reset_index()")
+    else:
+        _state.indexes = {k: v for k, v in _state.indexes.items() if k != lang}
+        print(f"[retrieval] reset_index(lang={lang})")
+
+def is_loaded(lang: str) -> bool:
+    return lang in _state.indexes
+
+def loaded_langs() -> list[str]:
+    return list(_state.indexes)
+
+def _get(lang: str | None) -> _LangIndex:
+    entry = _state.indexes.get(lang or settings.default_lang)
+    assert entry is not None, f"Index not loaded (lang={lang or settings.default_lang})"
+    return entry
+
+def index_ids(lang: str | None = None) -> Sequence[str]:
+    entry = _state.indexes.get(lang or settings.default_lang)
+    return entry.ids if entry is not None else []
 
 def embed_query(text: str) -> np.ndarray:
     return embed_text(text)
 
-def topk(q_emb: np.ndarray, k: int = 20):
-    assert _state.embeddings is not None, "Index not loaded"
-    den_q = float(np.linalg.norm(q_emb) + 1e-8)
-    den_m = np.linalg.norm(_state.embeddings, axis=1) + 1e-8
-    sims = (_state.embeddings @ q_emb) / (den_m * den_q)
-    idx = np.argsort(-sims)[:k]
-    return [(_state.ids[i], float(sims[i])) for i in idx]
+def embed_queries(texts: list[str]) -> np.ndarray:
+    return embed_texts(texts)
+
+def _pairs(ids: Sequence[str], sims: np.ndarray, idx: np.ndarray) -> list[tuple[str, float]]:
+    # faiss devuelve -1 cuando un índice aproximado no llena los k huecos
+    return [(ids[int(i)], float(s)) for s, i in zip(sims, idx, strict=True) if i >= 0]
+
+def topk(q_emb: np.ndarray, k: int = 20, lang: str | None = None):
+    entry = _get(lang)
+    sims, idx = entry.index.search(q_emb, k)
+    return _pairs(entry.ids, sims[0], idx[0])
+
+def topk_batch(
+    q_embs: np.ndarray, k: int = 20, lang: str | None = None
+) -> list[list[tuple[str, float]]]:
+    """Igual que ``topk`` para una matriz (B, D) de queries con una sola búsqueda."""
+    entry = _get(lang)
+    if q_embs.shape[0] == 0:
+        return []
+    sims, idx = entry.index.search(q_embs, k)
+    return [_pairs(entry.ids, s, i) for s, i in zip(sims, idx, strict=True)]
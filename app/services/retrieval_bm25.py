@@ -1,9 +1,15 @@
 from __future__ import annotations
 from typing import List, Tuple, Dict
-from rank_bm25 import BM25Okapi
+from array import array
+from collections import Counter
+import hashlib
+import math
 import re, json
 from pathlib import Path
+import numpy as np
+from app.core.settings import settings
 from app.services import preprocessing
+from app.services.dense_index import StringTable, encode_strings
 
 # Pesos por campo (alineables con embeddings)
 FIELD_WEIGHTS = {
@@ -17,7 +23,168 @@ FIELD_WEIGHTS = {
     "path":       1.2,
 }
 
-_bm25_idx: Dict[str, BM25Okapi] = {}   # lang -> index
+# Subir al cambiar _tokenize/_doc_pieces/preprocessing.normalize: invalida los índices persistidos
+TOKENIZER_VERSION = 2  # 2: BM25F (tf por campo, sin repetición de texto)
+# Subir al cambiar los arrays de SparseBM25F.to_arrays
+INDEX_FORMAT = 2  # 2: máscara de campos por (término, doc) + tf crudos
+
+def _okapi_idf(df: np.ndarray, n_docs: int, epsilon: float) -> np.ndarray:
+    # Mismo cálculo que BM25Okapi._calc_idf: idf<0 se sustituye por eps*avg_idf
+    idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+    if idf.size:
+        eps = epsilon * (math.fsum(idf.tolist()) / idf.size)
+        idf = np.where(idf < 0, eps, idf)
+    return idf
+
+
+def _uint(max_value: int):
+    """Menor dtype sin signo que representa ``max_value``."""
+    for dt in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dt).max:
+            return dt
+    return np.uint64
+
+
+class SparseBM25F:
+    """BM25F: tf por campo normalizado por la longitud del campo, pesos en scoring.
+
+    ``tf~(t,d) = sum_f w_f * tf_f(t,d) / (1 - b + b * len_f(d) / avglen_f)`` y
+    ``score = sum_t idf(t) * tf~ (k1+1) / (tf~ + k1)`` con el idf de ``BM25Okapi``
+    (frecuencia documental sobre cualquier campo). Con un único campo de peso 1 es
+    exactamente BM25 Okapi. Postings agrupadas por término y ordenadas por documento:
+    una entrada por par (término, documento) con el documento (int32), el impacto
+    final (float32) y una máscara de bits de los campos donde aparece; los tf crudos
+    de esos campos van aparte, en orden de campo (uint8 salvo tf enormes). Así
+    ``set_field_weights`` cambia los pesos sin reconstruir: recalcula (vectorizado) el
+    impacto de cada par.
+    """
+
+    def __init__(self, corpus: List[Dict[str, List[str]]], field_weights: Dict[str, float],
+                 k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> None:
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        self.fields = list(field_weights)
+        if len(self.fields) > 64:
+            raise ValueError(f"SparseBM25F supports up to 64 fields, got {len(self.fields)}")
+        self.corpus_size = len(corpus)
+        self.vocab: Dict[str, int] = {}
+        fpos = {f: i for i, f in enumerate(self.fields)}
+        terms, docs, flds, tfs = array("i"), array("i"), array("b"), array("i")
+        flen = np.zeros((len(self.fields), self.corpus_size), dtype=np.int64)
+        for d, doc in enumerate(corpus):
+            for fname, tokens in doc.items():
+                f = fpos[fname]
+                flen[f, d] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                    docs.append(d)
+                    flds.append(f)
+                    tfs.append(tf)
+        term = np.frombuffer(terms, dtype=np.int32)
+        doc = np.frombuffer(docs, dtype=np.int32)
+        fld = np.frombuffer(flds, dtype=np.int8)
+        order = np.lexsort((fld, doc, term))  # término, documento, campo
+        term, doc, fld = term[order], doc[order], fld[order]
+        tf = np.frombuffer(tfs, dtype=np.int32)[order]
+        self.tf = tf.astype(_uint(int(tf.max()) if tf.size else 0))
+        self.flen = flen.astype(_uint(int(flen.max()) if flen.size else 0))
+        # Grupos (término, documento): postings contiguas del mismo doc en varios campos
+        first = np.ones(term.shape[0], dtype=bool)
+        first[1:] = (term[1:] != term[:-1]) | (doc[1:] != doc[:-1])
+        starts = np.flatnonzero(first)
+        self.gdocs = doc[starts]
+        mask_dt = _uint((1 << len(self.fields)) - 1)
+        bits = np.left_shift(np.ones(1, dtype=mask_dt), fld.astype(mask_dt))
+        self.gmask = (np.bitwise_or.reduceat(bits, starts) if starts.size
+                      else np.zeros(0, dtype=mask_dt))
+        self.gptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term[starts], minlength=len(self.vocab)), out=self.gptr[1:])
+        self.idf = _okapi_idf(np.diff(self.gptr), self.corpus_size, epsilon)
+        self.weights = np.ones(len(self.fields), dtype=np.float64)
+        self.set_field_weights(field_weights)
+
+    @property
+    def avglen(self) -> np.ndarray:
+        if not self.corpus_size:
+            return np.zeros(len(self.fields))
+        return self.flen.mean(axis=1)
+
+    def _compile(self) -> None:
+        """Impacto por (término, doc) = idf * saturación(tf~)."""
+        k1, b = self.k1, self.b
+        n_groups = self.gdocs.shape[0]
+        if n_groups == 0:
+            self.impact = np.zeros(0, dtype=np.float32)
+            return
+        # (grupo, campo) de cada tf: bits de la máscara en orden de grupo y de campo
+        n_fields = len(self.fields)
+        shifts = np.arange(n_fields, dtype=self.gmask.dtype)
+        bits = ((self.gmask[:, None] >> shifts) & 1).astype(bool)
+        g, f = np.divmod(np.flatnonzero(bits), n_fields)
+        avg = self.avglen
+        norm = 1 - b + b * self.flen / np.where(avg > 0, avg, 1.0)[:, None]
+        contrib = self.weights[f] * self.tf / norm[f, self.gdocs[g]]
+        tf = np.bincount(g, weights=contrib, minlength=n_groups)
+        gterm = np.repeat(np.arange(self.gptr.shape[0] - 1), np.diff(self.gptr))
+        self.impact = (self.idf[gterm] * tf * (k1 + 1) / (tf + k1)).astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in (self.gptr, self.gdocs, self.gmask, self.tf,
+                                          self.flen, self.idf, self.impact)))
+
+    def set_field_weights(self, field_weights: Dict[str, float]) -> None:
+        """Cambia pesos por campo en caliente (campos no indexados se ignoran)."""
+        for fname, w in field_weights.items():
+            if fname in self.fields:
+                self.weights[self.fields.index(fname)] = float(w)
+        self._compile()
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays planos (sin pickle) para ``np.savez``; inverso de ``from_arrays``."""
+        # vocab se rellena en orden de fila, así que list(vocab)[i] es el término i
+        terms_offsets, terms_blob = encode_strings(list(self.vocab))
+        fields_offsets, fields_blob = encode_strings(self.fields)
+        return {
+            "terms_offsets": terms_offsets,
+            "terms_blob": terms_blob,
+            "fields_offsets": fields_offsets,
+            "fields_blob": fields_blob,
+            "weights": self.weights,
+            "gptr": self.gptr,
+            "gdocs": self.gdocs,
+            "gmask": self.gmask,
+            "tf": self.tf,
+            "flen": self.flen,
+            "idf": self.idf,
+            "params": np.array([self.k1, self.b, self.epsilon, self.corpus_size], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrs) -> SparseBM25F:
+        obj = cls.__new__(cls)
+        k1, b, eps, n = (float(x) for x in arrs["params"])
+        obj.k1, obj.b, obj.epsilon, obj.corpus_size = k1, b, eps, int(n)
+        terms = list(StringTable(arrs["terms_offsets"], arrs["terms_blob"]))
+        obj.fields = list(StringTable(arrs["fields_offsets"], arrs["fields_blob"]))
+        obj.vocab = dict(zip(terms, range(len(terms)), strict=True))
+        for name in ("gptr", "gdocs", "gmask", "tf", "flen", "idf"):
+            setattr(obj, name, arrs[name])
+        obj.weights = arrs["weights"].astype(np.float64)
+        obj._compile()
+        return obj
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        scores = np.zeros(self.corpus_size)
+        for w, count in Counter(query).items():
+            t = self.vocab.get(w)
+            if t is None:
+                continue
+            lo, hi = self.gptr[t], self.gptr[t + 1]
+            scores[self.gdocs[lo:hi]] += count * self.impact[lo:hi]
+        return scores
+
+
+_bm25_idx: Dict[str, SparseBM25F] = {}   # lang -> index
 _bm25_ids: Dict[str, List[str]] = {}   # lang -> ids
 
 _token = re.compile(r"\w+", flags=re.UNICODE)
@@ -35,30 +202,89 @@ def _tokenize(s: str) -> List[str]:
     s = preprocessing.normalize(s)
     return _token.findall(s)
 
-def _doc_pieces(row: dict, lang: str) -> List[str]:
-    pieces: List[str] = []
-    for fname, w in FIELD_WEIGHTS.items():
+def _field_weights() -> Dict[str, float]:
+    weights = dict(FIELD_WEIGHTS)
+    for item in settings.bm25_field_weights.split(","):
+        name, _, value = item.partition(":")
+        if name.strip() in weights and value.strip():
+            weights[name.strip()] = float(value)
+    return weights
+
+def _doc_fields(row: dict, lang: str) -> Dict[str, List[str]]:
+    """Tokens por campo (sin repetición: el peso se aplica en scoring, ver SparseBM25F)."""
+    fields: Dict[str, List[str]] = {}
+    for fname in FIELD_WEIGHTS:
+        tokens: List[str] = []
         for piece in _to_list(row.get(fname), lang):
-            if not piece: continue
-            repeat = max(1, int(round(w * 2)))  # ponderación simple por repetición
-            pieces.extend([piece] * repeat)
-    return pieces or [row.get("id", "")]
+            if piece:
+                tokens.extend(_tokenize(piece))
+        if tokens:
+            fields[fname] = tokens
+    if not fields:  # sin texto: el id hace de etiqueta (como antes)
+        fields["prefLabel"] = _tokenize(str(row.get("id", ""))) or [""]
+    return fields
+
+def _cache_key(raw: bytes) -> str:
+    # Los pesos por campo no forman parte de la clave: se aplican al puntuar
+    fields = json.dumps(list(FIELD_WEIGHTS)).encode()
+    h = hashlib.sha256(raw)
+    h.update(fields)
+    return f"{h.hexdigest()[:32]}-tok{TOKENIZER_VERSION}-fmt{INDEX_FORMAT}"
+
+def cache_path(lang: str, taxonomy_path: str) -> Path:
+    base = Path(settings.bm25_cache_dir) if settings.bm25_cache_dir else (
+        Path(taxonomy_path).parent / "cache"
+    )
+    return base / f"bm25_{lang}.npz"
+
+def _load_cached(path: Path, key: str) -> Tuple[SparseBM25F, List[str]] | None:
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["key"]) != key:
+                return None
+            idx = SparseBM25F.from_arrays(z)
+            idx.set_field_weights(_field_weights())
+            return idx, list(StringTable(z["ids_offsets"], z["ids_blob"]))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[bm25] cache {path} unreadable ({e}); rebuilding")
+        return None
+
+def _save_cached(path: Path, key: str, idx: SparseBM25F, ids: List[str]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        ids_offsets, ids_blob = encode_strings(ids)
+        with open(tmp, "wb") as fh:
+            np.savez(fh, key=np.array(key), ids_offsets=ids_offsets, ids_blob=ids_blob,
+                     **idx.to_arrays())
+        tmp.replace(path)  # atómico: otro worker nunca lee un fichero a medias
+    except OSError as e:
+        print(f"[bm25] could not persist {path} ({e})")
 
 def build_or_get(lang: str, taxonomy_path: str = "data/taxonomy.json") -> None:
     if lang in _bm25_idx:
         return
-    data = json.loads(Path(taxonomy_path).read_text(encoding="utf-8"))
-    docs_tokens: List[List[str]] = []
+    raw = Path(taxonomy_path).read_bytes()
+    key = _cache_key(raw)
+    path = cache_path(lang, taxonomy_path)
+    cached = _load_cached(path, key) if settings.bm25_cache else None
+    if cached is not None:
+        _bm25_idx[lang], _bm25_ids[lang] = cached
+        print(f"[bm25] loaded {path} lang={lang} docs={len(_bm25_ids[lang])}")
+        return
+    data = json.loads(raw.decode("utf-8"))
+    docs_fields: List[Dict[str, List[str]]] = []
     ids: List[str] = []
     for row in data:
         ids.append(str(row["id"]))
-        tokens: List[str] = []
-        for chunk in _doc_pieces(row, lang):
-            tokens.extend(_tokenize(chunk))
-        docs_tokens.append(tokens if tokens else [""])
+        docs_fields.append(_doc_fields(row, lang))
     _bm25_ids[lang] = ids
-    _bm25_idx[lang] = BM25Okapi(docs_tokens)
+    _bm25_idx[lang] = SparseBM25F(docs_fields, _field_weights())
     print(f"[bm25] built for lang={lang} docs={len(ids)}")
+    if settings.bm25_cache:
+        _save_cached(path, key, _bm25_idx[lang], ids)
 
 def reset(lang: str | None = None) -> None:
     if lang is None:
@@ -68,18 +294,42 @@ def reset(lang: str | None = None) -> None:
         _bm25_idx.pop(lang, None); _bm25_ids.pop(lang, None)
         print(f"[bm25] reset lang={lang}")
 
-def topk(query: str, lang: str, k: int = 20) -> List[Tuple[str, float]]:
-    assert lang in _bm25_idx, "BM25 index not built"
-    tok = _tokenize(query)
-    scores = _bm25_idx[lang].get_scores(tok)  # numpy array
-    if len(scores) == 0:
+def set_field_weights(weights: Dict[str, float], lang: str | None = None) -> None:
+    """Ajusta ``FIELD_WEIGHTS`` de los índices cargados sin reconstruirlos."""
+    for lg, idx in _bm25_idx.items():
+        if lang is None or lg == lang:
+            idx.set_field_weights(weights)
+
+def index_ids(lang: str) -> List[str]:
+    return _bm25_ids.get(lang, [])
+
+def _ranked(scores, ids: List[str], k: int) -> List[Tuple[str, float]]:
+    if len(scores) == 0 or k <= 0:
         return []
-    import numpy as np
-    idx = np.argsort(-scores)[:k]
+    k = min(k, len(scores))
+    if k < len(scores):
+        # a igualdad con el k-ésimo score gana el documento de menor índice (determinista)
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        cand = np.concatenate([above, np.flatnonzero(scores == kth)[: k - above.shape[0]]])
+    else:
+        cand = np.arange(len(scores))
+    # score desc; a igualdad, orden de documento
+    idx = cand[np.lexsort((cand, -scores[cand]))]
     mx = float(scores[idx[0]]) if scores[idx[0]] > 0 else 1.0
-    ids = _bm25_ids[lang]
     out: List[Tuple[str, float]] = []
     for i in idx:
         sc = float(scores[i]) / (mx if mx != 0 else 1.0)
         out.append((ids[int(i)], sc))
     return out
+
+def topk(query: str, lang: str, k: int = 20) -> List[Tuple[str, float]]:
+    assert lang in _bm25_idx, "BM25 index not built"
+    scores = _bm25_idx[lang].get_scores(_tokenize(query))
+    return _ranked(scores, _bm25_ids[lang], k)
+
+def topk_batch(queries: List[str], lang: str, k: int = 20) -> List[List[Tuple[str, float]]]:
+    """Versión batch de ``topk`` (mismo índice para todas las queries)."""
+    assert lang in _bm25_idx, "BM25 index not built"
+    idx = _bm25_idx[lang]
+    return [_ranked(idx.get_scores(_tokenize(q)), _bm25_ids[lang], k) for q in queries]
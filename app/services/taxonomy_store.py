@@ -3,22 +3,34 @@ from __future__ import annotations
 # ruff: noqa: E741,N815
 
 import json
+import re
+import secrets
+from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 import numpy as np
 
 from app.core.settings import settings
 from app.services.embeddings import embed_text
 from . import preprocessing
+from .ngram_index import NGramIndex
+from .prefix_trie import Cursor, PrefixTrie, WordPrefixIndex
+from .result_cache import TTLCache
 from app import observability as obs
 try:  # optional fuzzy dependency
-    from rapidfuzz import fuzz  # type: ignore
+    from rapidfuzz import fuzz, process  # type: ignore
 except ImportError:  # pragma: no cover
     fuzz = None  # type: ignore
+    process = None  # type: ignore
 
 DEFAULT_LANGS = ("es","en")
+# Top-k precalculado por nodo del trie de autocomplete (= límite máximo del endpoint)
+AC_TOP_K = 50
+# Máximo de coincidencias por inicio de palabra que guarda una sesión de autocomplete
+AC_SESSION_WORDS = 4096
+_FEEDBACK_FILE = re.compile(r"^\d{4}-\d{2}-\d{2}\.jsonl$")
 
 def _as_lang_dict(value: Any, langs=DEFAULT_LANGS) -> dict[str, Any]:
     """Normaliza valores multilingües a dict[lang, value]."""
@@ -52,26 +64,91 @@ class Concept:
     closeMatch: list[str]
     related: list[str]
 
+class AutocompleteHit(NamedTuple):
+    concept_id: str
+    label: str
+    kind: str  # pref | alt
+    norm: str  # etiqueta normalizada (clave del trie)
+
+
+def load_popularity(feedback_dir: str | Path) -> Counter[str]:
+    """Nº de feedbacks por concepto (``correct_id`` o, si falta, ``predicted_id``).
+
+    Lee solo los ficheros diarios ``YYYY-MM-DD.jsonl`` (no los consolidados).
+    """
+    counts: Counter[str] = Counter()
+    root = Path(feedback_dir)
+    if not root.is_dir():
+        return counts
+    for path in sorted(root.glob("*.jsonl")):
+        if not _FEEDBACK_FILE.match(path.name):
+            continue
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(row, dict):
+                continue
+            cid = row.get("correct_id") or row.get("predicted_id")
+            if cid:
+                counts[str(cid)] += 1
+    return counts
+
+
+@dataclass
+class _AcSession:
+    """Estado de una sesión de autocomplete tras la última tecla (``autocomplete_session``)."""
+    lang: str
+    norm: str                # query normalizada
+    node: Cursor             # PrefixTrie.cursor de la query en _ac_trie[lang]
+    # Query de varias palabras: todas sus coincidencias por inicio de palabra, en orden
+    words: np.ndarray | None
+
+@dataclass
+class _NormFields:
+    """Formas normalizadas de los campos de un concepto en un idioma (ver ``search``)."""
+    pref: str                 # prefLabel del idioma ("" si falta)
+    pref_any: str             # prefLabel con fallback al primer idioma (fuzzy / autocomplete)
+    alt: tuple[str, ...]
+    hidden: tuple[str, ...]
+    path: tuple[str, ...]
+    context: tuple[str, ...]  # definition / scopeNote / note no vacíos
+    example: tuple[str, ...]
+
 class TaxonomyStore:
     def __init__(self, path: str):
         self.path = Path(path)
         self.concepts: dict[str, Concept] = {}
         self._inv: dict[str, dict[str, list[str]]] = {}
+        # lang -> [(clave normalizada, concept_ids)] en el orden de _inv
+        self._inv_norm: dict[str, list[tuple[str, list[str]]]] = {}
+        # lang -> índice de trigramas sobre las claves de _inv_norm (candidatos de search)
+        self._inv_grams: dict[str, NGramIndex] = {}
+        # lang -> ids de concepto y bigramas de su prefLabel normalizado (prefiltro fuzzy)
+        self._pref_ids: dict[str, list[str]] = {}
+        self._pref_grams: dict[str, NGramIndex] = {}
+        # lang -> cid -> campos normalizados (calculados una vez en load)
+        self._norm: dict[str, dict[str, _NormFields]] = {}
         # Embedding precompute structures
         self._emb_lang_mats: dict[str, np.ndarray] = {}  # lang -> matrix (N_texts, D)
         # lang -> list of (concept_id, field, original_text)
         self._emb_lang_text_meta: dict[str, list[tuple[str, str, str]]] = {}
-        # cid -> {lang: row_index for its prefLabel}
-        self._emb_concept_pref_index: dict[str, dict[str, int]] = {}
+        # lang -> cid -> filas [lo, hi) que puntúan: su prefLabel o, si no tiene, sus altLabel
+        self._emb_span: dict[str, dict[str, tuple[int, int]]] = {}
         self._emb_dim: int | None = None
         # Autocomplete structures
-        # lang -> list of (norm, concept_id, kind|label_original)
-        self._ac_labels: dict[str, list[tuple[str, str, str]]] = {}
+        # lang -> etiquetas ordenadas por forma normalizada (paralelo a _ac_norms)
+        self._ac_labels: dict[str, list[AutocompleteHit]] = {}
         self._ac_norms: dict[str, list[str]] = {}  # lang -> parallel list of normalized keys
-        # (lang, norm_q, limit) -> list of tuples
-        self._ac_cache: dict[tuple[str, str, int], list[tuple[str, str, str]]] = {}
-        self._ac_cache_order: list[tuple[str,str,int]] = []  # simple LRU ordering
-        self._ac_cache_max = 256
+        self._ac_trie: dict[str, PrefixTrie] = {}  # lang -> trie con top-k por prefijo
+        self._ac_words: dict[str, WordPrefixIndex] = {}  # lang -> inicios de palabra
+        # cursor -> _AcSession (LRU + TTL en proceso)
+        self._ac_sessions = TTLCache(
+            settings.taxo_ac_sessions, settings.taxo_ac_session_ttl_s, metrics=False
+        )
+        # concept_id -> nº de feedbacks (data/feedback/*.jsonl), prioriza en autocomplete
+        self.popularity: Counter[str] = Counter()
 
     def load(self) -> None:
         data: list[dict[str, Any]] = json.loads(self.path.read_text(encoding="utf-8"))
@@ -141,40 +218,64 @@ class TaxonomyStore:
                     if not key:
                         continue
                     self._inv[l].setdefault(key, []).append(c.id)
+        self._inv_norm = {
+            l: [(preprocessing.normalize(key), cids) for key, cids in inv.items()]
+            for l, inv in self._inv.items()
+        }
+        self._inv_grams = (
+            {l: NGramIndex([k for k, _ in keys]) for l, keys in self._inv_norm.items()}
+            if settings.taxo_ngram_index
+            else {}
+        )
+        self._norm = {
+            l: {c.id: self._norm_fields(c, l) for c in self.concepts.values()} for l in langs
+        }
+        self._pref_ids = {l: list(norms) for l, norms in self._norm.items()}
+        self._pref_grams = {
+            l: NGramIndex([nf.pref_any for nf in norms.values()], n=2)
+            for l, norms in self._norm.items()
+        }
 
         # Precompute embeddings (prefLabel + altLabel) if vector weight enabled
         if settings.taxo_w_vec > 0:
             self._emb_lang_mats.clear()
             self._emb_lang_text_meta.clear()
-            self._emb_concept_pref_index.clear()
+            self._emb_span.clear()
+            from app.services.embedding_cache import embed_texts_cached
             from app.services.embeddings import embedding_dimension
-            dim = embedding_dimension()
-            self._emb_dim = dim
             for l in langs:
-                rows: list[np.ndarray] = []
                 meta: list[tuple[str, str, str]] = []
+                span: dict[str, tuple[int, int]] = {}
                 for c in self.concepts.values():
-                    # prefLabel first (used for concept-level score)
+                    # Filas agrupadas por concepto: prefLabel primero, después altLabels
+                    start = len(meta)
                     pref_text = c.prefLabel.get(l) or next(iter(c.prefLabel.values()), "")
                     if pref_text:
-                        emb = embed_text(pref_text)
-                        rows.append(emb)
-                        idx = len(meta)
                         meta.append((c.id, "pref", pref_text))
-                        self._emb_concept_pref_index.setdefault(c.id, {})[l] = idx
-                    # altLabels
-                    for alt in c.altLabel.get(l, []):
-                        if not alt:
-                            continue
-                        emb = embed_text(alt)
-                        rows.append(emb)
-                        meta.append((c.id, "alt", alt))
-                if rows:
-                    mat = np.vstack(rows).astype(np.float32)
+                    meta.extend((c.id, "alt", alt) for alt in c.altLabel.get(l, []) if alt)
+                    # Score del concepto: su prefLabel o, si no tiene, el máximo de altLabels
+                    if len(meta) > start:
+                        span[c.id] = (start, start + 1 if pref_text else len(meta))
+                self._emb_lang_text_meta[l] = meta
+                self._emb_span[l] = span
+            # Todas las etiquetas distintas (todos los idiomas) en una sola llamada por lotes,
+            # con la caché en disco por modelo si el backend es st
+            texts = list(dict.fromkeys(
+                text for meta in self._emb_lang_text_meta.values() for _, _, text in meta
+            ))
+            embs = embed_texts_cached(texts)
+            row_of = {text: i for i, text in enumerate(texts)}
+            dim = embs.shape[1] if texts else embedding_dimension()
+            self._emb_dim = dim
+            for l in langs:
+                meta = self._emb_lang_text_meta[l]
+                if meta:
+                    mat = embs[[row_of[text] for _, _, text in meta]].astype(np.float32)
+                    # Normalizadas una vez: coseno = un producto escalar por fila
+                    mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-8
                 else:
                     mat = np.zeros((0, dim), dtype=np.float32)
                 self._emb_lang_mats[l] = mat
-                self._emb_lang_text_meta[l] = meta
                 # Gauge: número de embeddings precomputados por idioma
                 if obs.TAXO_EMB_CACHE_SIZE:
                     try:
@@ -190,24 +291,89 @@ class TaxonomyStore:
                 except Exception:  # pragma: no cover
                     pass
         # Build autocomplete indices
+        self.popularity = (
+            load_popularity(self.path.parent / "feedback")
+            if settings.taxo_ac_popularity
+            else Counter()
+        )
         self._ac_labels.clear()
         self._ac_norms.clear()
+        self._ac_trie.clear()
+        self._ac_words.clear()
+        self._ac_sessions.clear()
         for l in langs:
-            triplets: list[tuple[str,str,str]] = []  # (norm_label, concept_id, kind|original)
+            hits: list[AutocompleteHit] = []
             for c in self.concepts.values():
+                nf = self._norm[l][c.id]
                 pref = c.prefLabel.get(l) or next(iter(c.prefLabel.values()), "")
                 if pref:
-                    triplets.append((preprocessing.normalize(pref), c.id, f"pref|{pref}"))
-                for alt in c.altLabel.get(l, []):
+                    hits.append(AutocompleteHit(c.id, pref, "pref", nf.pref_any))
+                for alt, alt_norm in zip(c.altLabel.get(l, []), nf.alt, strict=True):
                     if alt:
-                        triplets.append((preprocessing.normalize(alt), c.id, f"alt|{alt}"))
-            # sort by normalized form then by length then pref before alt
-            triplets.sort(key=lambda t: (t[0], len(t[2]), 0 if t[2].startswith("pref|") else 1))
-            self._ac_labels[l] = triplets
-            self._ac_norms[l] = [t[0] for t in triplets]
-        # Invalidate autocomplete cache
-        self._ac_cache.clear()
-        self._ac_cache_order.clear()
+                        hits.append(AutocompleteHit(c.id, alt, "alt", alt_norm))
+            # sort by normalized form then by length of "kind|label" then pref before alt
+            # (mismo orden que las tripletas originales: a igual etiqueta, alt antes)
+            hits.sort(key=lambda h: (h.norm, len(h.kind) + 1 + len(h.label), h.kind != "pref"))
+            self._ac_labels[l] = hits
+            self._ac_norms[l] = [h.norm for h in hits]
+            # rank: más feedback primero; a igualdad, el orden anterior
+            n = len(hits)
+            rank = [i - self.popularity.get(h.concept_id, 0) * n for i, h in enumerate(hits)]
+            self._ac_trie[l] = PrefixTrie(self._ac_norms[l], rank, k=AC_TOP_K)
+            if settings.taxo_ac_infix:
+                self._ac_words[l] = WordPrefixIndex(self._ac_norms[l], rank, k=AC_TOP_K)
+
+    @staticmethod
+    def _norm_fields(c: Concept, lang: str) -> _NormFields:
+        norm = preprocessing.normalize
+        pref_any = c.prefLabel.get(lang) or next(iter(c.prefLabel.values()), "")
+        return _NormFields(
+            pref=norm(c.prefLabel.get(lang) or ""),
+            pref_any=norm(pref_any),
+            # alt conserva un elemento por altLabel (paralelo a c.altLabel[lang])
+            alt=tuple(norm(a or "") for a in c.altLabel.get(lang, [])),
+            hidden=tuple(norm(h or "") for h in c.hiddenLabel.get(lang, [])),
+            path=tuple(norm(p or "") for p in c.path.get(lang, [])),
+            context=tuple(
+                norm(d)
+                for d in (c.definition.get(lang), c.scopeNote.get(lang), c.note.get(lang))
+                if d
+            ),
+            example=tuple(norm(ex or "") for ex in c.example.get(lang, [])),
+        )
+
+    @staticmethod
+    def _fuzzy_ratios(q_norm: str, labels: list[str]) -> np.ndarray:
+        """``fuzz.partial_ratio`` de la query contra ``labels`` en una sola llamada.
+
+        Valores por debajo de ``TAXO_FUZZY_MIN_RATIO`` se devuelven como 0.
+        """
+        if not labels:
+            return np.zeros(0)
+        return process.cdist(
+            [q_norm],
+            labels,
+            scorer=fuzz.partial_ratio,
+            dtype=np.float64,
+            score_cutoff=settings.taxo_fuzzy_min_ratio,
+            workers=settings.taxo_fuzzy_workers,
+        )[0]
+
+    def _fuzzy_fallback(self, q_norm: str, lang: str) -> dict[str, float]:
+        """Ratio fuzzy de los prefLabel que comparten suficientes bigramas con la query."""
+        grams = self._pref_grams[lang]
+        cand = np.arange(len(grams))
+        if settings.taxo_fuzzy_min_overlap > 0:
+            counts, n_grams = grams.overlap(q_norm)
+            if n_grams:
+                cand = np.flatnonzero(counts >= settings.taxo_fuzzy_min_overlap * n_grams)
+        ids = self._pref_ids[lang]
+        ratios = self._fuzzy_ratios(q_norm, [grams.texts[i] for i in cand.tolist()])
+        return {
+            ids[i]: float(r)
+            for i, r in zip(cand.tolist(), ratios.tolist(), strict=True)
+            if r >= settings.taxo_fuzzy_min_ratio
+        }
 
     _emb_cache: dict[str, np.ndarray] = {}
 
@@ -221,6 +387,29 @@ class TaxonomyStore:
         self._emb_cache[key] = emb
         return emb
 
+    def _vec_sims(self, q_unit: np.ndarray, lang: str, cids: list[str]) -> np.ndarray:
+        """Coseno de la query con cada concepto de ``cids`` (-1 si no tiene filas).
+
+        Junta las filas de ``_emb_span`` de los candidatos (contiguas por concepto),
+        hace un único producto matriz-vector contra las filas ya normalizadas y
+        reduce por concepto con ``np.maximum.reduceat``.
+        """
+        span = self._emb_span[lang]
+        bounds = np.array([span.get(cid, (0, 0)) for cid in cids], dtype=np.int64)
+        best = np.full(len(cids), -1.0)
+        if not len(cids):
+            return best
+        n = bounds[:, 1] - bounds[:, 0]
+        has = n > 0
+        lo, n = bounds[has, 0], n[has]
+        if not n.size:
+            return best
+        starts = np.cumsum(n) - n
+        rows = np.repeat(lo - starts, n) + np.arange(int(n.sum()))
+        sims = self._emb_lang_mats[lang][rows] @ q_unit.astype(np.float32)
+        best[has] = np.maximum.reduceat(sims, starts)
+        return best
+
     def search(self, q: str, lang: str, limit: int | None = None) -> list[Concept]:
         """Búsqueda con ranking heurístico.
         Score por concepto = max de reglas:
@@ -231,7 +420,10 @@ class TaxonomyStore:
           +20 hiddenLabel match
           +10 path match
            +5 definition/scope/note/example match
-        Se aplica normalización extendida a query y campos.
+        El ratio fuzzy (``TAXO_W_FUZZY``) se suma solo si ningún prefLabel coincide exacto
+        o por prefijo; sin coincidencias léxicas es el único score (fallback de typos).
+        Se aplica normalización extendida a la query; los campos se normalizan una vez en
+        ``load`` (``_inv_norm`` y ``_norm``).
         """
         if not self._inv:
             self.load()
@@ -242,82 +434,62 @@ class TaxonomyStore:
             return []
         scores: dict[str, float] = {}
         vec_scores: dict[str, float] = {}
-        # pre-candidate: filtrar solo claves que contienen substring normalizada
-        for key, concept_ids in self._inv[lang].items():
-            if q_norm in preprocessing.normalize(key):
-                for cid in concept_ids:
-                    c = self.concepts[cid]
-                    pref = c.prefLabel.get(lang) or ""
-                    pref_norm = preprocessing.normalize(pref)
-                    base = 0.0
-                    if pref_norm == q_norm:
-                        base += settings.taxo_w_exact
-                    elif pref_norm.startswith(q_norm):
-                        base += settings.taxo_w_prefix
-                    elif q_norm in pref_norm:
-                        base += settings.taxo_w_substring
-                    # alt / hidden
-                    if any(
-                        q_norm in preprocessing.normalize(a)
-                        for a in c.altLabel.get(lang, [])
-                    ):
-                        base += settings.taxo_w_alt
-                    if any(
-                        q_norm in preprocessing.normalize(h)
-                        for h in c.hiddenLabel.get(lang, [])
-                    ):
-                        base += settings.taxo_w_hidden
-                    # path
-                    if any(q_norm in preprocessing.normalize(p) for p in c.path.get(lang, [])):
-                        base += settings.taxo_w_path
-                    # definition / scope / note / example (menor peso)
-                    for dfield in (c.definition.get(lang), c.scopeNote.get(lang), c.note.get(lang)):
-                        if dfield and q_norm in preprocessing.normalize(dfield or ""):
-                            base += settings.taxo_w_context
-                            break
-                    if any(q_norm in preprocessing.normalize(ex) for ex in c.example.get(lang, [])):
-                        base += settings.taxo_w_context
-                    if base <= 0:
-                        continue
-                    prev = scores.get(cid, 0.0)
-                    if base > prev:
-                        scores[cid] = base
+        anchored = False  # algún prefLabel exacto o por prefijo: el fuzzy no reordena
+        norms = self._norm[lang]
+        inv_norm = self._inv_norm[lang]
+        # pre-candidate: claves que contienen la query normalizada (índice de trigramas
+        # + verificación; sin índice, recorrido de todas las claves)
+        grams = self._inv_grams.get(lang)
+        if grams is not None:
+            hits = [inv_norm[i][1] for i in grams.find(q_norm)]
+        else:
+            hits = [ids for k, ids in inv_norm if q_norm in k]
+        for concept_ids in hits:
+            for cid in concept_ids:
+                nf = norms[cid]
+                pref_norm = nf.pref
+                base = 0.0
+                if pref_norm == q_norm:
+                    base += settings.taxo_w_exact
+                    anchored = True
+                elif pref_norm.startswith(q_norm):
+                    base += settings.taxo_w_prefix
+                    anchored = True
+                elif q_norm in pref_norm:
+                    base += settings.taxo_w_substring
+                # alt / hidden
+                if any(q_norm in a for a in nf.alt):
+                    base += settings.taxo_w_alt
+                if any(q_norm in h for h in nf.hidden):
+                    base += settings.taxo_w_hidden
+                # path
+                if any(q_norm in p for p in nf.path):
+                    base += settings.taxo_w_path
+                # definition / scope / note / example (menor peso)
+                if any(q_norm in d for d in nf.context):
+                    base += settings.taxo_w_context
+                if any(q_norm in ex for ex in nf.example):
+                    base += settings.taxo_w_context
+                if base <= 0:
+                    continue
+                prev = scores.get(cid, 0.0)
+                if base > prev:
+                    scores[cid] = base
         # Vector similarity (optional)
         # Fuzzy fallback if no base matches but fuzzy enabled
         if not scores and settings.taxo_w_fuzzy > 0 and fuzz:
-            # Evaluate fuzzy over all prefLabels (could be optimized)
-            for cid, c in self.concepts.items():
-                pref = c.prefLabel.get(lang) or next(iter(c.prefLabel.values()), "")
-                pref_norm = preprocessing.normalize(pref)
-                ratio = fuzz.partial_ratio(q_norm, pref_norm)
-                if ratio >= settings.taxo_fuzzy_min_ratio:
-                    scores[cid] = (ratio / 100.0) * settings.taxo_w_fuzzy
+            # prefLabels pre-filtrados por solape de bigramas, puntuados en lote
+            for cid, ratio in self._fuzzy_fallback(q_norm, lang).items():
+                scores[cid] = (ratio / 100.0) * settings.taxo_w_fuzzy
         if settings.taxo_w_vec > 0 and scores:
             # Use precomputed matrix if available; fallback to per-concept embedding
             q_emb = embed_text(raw_q)
             q_norm_val = float(np.linalg.norm(q_emb) + 1e-8)
             if self._emb_lang_mats.get(lang) is not None and self._emb_lang_mats[lang].shape[0] > 0:
-                mat = self._emb_lang_mats[lang]  # (N, D)
-                # cosine similarity
-                # avoid large memory if huge: simple dot then divide
-                dots = mat @ q_emb  # (N,)
-                mat_norms = np.linalg.norm(mat, axis=1) + 1e-8
-                sims = dots / (mat_norms * q_norm_val)
-                # aggregate: prefer prefLabel embedding (recorded index), else max altLabel sim
-                for cid in list(scores.keys()):
-                    pref_idx = self._emb_concept_pref_index.get(cid, {}).get(lang)
-                    best_sim = None
-                    if pref_idx is not None:
-                        best_sim = float(sims[pref_idx])
-                    else:  # compute max over all rows belonging to this cid
-                        # Iterate meta list to find rows for this cid (moderate size expected)
-                        best_sim = -1.0
-                        for i, (mcid, _field, _text) in enumerate(
-                            self._emb_lang_text_meta[lang]
-                        ):
-                            if mcid == cid:
-                                if sims[i] > best_sim:
-                                    best_sim = float(sims[i])
+                # prefLabel si existe, si no el máximo de sus altLabel (-1 sin filas)
+                cids = list(scores.keys())
+                sims = self._vec_sims(q_emb / q_norm_val, lang, cids)
+                for cid, best_sim in zip(cids, sims.tolist(), strict=True):
                     # Normalize to [0,1] from assumed [-1,1]
                     sim01 = (best_sim + 1) / 2
                     vec_scores[cid] = sim01 * settings.taxo_w_vec
@@ -329,13 +501,11 @@ class TaxonomyStore:
                     sim = float((emb @ q_emb) / ((np.linalg.norm(emb) + 1e-8) * q_norm_val))
                     sim01 = (sim + 1) / 2
                     vec_scores[cid] = sim01 * settings.taxo_w_vec
-        # Fuzzy similarity (optional)
-        if settings.taxo_w_fuzzy > 0 and fuzz and scores:
-            for cid in list(scores.keys()):
-                c = self.concepts[cid]
-                pref = c.prefLabel.get(lang) or next(iter(c.prefLabel.values()), "")
-                pref_norm = preprocessing.normalize(pref)
-                ratio = fuzz.partial_ratio(q_norm, pref_norm)
+        # Fuzzy similarity (optional): solo sin coincidencias exactas / por prefijo
+        if settings.taxo_w_fuzzy > 0 and fuzz and scores and not anchored:
+            cids = list(scores.keys())
+            ratios = self._fuzzy_ratios(q_norm, [norms[cid].pref_any for cid in cids])
+            for cid, ratio in zip(cids, ratios.tolist(), strict=True):
                 if ratio >= settings.taxo_fuzzy_min_ratio:
                     scores[cid] = scores.get(cid, 0.0) + (ratio / 100.0) * settings.taxo_w_fuzzy
         # Combine
@@ -355,33 +525,78 @@ class TaxonomyStore:
         return [self.concepts[cid] for cid, _ in ordered[:lim]]
 
     # --- Autocomplete ---
-    def autocomplete(self, q: str, lang: str, limit: int = 15) -> list[tuple[str,str,str]]:
+    def autocomplete(self, q: str, lang: str, limit: int = 15) -> list[AutocompleteHit]:
+        """Etiquetas (pref/alt) cuya forma normalizada empieza por la query.
+
+        Orden: popularidad en feedback y, a igualdad, forma normalizada, longitud y
+        prefLabel antes que altLabel. Coste O(longitud de la query) vía ``_ac_trie``.
+
+        Si no se llega a ``limit`` (y ``TAXO_AC_INFIX``), se completa con etiquetas
+        donde cada palabra de la query es el inicio de alguna palabra ("bluetooth"
+        -> "auriculares bluetooth"), por posición de la coincidencia y longitud.
+        """
+        return self._autocomplete(q, lang, limit)[0]
+
+    def autocomplete_session(
+        self, q: str, lang: str, limit: int = 15, cursor: str | None = None
+    ) -> tuple[list[AutocompleteHit], str | None]:
+        """``autocomplete`` para escritura tecla a tecla: devuelve ``(hits, cursor)``.
+
+        Con el cursor de la llamada anterior, si la query la extiende, el rango del
+        prefijo se acota con búsqueda binaria dentro del anterior. En queries de
+        varias palabras (la primera ya no cambia, ni el orden) la sesión guarda todas
+        las coincidencias por inicio de palabra (hasta ``AC_SESSION_WORDS``) y la
+        tecla siguiente solo las filtra por los tokens que cambian, en lugar de
+        recorrer de nuevo el rango del primer token. Un cursor desconocido, caducado
+        o de otra query abre una sesión nueva; los hits son siempre los mismos que
+        sin cursor. Devuelve cursor ``None`` si las sesiones están desactivadas
+        (``TAXO_AC_SESSIONS=0``).
+        """
+        if self._ac_sessions.max_size <= 0:
+            return self.autocomplete(q, lang, limit), None
+        prev = self._ac_sessions.get(cursor) if cursor else None
+        hits, state = self._autocomplete(q, lang, limit, prev, session=True)
+        if prev is None:
+            cursor = secrets.token_urlsafe(12)
+        if state is not None:
+            self._ac_sessions.put(cursor, state)
+        return hits, cursor
+
+    def _autocomplete(
+        self,
+        q: str,
+        lang: str,
+        limit: int,
+        prev: _AcSession | None = None,
+        session: bool = False,
+    ) -> tuple[list[AutocompleteHit], _AcSession | None]:
         if not self._inv:
             self.load()
         lang = lang if lang in self._ac_norms else next(iter(self._ac_norms.keys()))
         norm_q = preprocessing.normalize(q)
         if not norm_q:
-            return []
-        cache_key = (lang, norm_q, limit)
-        cached = self._ac_cache.get(cache_key)
-        if cached is not None:
-            return cached
-        norms = self._ac_norms.get(lang, [])
-        from bisect import bisect_left
-        idx = bisect_left(norms, norm_q)
-        out: list[tuple[str,str,str]] = []
-        n = len(norms)
-        # forward scan while prefix matches
-        while idx < n and norms[idx].startswith(norm_q):
-            trip = self._ac_labels[lang][idx]
-            out.append(trip)
-            if len(out) >= limit:
-                break
-            idx += 1
-        # LRU cache store
-        self._ac_cache[cache_key] = out
-        self._ac_cache_order.append(cache_key)
-        if len(self._ac_cache_order) > self._ac_cache_max:
-            old = self._ac_cache_order.pop(0)
-            self._ac_cache.pop(old, None)
-        return out
+            return [], None
+        if prev is not None and (prev.lang != lang or not norm_q.startswith(prev.norm)):
+            prev = None
+        trie = self._ac_trie[lang]
+        node = trie.cursor(norm_q, None if prev is None else prev.node) if session else None
+        found = trie.top(norm_q, limit, node)
+        words_ix = self._ac_words.get(lang)
+        words = None
+        if words_ix is not None and len(found) < limit:
+            tokens, seen = norm_q.split(), set(found)
+            if prev is not None and prev.words is not None:
+                # Mismo primer token: solo cambia el último token o se añaden tokens
+                changed = tokens[len(prev.norm.split()) - 1 :]
+                words = words_ix.narrow(prev.words, changed)
+            elif session and len(tokens) > 1:
+                words = words_ix.matches(tokens)
+            if words is None:
+                found += words_ix.search(tokens, limit - len(seen), seen)
+            else:
+                top = words[: limit + len(seen)].tolist()
+                found += [i for i in top if i not in seen][: limit - len(seen)]
+                words = words if len(words) <= AC_SESSION_WORDS else None
+        labels = self._ac_labels[lang]
+        state = _AcSession(lang, norm_q, node, words) if node is not None else None
+        return [labels[i] for i in found], state
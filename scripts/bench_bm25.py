@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""Latencia de BM25 disperso (SparseBM25F) frente a rank_bm25.BM25Okapi.
+
+Uso:
+  python scripts/bench_bm25.py --docs 10000,100000 --queries 50
+  python scripts/bench_bm25.py --taxonomy data/taxonomy.json --lang es
+
+Corpus sintético con vocabulario Zipf (o la taxonomía real con --taxonomy), indexado
+en un único campo de peso 1 (BM25F equivale entonces a Okapi). Reporta tiempo de
+construcción, latencia media / p95 por query (ms), speedup, memoria del índice y la
+diferencia máxima absoluta de scores entre ambos motores.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import retrieval_bm25  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--docs", default="10000,100000", help="Tamaños de corpus sintético (coma)")
+    p.add_argument("--vocab", type=int, default=50000)
+    p.add_argument("--doc-len", type=int, default=30, help="Tokens medios por documento")
+    p.add_argument("--queries", type=int, default=50)
+    p.add_argument("--taxonomy", default="", help="Usar taxonomy.json en vez de corpus sintético")
+    p.add_argument("--lang", default="es")
+    p.add_argument("--json", action="store_true", help="Salida JSON por tamaño")
+    return p.parse_args()
+
+
+def _synthetic(n: int, vocab: int, doc_len: int, rng: np.random.Generator) -> list[list[str]]:
+    lens = rng.poisson(doc_len, size=n) + 1
+    words = rng.zipf(1.2, size=int(lens.sum())) % vocab
+    out, pos = [], 0
+    for ln in lens:
+        out.append([f"w{w}" for w in words[pos : pos + ln]])
+        pos += ln
+    return out
+
+
+def _taxonomy(path: str, lang: str) -> list[list[str]]:
+    docs = []
+    for row in json.loads(Path(path).read_text(encoding="utf-8")):
+        # Campos concatenados: compara motores Okapi (BM25F pondera por campo)
+        fields = retrieval_bm25._doc_fields(row, lang)
+        docs.append([t for toks in fields.values() for t in toks] or [""])
+    return docs
+
+
+def _lat(fn, queries) -> tuple[list[float], list[np.ndarray]]:
+    lat, out = [], []
+    for q in queries:
+        t = time.perf_counter()
+        out.append(fn(q))
+        lat.append((time.perf_counter() - t) * 1000)
+    return lat, out
+
+
+def bench(docs: list[list[str]], n_queries: int, rng: np.random.Generator) -> dict:
+    picks = rng.integers(0, len(docs), size=n_queries)
+    queries = [list(rng.choice(docs[i], size=min(3, len(docs[i])))) for i in picks]
+    t = time.perf_counter()
+    ref = BM25Okapi(docs)
+    build_ref = time.perf_counter() - t
+    t = time.perf_counter()
+    eng = retrieval_bm25.SparseBM25F([{"text": d} for d in docs], {"text": 1.0})
+    build_sparse = time.perf_counter() - t
+    lat_ref, s_ref = _lat(ref.get_scores, queries)
+    lat_sp, s_sp = _lat(eng.get_scores, queries)
+    return {
+        "docs": len(docs),
+        "build_s_rank_bm25": round(build_ref, 3),
+        "build_s_sparse": round(build_sparse, 3),
+        "mean_ms_rank_bm25": round(float(np.mean(lat_ref)), 3),
+        "mean_ms_sparse": round(float(np.mean(lat_sp)), 3),
+        "p95_ms_sparse": round(float(np.percentile(lat_sp, 95)), 3),
+        "index_mb": round(eng.nbytes / 1e6, 2),
+        "speedup": round(float(np.mean(lat_ref) / np.mean(lat_sp)), 1),
+        "max_abs_diff": float(max(np.abs(a - b).max() for a, b in zip(s_ref, s_sp, strict=True))),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    rng = np.random.default_rng(7)
+    if args.taxonomy:
+        corpora = [_taxonomy(args.taxonomy, args.lang)]
+    else:
+        sizes = [int(x) for x in args.docs.split(",") if x.strip()]
+        corpora = [_synthetic(n, args.vocab, args.doc_len, rng) for n in sizes]
+    for docs in corpora:
+        r = bench(docs, args.queries, rng)
+        if args.json:
+            print(json.dumps(r))
+        else:
+            print(
+                f"docs={r['docs']:>7} rank_bm25={r['mean_ms_rank_bm25']:>9.3f}ms "
+                f"sparse={r['mean_ms_sparse']:>7.3f}ms (p95 {r['p95_ms_sparse']:.3f}) "
+                f"index={r['index_mb']}MB speedup={r['speedup']}x "
+                f"build {r['build_s_rank_bm25']}s/{r['build_s_sparse']}s "
+                f"max_abs_diff={r['max_abs_diff']:.1e}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""Recall vs latencia de los backends de índice denso frente a fuerza bruta.
+
+Uso:
+  python scripts/bench_dense_index.py --lang es --k 20 --queries 500
+  python scripts/bench_dense_index.py --synthetic 100000 --dim 384   # taxonomía sintética
+
+Para cada backend (brute float32/float16/int8, flat, hnsw, ivf) reporta recall@k
+respecto de la búsqueda exacta float32, delta medio del score top-1, memoria del
+índice (solo brute) y latencia por query (media / p95, ms). Las queries son vectores de clase
+con ruido gaussiano (simulan consultas cercanas a una clase). Con --synthetic los
+índices faiss se construyen en memoria; si no, se leen los persistidos por
+build_embeddings.py (y se construyen en memoria los que falten).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import dense_index  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--lang", default="es")
+    p.add_argument("--data-dir", default="data")
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--queries", type=int, default=500)
+    p.add_argument("--noise", type=float, default=0.5, help="Sigma del ruido relativo")
+    p.add_argument("--synthetic", type=int, default=0, help="N vectores aleatorios (0 = usar data)")
+    p.add_argument("--dim", type=int, default=384, help="Dimensión para --synthetic")
+    p.add_argument("--ef-search", type=int, default=64)
+    p.add_argument("--nprobe", type=int, default=8)
+    p.add_argument("--json", action="store_true", help="Salida JSON por backend")
+    return p.parse_args()
+
+
+def _queries(embs: np.ndarray, n: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    base = embs[rng.integers(0, embs.shape[0], size=n)].astype(np.float32)
+    scale = np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(base.shape[1])
+    return base + rng.normal(size=base.shape).astype(np.float32) * noise * scale
+
+
+def _bench(index, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, list[float]]:
+    lat: list[float] = []
+    found = np.full((queries.shape[0], k), -1, dtype=np.int64)
+    top1 = np.zeros(queries.shape[0], dtype=np.float64)
+    for i, q in enumerate(queries):
+        t = time.perf_counter()
+        sims, idx = index.search(q, k)
+        lat.append((time.perf_counter() - t) * 1000)
+        found[i, : idx.shape[1]] = idx[0]
+        top1[i] = sims[0, 0]
+    return found, top1, lat
+
+
+def main() -> int:
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    if args.synthetic:
+        embs = rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        emb_path = Path(args.data_dir) / f"class_embeddings_{args.lang}.npy"
+        persisted = False
+    else:
+        emb_path = Path(args.data_dir) / f"class_embeddings_{args.lang}.npy"
+        if not emb_path.exists():
+            print(f"ERROR: {emb_path} no existe (ejecuta build_embeddings.py)", file=sys.stderr)
+            return 1
+        embs = np.load(emb_path)
+        persisted = True
+    queries = _queries(embs, args.queries, args.noise, rng)
+    k = min(args.k, embs.shape[0])
+
+    brute = dense_index.BruteForceIndex(embs)
+    truth, truth_top1, brute_lat = _bench(brute, queries, k)
+    backends: list[tuple[str, object]] = [("brute", brute)]
+    for dtype in ("float16", "int8"):
+        backends.append((f"brute-{dtype}", dense_index.BruteForceIndex(embs, dtype=dtype)))
+    if dense_index.faiss_available():
+        for kind in dense_index.FAISS_KINDS:
+            path = dense_index.faiss_path(emb_path, kind)
+            if persisted and path.exists():
+                idx = dense_index.open_index(
+                    embs, str(emb_path), kind,
+                    hnsw_ef_search=args.ef_search, ivf_nprobe=args.nprobe,
+                )
+            else:
+                raw = dense_index.build_faiss(embs, kind)
+                if kind == "hnsw":
+                    raw.hnsw.efSearch = args.ef_search
+                elif kind == "ivf":
+                    raw.nprobe = args.nprobe
+                idx = dense_index.FaissIndex(raw, kind)
+            backends.append((kind, idx))
+    else:
+        print("[bench] faiss-cpu no instalado: solo brute", file=sys.stderr)
+
+    rows = []
+    for name, index in backends:
+        if name == "brute":
+            found, top1, lat = truth, truth_top1, brute_lat
+        else:
+            found, top1, lat = _bench(index, queries, k)
+        recall = float(np.mean([
+            len(set(f[f >= 0]) & set(t)) / k for f, t in zip(found, truth, strict=True)
+        ]))
+        rows.append({
+            "backend": name,
+            "n": int(embs.shape[0]),
+            "dim": int(embs.shape[1]),
+            "k": k,
+            f"recall@{k}": round(recall, 4),
+            "top1_abs_delta": float(f"{np.mean(np.abs(top1 - truth_top1)):.2e}"),
+            "index_mb": round(index.nbytes / 2**20, 2) if hasattr(index, "nbytes") else None,
+            "mean_ms": round(float(np.mean(lat)), 4),
+            "p95_ms": round(float(np.percentile(lat, 95)), 4),
+        })
+    if args.json:
+        for r in rows:
+            print(json.dumps(r))
+    else:
+        print(f"{'backend':<14} {'recall@' + str(k):>10} {'top1_delta':>11} {'index_mb':>9} "
+              f"{'mean_ms':>9} {'p95_ms':>9}")
+        for r in rows:
+            mb = "-" if r["index_mb"] is None else f"{r['index_mb']:.2f}"
+            print(f"{r['backend']:<14} {r[f'recall@{k}']:>10.4f} {r['top1_abs_delta']:>11.2e} "
+                  f"{mb:>9} {r['mean_ms']:>9.4f} {r['p95_ms']:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Microbenchmark de ``preprocessing.normalize`` sobre las etiquetas de la taxonomía.
+
+Uso:
+  python scripts/bench_normalize.py --taxonomy data/taxonomy.json --repeat 5
+
+Compara la implementación original (regex + NFKD con generador) con la actual
+(tablas ``translate`` + vía ASCII) en frío (memo vaciado en cada pasada) y en
+caliente (memo poblado, como en búsquedas repetidas). Verifica además que la
+salida es idéntica para todas las etiquetas.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import preprocessing  # noqa: E402
+
+_ws = re.compile(r"\s+")
+_non_alnum = re.compile(r"[^0-9a-záéíóúüñ ]", flags=re.IGNORECASE)
+
+
+def normalize_regex(text: str, accents: bool = True, singular: bool = True) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _non_alnum.sub(" ", text)
+    text = _ws.sub(" ", text).strip()
+    if accents:
+        nk = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in nk if not unicodedata.combining(ch))
+    if singular:
+        text = " ".join(t[:-1] if len(t) > 4 and t.endswith("s") else t for t in text.split())
+    return text
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--taxonomy", default="data/taxonomy.json")
+    p.add_argument("--repeat", type=int, default=5)
+    return p.parse_args()
+
+
+def load_labels(path: str) -> list[str]:
+    labels = []
+    for c in json.loads(Path(path).read_text(encoding="utf-8")):
+        for field in ("prefLabel", "altLabel", "hiddenLabel"):
+            for v in (c.get(field) or {}).values():
+                labels.extend(v if isinstance(v, list) else [v])
+    return [str(label) for label in labels if label]
+
+
+def bench(fn, labels: list[str], repeat: int, before=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        for label in labels:
+            fn(label)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(labels) * 1e6
+
+
+def main() -> int:
+    args = parse_args()
+    labels = load_labels(args.taxonomy)
+    ascii_share = sum(label.isascii() for label in labels) / len(labels)
+    mismatches = sum(preprocessing.normalize(x) != normalize_regex(x) for x in labels)
+    print(f"labels={len(labels)} ascii={ascii_share:.0%} mismatches={mismatches}")
+
+    clear = preprocessing._normalize.cache_clear
+    old = bench(normalize_regex, labels, args.repeat)
+    cold = bench(preprocessing.normalize, labels, args.repeat, before=clear)
+    warm = bench(preprocessing.normalize, labels, args.repeat)
+    print(f"{'impl':<18}{'us/label':>10}{'speedup':>10}")
+    print(f"{'regex (original)':<18}{old:>10.2f}{1.0:>9.1f}x")
+    print(f"{'translate (frío)':<18}{cold:>10.2f}{old / cold:>9.1f}x")
+    print(f"{'translate (memo)':<18}{warm:>10.2f}{old / warm:>9.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""Latencia de ``TaxonomyStore.search`` con y sin índice de trigramas.
+
+Uso:
+  python scripts/bench_taxonomy_search.py --replicate 1,10,50 --queries 300
+
+Replica la taxonomía (--replicate veces; cada copia aplica una permutación de
+letras a los campos de texto, así las claves son distintas pero conservan la
+distribución de longitudes y n-gramas) y mide la latencia media / p95 de
+``search`` recorriendo todas las claves (``TAXO_NGRAM_INDEX=0``) y con el índice
+de trigramas. Las queries son prefijos y fragmentos de etiquetas reales; se
+comprueba que ambos caminos devuelven los mismos conceptos.
+
+Con --fuzzy mide el fallback fuzzy con palabras de etiquetas con 1-2 typos: bucle
+``fuzz.partial_ratio`` por concepto (implementación anterior), ``process.cdist``
+sobre todos los prefLabel y ``cdist`` tras el prefiltro de bigramas
+(``TAXO_FUZZY_MIN_OVERLAP``), con el recall de este último frente al bucle.
+
+Con --autocomplete mide ``TaxonomyStore.autocomplete`` (trie con top-k por nodo)
+tecleando cada query carácter a carácter, frente a la búsqueda binaria + recorrido
+hacia delante anterior (solo orden alfabético) y frente a búsqueda binaria +
+ordenar todo el rango por el mismo ranking (popularidad) que usa el trie. La
+columna "words" es ``autocomplete`` completo: trie + inicios de palabra
+(``TAXO_AC_INFIX``) cuando el prefijo de la etiqueta no llena ``--limit``, y
+"session" lo mismo pasando el cursor de la tecla anterior (``autocomplete_session``).
+
+Con --vector mide la agregación de similitud vectorial de ``search``
+(``TAXO_W_VEC``) sobre los candidatos de cada query: el recorrido anterior
+(normas de todas las filas por query y, para conceptos sin prefLabel, una pasada
+por ``_emb_lang_text_meta`` por concepto) frente a ``_vec_sims`` (filas
+normalizadas en ``load``, rangos por concepto y ``np.maximum.reduceat``). Un 10%
+de los conceptos replicados pierde el prefLabel para cubrir el camino del máximo.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import random
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # pragma: no cover
+    fuzz = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.settings import settings  # noqa: E402
+from app.services import preprocessing  # noqa: E402
+from app.services.embeddings import embed_text  # noqa: E402
+from app.services.taxonomy_store import TaxonomyStore  # noqa: E402
+
+TEXT_FIELDS = (
+    "prefLabel", "altLabel", "hiddenLabel", "definition", "scopeNote", "note", "example", "path",
+)
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--taxonomy", default="data/taxonomy.json")
+    p.add_argument("--replicate", default="1,10,50", help="Factores de réplica (coma)")
+    p.add_argument("--queries", type=int, default=300)
+    p.add_argument("--lang", default="es")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--fuzzy", action="store_true", help="Mide el fallback fuzzy con typos")
+    p.add_argument("--autocomplete", action="store_true", help="Mide autocomplete por tecla")
+    p.add_argument("--limit", type=int, default=15, help="Límite de autocomplete")
+    p.add_argument("--vector", action="store_true", help="Mide la similitud vectorial")
+    return p.parse_args()
+
+
+def _shift(value, table: dict):
+    if isinstance(value, dict):
+        return {k: _shift(v, table) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shift(v, table) for v in value]
+    return value.translate(table) if isinstance(value, str) else value
+
+
+def replicate(rows: list[dict], factor: int) -> list[dict]:
+    out = list(rows)
+    for r in range(1, factor):
+        perm = "".join(random.Random(r).sample(LETTERS, len(LETTERS)))
+        table = str.maketrans(LETTERS + LETTERS.upper(), perm + perm.upper())
+        for row in rows:
+            copy = dict(row)
+            copy["id"] = f"{row['id']}-{r}"
+            for field in TEXT_FIELDS:
+                if field in row:
+                    copy[field] = _shift(row[field], table)
+            out.append(copy)
+    return out
+
+
+def make_queries(rows: list[dict], lang: str, n: int, rng: random.Random) -> list[str]:
+    labels = []
+    for row in rows:
+        pl = row.get("prefLabel")
+        labels.append(pl.get(lang, next(iter(pl.values()))) if isinstance(pl, dict) else str(pl))
+    queries = []
+    for _ in range(n):
+        label = rng.choice(labels)
+        start = rng.randrange(max(1, len(label) - 3))
+        queries.append(label[: rng.randint(3, 8)] if rng.random() < 0.5 else label[start:start + 6])
+    return queries
+
+
+def make_typos(rows: list[dict], lang: str, n: int, rng: random.Random) -> list[str]:
+    words = []
+    for row in rows:
+        pl = row.get("prefLabel")
+        label = pl.get(lang, next(iter(pl.values()))) if isinstance(pl, dict) else str(pl)
+        words += [w.lower() for w in label.split() if len(w) >= 5]
+    queries = []
+    for _ in range(n):
+        w = list(rng.choice(words))
+        for _ in range(rng.randint(1, 2)):
+            i = rng.randrange(len(w))
+            op = rng.random()
+            if op < 0.3:
+                w[i] = rng.choice(LETTERS)
+            elif op < 0.6:
+                w.insert(i, rng.choice(LETTERS))
+            elif len(w) > 3:
+                del w[i]
+        queries.append("".join(w))
+    return queries
+
+
+def bench_fuzzy(store: TaxonomyStore, queries: list[str], lang: str) -> None:
+    # Solo queries sin coincidencia léxica (las que llegan al fallback)
+    qn = [preprocessing.normalize(q) for q in queries]
+    qn = [q for q in qn if q and not store._inv_grams[lang].find(q)]
+    labels = [nf.pref_any for nf in store._norm[lang].values()]
+    min_ratio, overlap = settings.taxo_fuzzy_min_ratio, settings.taxo_fuzzy_min_overlap
+
+    def loop(q):
+        return {i for i, lbl in enumerate(labels) if fuzz.partial_ratio(q, lbl) >= min_ratio}
+
+    def batched(q):
+        ids = store._pref_ids[lang]
+        pos = {cid: i for i, cid in enumerate(ids)}
+        return {pos[cid] for cid in store._fuzzy_fallback(q, lang)}
+
+    out = {}
+    modes = (("loop", loop, 0.0), ("cdist", batched, 0.0), ("prefilter", batched, overlap))
+    for name, fn, ov in modes:
+        settings.taxo_fuzzy_min_overlap = ov
+        t0 = time.perf_counter()
+        out[name] = [fn(q) for q in qn]
+        out[name + "_ms"] = (time.perf_counter() - t0) / max(len(qn), 1) * 1000
+    settings.taxo_fuzzy_min_overlap = overlap
+    ref, got = out["loop"], out["prefilter"]
+    kept = sum(len(r & g) for r, g in zip(ref, got, strict=True))
+    total = sum(len(r) for r in ref) or 1
+    print(
+        f"{len(labels):>9}{len(qn):>8}{out['loop_ms']:>10.2f}{out['cdist_ms']:>10.2f}"
+        f"{out['prefilter_ms']:>11.2f}{kept / total:>9.3f}  {out['loop'] == out['cdist']}"
+    )
+
+
+def bench_autocomplete(store: TaxonomyStore, queries: list[str], lang: str, limit: int) -> None:
+    norms, labels = store._ac_norms[lang], store._ac_labels[lang]
+
+    def bisect_scan(q):
+        q = preprocessing.normalize(q)
+        if not q:
+            return []
+        idx, out = bisect_left(norms, q), []
+        while idx < len(norms) and norms[idx].startswith(q) and len(out) < limit:
+            out.append(labels[idx])
+            idx += 1
+        return out
+
+    trie = store._ac_trie[lang]
+    rank = trie.rank
+
+    def trie_only(q):
+        q = preprocessing.normalize(q)
+        return [labels[i] for i in trie.top(q, limit)] if q else []
+
+    def bisect_ranked(q):
+        q = preprocessing.normalize(q)
+        if not q:
+            return []
+        lo = bisect_left(norms, q)
+        hi = bisect_left(norms, q + "\U0010ffff", lo)
+        return [labels[i] for i in heapq.nsmallest(limit, range(lo, hi), key=rank.__getitem__)]
+
+    keystrokes = [q[:i] for q in queries for i in range(1, len(q) + 1)]
+    modes = (
+        ("bisect", bisect_scan),
+        ("ranked", bisect_ranked),
+        ("trie", trie_only),
+        ("words", lambda q: store.autocomplete(q, lang, limit)),
+    )
+    out = {}
+    for name, fn in modes:
+        fn(keystrokes[0])
+        t0 = time.perf_counter()
+        out[name] = [fn(q) for q in keystrokes]
+        out[name + "_us"] = (time.perf_counter() - t0) / len(keystrokes) * 1e6
+    session = []
+    t0 = time.perf_counter()
+    for q in queries:
+        cursor = ""
+        for i in range(1, len(q) + 1):
+            hits, cursor = store.autocomplete_session(q[:i], lang, limit, cursor)
+            session.append(hits)
+    out["session_us"] = (time.perf_counter() - t0) / len(keystrokes) * 1e6
+    print(
+        f"{len(store.concepts):>9}{len(keystrokes):>8}{out['bisect_us']:>11.1f}"
+        f"{out['ranked_us']:>11.1f}{out['trie_us']:>10.1f}{out['words_us']:>10.1f}"
+        f"{out['session_us']:>12.1f}  {out['ranked'] == out['trie']}"
+        f" {session == out['words']}"
+    )
+
+
+def bench_vector(store: TaxonomyStore, queries: list[str], lang: str) -> None:
+    mat, meta = store._emb_lang_mats[lang], store._emb_lang_text_meta[lang]
+    pref_row = {cid: i for i, (cid, field, _) in enumerate(meta) if field == "pref"}
+    cands = [list(dict.fromkeys(c.id for c in store.search(q, lang, limit=10**9)))
+             for q in queries]
+    q_embs = [embed_text(q) for q in queries]
+
+    def loop(q_emb, cids):
+        q_norm_val = float(np.linalg.norm(q_emb) + 1e-8)
+        sims = (mat @ q_emb) / ((np.linalg.norm(mat, axis=1) + 1e-8) * q_norm_val)
+        out = []
+        for cid in cids:
+            if cid in pref_row:
+                out.append(float(sims[pref_row[cid]]))
+                continue
+            best = -1.0
+            for i, (mcid, _field, _text) in enumerate(meta):
+                if mcid == cid and sims[i] > best:
+                    best = float(sims[i])
+            out.append(best)
+        return np.asarray(out)
+
+    def vec(q_emb, cids):
+        return store._vec_sims(q_emb / float(np.linalg.norm(q_emb) + 1e-8), lang, cids)
+
+    out = {}
+    for name, fn in (("loop", loop), ("reduceat", vec)):
+        t0 = time.perf_counter()
+        out[name] = [fn(e, c) for e, c in zip(q_embs, cands, strict=True)]
+        out[name + "_ms"] = (time.perf_counter() - t0) / len(queries) * 1000
+    same = all(np.allclose(a, b, atol=1e-5) for a, b in zip(out["loop"], out["reduceat"],
+                                                             strict=True))
+    print(
+        f"{len(store.concepts):>9}{mat.shape[0]:>9}{np.mean([len(c) for c in cands]):>8.0f}"
+        f"{out['loop_ms']:>10.2f}{out['reduceat_ms']:>12.3f}  {same}"
+    )
+
+
+def run(store: TaxonomyStore, queries: list[str], lang: str) -> tuple[list, np.ndarray]:
+    results, times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = store.search(q, lang)
+        times.append(time.perf_counter() - t0)
+        results.append([c.id for c in res])
+    return results, np.asarray(times) * 1000
+
+
+def main() -> int:
+    args = parse_args()
+    rows = json.loads(Path(args.taxonomy).read_text(encoding="utf-8"))
+    queries = make_queries(rows, args.lang, args.queries, random.Random(args.seed))
+    if args.autocomplete:
+        print(f"{'concepts':>9}{'keys':>8}{'bisect us':>11}{'ranked us':>11}{'trie us':>10}"
+              f"{'words us':>10}{'session us':>12}  same")
+        for factor in (int(x) for x in args.replicate.split(",")):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "taxonomy.json"
+                path.write_text(json.dumps(replicate(rows, factor)), encoding="utf-8")
+                store = TaxonomyStore(path.as_posix())
+                store.load()
+                bench_autocomplete(store, queries, args.lang, args.limit)
+        return 0
+    if args.vector:
+        settings.taxo_w_vec = settings.taxo_w_vec or 5.0
+        print(f"{'concepts':>9}{'rows':>9}{'cands':>8}{'loop ms':>10}{'reduceat ms':>12}  same")
+        for factor in (int(x) for x in args.replicate.split(",")):
+            data = replicate(rows, factor)
+            for row in data[len(rows)::10]:
+                row["prefLabel"] = {}
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "taxonomy.json"
+                path.write_text(json.dumps(data), encoding="utf-8")
+                store = TaxonomyStore(path.as_posix())
+                store.load()
+                bench_vector(store, queries[:50], args.lang)
+        return 0
+    if args.fuzzy:
+        if fuzz is None:
+            print("rapidfuzz no instalado", file=sys.stderr)
+            return 1
+        typos = make_typos(rows, args.lang, args.queries, random.Random(args.seed))
+        print(f"{'concepts':>9}{'queries':>8}{'loop ms':>10}{'cdist ms':>10}"
+              f"{'prefilt ms':>11}{'recall':>9}  cdist==loop")
+        for factor in (int(x) for x in args.replicate.split(",")):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "taxonomy.json"
+                path.write_text(json.dumps(replicate(rows, factor)), encoding="utf-8")
+                store = TaxonomyStore(path.as_posix())
+                store.load()
+                bench_fuzzy(store, typos, args.lang)
+        return 0
+    print(f"{'concepts':>9}{'scan ms':>10}{'p95':>8}{'index ms':>10}{'p95':>8}{'speedup':>9}  same")
+    for factor in (int(x) for x in args.replicate.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "taxonomy.json"
+            path.write_text(json.dumps(replicate(rows, factor)), encoding="utf-8")
+            stats = {}
+            for enabled in (False, True):
+                settings.taxo_ngram_index = enabled
+                store = TaxonomyStore(path.as_posix())
+                store.load()
+                run(store, queries[:20], args.lang)  # warm-up (memo de normalize)
+                stats[enabled] = run(store, queries, args.lang)
+        (res_scan, t_scan), (res_idx, t_idx) = stats[False], stats[True]
+        print(
+            f"{len(store.concepts):>9}{t_scan.mean():>10.3f}{np.percentile(t_scan, 95):>8.2f}"
+            f"{t_idx.mean():>10.3f}{np.percentile(t_idx, 95):>8.2f}"
+            f"{t_scan.mean() / t_idx.mean():>8.1f}x  {res_scan == res_idx}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import argparse
 import json
 import os
+import sys
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 
+
 class _EmbedRuntime:
     def __init__(self) -> None:
         self.backend = os.getenv("EMBEDDINGS_BACKEND", "placeholder")
@@ -51,12 +54,27 @@ def _placeholder_embed(s: str, dim: int = 768) -> np.ndarray:
     return vec
 
 
+def _encode_st(texts: list[str]) -> np.ndarray:
+    batch_size = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "256"))
+    arr = _RUNTIME.model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+    return arr.astype(np.float32)
+
+
 def embed_texts(texts: list[str]) -> np.ndarray:
     if _RUNTIME.backend == "st":
         _RUNTIME.ensure()
         if _RUNTIME.model is not None:
-            arr = _RUNTIME.model.encode(texts, normalize_embeddings=True)
-            return arr.astype(np.float32)
+            if os.getenv("EMBEDDINGS_CACHE", "1") != "1":
+                return _encode_st(texts)
+            # Misma caché en disco que TaxonomyStore.load (por modelo y hash del texto)
+            embedding_cache = _embedding_cache_module()
+            cache = embedding_cache.EmbeddingCache(
+                embedding_cache.cache_path(_RUNTIME.model_name)
+            )
+            before = len(cache)
+            embs = cache.embed(texts, _encode_st)
+            print(f"[build_embeddings] {len(cache) - before} encoded, cache {cache.path}")
+            return embs
     dim = _RUNTIME.dim or 768
     return (
         np.vstack([_placeholder_embed(t, dim) for t in texts])
@@ -84,7 +102,45 @@ def _as_text(value: Any, lang: str) -> str:
         return " ".join(str(x) for x in value if x)
     return str(value)
 
-def build_for_lang(lang: str) -> None:
+def _embedding_cache_module():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from app.services import embedding_cache  # noqa: E402 - import tras ajustar sys.path
+
+    return embedding_cache
+
+
+def _dense_index_module():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from app.services import dense_index  # noqa: E402 - import tras ajustar sys.path
+
+    return dense_index
+
+
+def write_mmap_artifacts(embs: np.ndarray, ids: list[str], emb_path: str, ids_path: str) -> None:
+    """Matriz normalizada + tabla de ids UTF-8 que la API abre con ``mmap_mode="r"``."""
+    dense_index = _dense_index_module()
+    out = dense_index.write_normalized(embs, emb_path)
+    dense_index.write_string_table(ids, ids_path)
+    offsets_path, blob_path = dense_index.string_table_paths(ids_path)
+    print(f"  saved {out}, {offsets_path}, {blob_path}")
+
+
+def build_dense_indexes(embs: np.ndarray, emb_path: str, kinds: list[str]) -> None:
+    """Construye y persiste índices faiss junto a ``class_embeddings_{lang}.npy``."""
+    if not kinds:
+        return
+    dense_index = _dense_index_module()
+    if not dense_index.faiss_available():
+        print("[build_embeddings] faiss-cpu no instalado; se omiten índices ANN")
+        return
+    for kind in kinds:
+        index = dense_index.build_faiss(embs, kind)
+        out = dense_index.faiss_path(emb_path, kind)
+        dense_index.write_faiss(index, out)
+        print(f"  saved {out} ntotal={index.ntotal}")
+
+
+def build_for_lang(lang: str, index_kinds: list[str] | None = None) -> None:
     taxo_path = Path("data/taxonomy.json")
     if not taxo_path.exists():
         raise SystemExit("taxonomy.json no encontrado; genera primero con import_skos_jsonld.py")
@@ -125,13 +181,27 @@ def build_for_lang(lang: str) -> None:
         embs = embed_texts(texts)
     Path("data").mkdir(exist_ok=True)
     np.save(f"data/class_embeddings_{lang}.npy", embs)
+    # class_ids.npy (pickle) se mantiene por compatibilidad con scripts/artefactos antiguos
     np.save("data/class_ids.npy", np.array(ids, dtype=object))
     print(f"[{lang}] saved data/class_embeddings_{lang}.npy {embs.shape}, ids={len(ids)}")
+    write_mmap_artifacts(embs, ids, f"data/class_embeddings_{lang}.npy", "data/class_ids.npy")
+    build_dense_indexes(embs, f"data/class_embeddings_{lang}.npy", index_kinds or [])
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Genera embeddings de clases e índices densos")
+    p.add_argument(
+        "--index",
+        default="flat,hnsw,ivf",
+        help="Índices faiss a construir (coma: flat,hnsw,ivf; vacío = ninguno)",
+    )
+    return p.parse_args()
 
 def main() -> None:
+    args = parse_args()
+    kinds = [k.strip() for k in args.index.split(",") if k.strip()]
     langs = ("es", "en")
     for lang in langs:
-        build_for_lang(lang)
+        build_for_lang(lang, kinds)
 
 if __name__ == "__main__":
     main()
@@ -13,6 +13,8 @@ Features:
 - Concurrency via asyncio + httpx.
 - Rate pacing (--max-rps) to avoid tripping rate limiter.
 - Retries with exponential backoff on 429/5xx.
+- Optional batching (--batch-size N) through POST /classify/batch: one HTTP round-trip and
+  one vectorized pass per N queries.
 """
 from __future__ import annotations
 
@@ -43,6 +45,13 @@ def parse_args() -> argparse.Namespace:
         help="Max requests per second (0 = unlimited)",
     )
     p.add_argument("--retries", type=int, default=3, help="Retry attempts on transient errors")
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        dest="batch_size",
+        help="Queries per request to /classify/batch (0 = one request per query via /classify)",
+    )
     return p.parse_args()
 
 
@@ -81,7 +90,7 @@ def load_queries(path: Path) -> list[str]:
 
 async def worker(
     name: int,
-    queue: asyncio.Queue[str],
+    queue: asyncio.Queue[list[str]],
     client: httpx.AsyncClient,
     args: argparse.Namespace,
     out_f,
@@ -89,32 +98,38 @@ async def worker(
     backoff_base = 0.3
     while True:
         try:
-            q = queue.get_nowait()
+            chunk = queue.get_nowait()
         except asyncio.QueueEmpty:
             return
+        if args.batch_size > 0:
+            url = f"{args.url}/classify/batch"
+            payload = {"queries": chunk, "lang": args.lang, "top_k": args.top_k}
+        else:
+            url = f"{args.url}/classify"
+            payload = {"query": chunk[0], "lang": args.lang, "top_k": args.top_k}
         attempt = 0
         while True:
             try:
-                resp = await client.post(
-                    f"{args.url}/classify",
-                    json={"query": q, "lang": args.lang, "top_k": args.top_k},
-                )
+                resp = await client.post(url, json=payload)
                 if resp.status_code == 200:
                     data = resp.json()
-                    out = {"query": q, **data}
-                    out_f.write(json.dumps(out, ensure_ascii=False) + "\n")
+                    items = data["results"] if args.batch_size > 0 else [data]
+                    for q, item in zip(chunk, items, strict=True):
+                        out = {"query": q, **item}
+                        out_f.write(json.dumps(out, ensure_ascii=False) + "\n")
                     out_f.flush()
                     break
                 if resp.status_code in (429, 500, 503) and attempt < args.retries:
                     await asyncio.sleep(backoff_base * (2 ** attempt))
                     attempt += 1
                     continue
-                out_f.write(
-                    json.dumps(
-                        {"query": q, "error": resp.status_code, "detail": resp.text}
+                for q in chunk:
+                    out_f.write(
+                        json.dumps(
+                            {"query": q, "error": resp.status_code, "detail": resp.text}
+                        )
+                        + "\n"
                     )
-                    + "\n"
-                )
                 out_f.flush()
                 break
             except Exception as e:  # network or JSON error
@@ -122,7 +137,10 @@ async def worker(
                     await asyncio.sleep(backoff_base * (2 ** attempt))
                     attempt += 1
                     continue
-                out_f.write(json.dumps({"query": q, "error": "exception", "detail": str(e)}) + "\n")
+                for q in chunk:
+                    out_f.write(
+                        json.dumps({"query": q, "error": "exception", "detail": str(e)}) + "\n"
+                    )
                 out_f.flush()
                 break
         if args.max_rps > 0:
@@ -136,9 +154,10 @@ def main():
         print("No queries loaded", file=sys.stderr)
         return 1
     start = time.time()
-    queue: asyncio.Queue[str] = asyncio.Queue()
-    for q in queries:
-        queue.put_nowait(q)
+    queue: asyncio.Queue[list[str]] = asyncio.Queue()
+    step = max(1, args.batch_size)
+    for i in range(0, len(queries), step):
+        queue.put_nowait(queries[i : i + step])
     concurrency = max(1, args.concurrency)
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     with open(args.output, "w", encoding="utf-8") as out_f:
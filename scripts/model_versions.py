@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Gestión del registro versionado de modelos (models/<version>/ + models/current).
+
+Uso:
+  python scripts/model_versions.py list
+  python scripts/model_versions.py publish models            # layout plano -> versión
+  python scripts/model_versions.py publish /tmp/out --version v2 --no-activate
+  python scripts/model_versions.py activate v2
+  python scripts/model_versions.py verify [v2]
+
+Con la API en marcha, ``POST /admin/models/activate?version=v2`` cambia el puntero
+y recarga el clasificador en segundo plano.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import model_registry  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--models-dir", default="models")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    pub = sub.add_parser("publish", help="Copia artefactos de un directorio como versión nueva")
+    pub.add_argument("src")
+    pub.add_argument("--version", default=None)
+    pub.add_argument("--no-activate", action="store_true")
+    act = sub.add_parser("activate")
+    act.add_argument("version")
+    ver = sub.add_parser("verify")
+    ver.add_argument("version", nargs="?", default=None, help="Default: versión activa")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    root = Path(args.models_dir)
+    try:
+        if args.cmd == "list":
+            current = model_registry.current_version(root)
+            for version in model_registry.list_versions(root):
+                print(f"{'*' if version == current else ' '} {version}")
+        elif args.cmd == "publish":
+            version = model_registry.publish(
+                root, args.src, version=args.version, activate=not args.no_activate
+            )
+            print(f"published {root / version}")
+        elif args.cmd == "activate":
+            model_registry.verify(root / args.version)
+            model_registry.set_current(root, args.version)
+            print(f"current -> {args.version}")
+        else:
+            version = args.version or model_registry.current_version(root)
+            if version is None:
+                print("no current version (flat layout)", file=sys.stderr)
+                return 1
+            manifest = model_registry.verify(root / version)
+            print(f"{version}: {len((manifest or {}).get('files', {}))} files OK")
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
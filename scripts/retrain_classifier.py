@@ -11,6 +11,9 @@ Features:
   - Saves artifacts atomically (tmp -> move) to avoid race.
   - Writes metadata JSON with metrics & parameters.
   - Dry-run mode to inspect stats without writing.
+  - Calibration (--calibration platt|isotonic) collapsed into one base model plus a
+    per-class map (models/calibration.joblib); ECE and inference speedup vs the
+    CalibratedClassifierCV ensemble are written to metadata.json.
 """
 from __future__ import annotations
 # ruff: noqa: I001
@@ -35,6 +38,10 @@ from sklearn.metrics import accuracy_score, f1_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import FeatureUnion
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import model_registry  # noqa: E402
+from app.services.calibration import CalibrationMap  # noqa: E402
+
 TAU_DEFAULT = 0.4
 
 RANDOM_SEED = 42
@@ -57,6 +64,8 @@ class RetrainConfig:
     calibration: str  # none|platt|isotonic
     cv_folds: int
     tau_low: float
+    version: str | None = None  # nombre de la versión en models/ (None = timestamp UTC)
+    activate: bool = True
 
 @dataclass
 class RetrainStats:
@@ -75,6 +84,11 @@ class RetrainStats:
     calibration_method: str | None
     cv_folds: int | None
     convergence_warn: bool
+    # Calibración colapsada frente al ensemble CalibratedClassifierCV (validación)
+    ece_ensemble: float | None = None
+    ece_collapsed: float | None = None
+    ece_delta: float | None = None
+    calibration_speedup: float | None = None
 
 
 def load_taxonomy(path: Path) -> list[dict]:
@@ -146,9 +160,59 @@ def build_vectorizer(cfg: RetrainConfig):
     ])
 
 
+def expected_calibration_error(
+    proba: np.ndarray, y_true: list[str], classes: list[str], n_bins: int = 15
+) -> float:
+    """ECE top-label con bins de confianza de igual anchura."""
+    conf = proba.max(axis=1)
+    correct = np.asarray(classes)[proba.argmax(axis=1)] == np.asarray(y_true)
+    bins = np.minimum((conf * n_bins).astype(int), n_bins - 1)
+    ece = 0.0
+    for b in np.unique(bins):
+        mask = bins == b
+        ece += mask.mean() * abs(float(correct[mask].mean()) - float(conf[mask].mean()))
+    return float(ece)
+
+
+def _best_time(fn, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def collapse_calibration(clf, method: str, cfg: RetrainConfig, x_tr, y_tr, x_va, y_va):
+    """Modelo base único + ``CalibrationMap`` en lugar de ``cv_folds`` copias.
+
+    ``CalibratedClassifierCV(ensemble=False)`` calibra sobre predicciones
+    out-of-fold y reentrena un solo modelo base con todo ``x_tr``. El ensemble
+    por defecto se ajusta solo para comparar ECE y latencia en validación.
+    """
+    collapsed = CalibratedClassifierCV(clf, method=method, cv=cfg.cv_folds, ensemble=False)
+    collapsed.fit(x_tr, y_tr)
+    base = collapsed.calibrated_classifiers_[0].estimator
+    cmap = CalibrationMap.from_calibrated(collapsed)
+    ensemble = CalibratedClassifierCV(clf, method=method, cv=cfg.cv_folds).fit(x_tr, y_tr)
+    classes = [str(c) for c in collapsed.classes_]
+    proba = cmap.apply(base.decision_function(x_va))
+    ece_ens = expected_calibration_error(ensemble.predict_proba(x_va), y_va, classes)
+    ece_col = expected_calibration_error(proba, y_va, classes)
+    t_ens = _best_time(lambda: ensemble.predict_proba(x_va))
+    t_col = _best_time(lambda: cmap.apply(base.decision_function(x_va)))
+    report = {
+        "ece_ensemble": ece_ens,
+        "ece_collapsed": ece_col,
+        "ece_delta": ece_col - ece_ens,
+        "calibration_speedup": t_ens / t_col if t_col > 0 else None,
+    }
+    return base, cmap, proba, report
+
+
 def train_model(
     x_texts: list[str], y: list[str], cfg: RetrainConfig
-) -> tuple[object, object, RetrainStats]:
+) -> tuple[object, object, CalibrationMap | None, RetrainStats]:
     classes = sorted({c for c in y})
     n_classes = len(classes)
     vectorizer = build_vectorizer(cfg)
@@ -207,31 +271,28 @@ def train_model(
     calibrated = False
     calibration_method: str | None = None
     cv_used: int | None = None
+    calibration_map: CalibrationMap | None = None
+    calib_report: dict = {}
     # Calibration (after base training & validation split) to avoid leakage
     if cfg.calibration in {"platt", "isotonic"}:
         method = "sigmoid" if cfg.calibration == "platt" else "isotonic"
         if x_va is not None and y_va is not None:
-            base_est = clf
-            calib = CalibratedClassifierCV(base_est, method=method, cv=cfg.cv_folds)
             t1 = time.time()
-            calib.fit(x_tr, y_tr)  # uses internal CV
+            clf, calibration_map, proba, calib_report = collapse_calibration(
+                clf, method, cfg, x_tr, y_tr, x_va, y_va
+            )
             train_time += time.time() - t1
-            clf = calib  # type: ignore
             calibrated = True
             calibration_method = cfg.calibration
             cv_used = cfg.cv_folds
-            # recompute metrics with calibrated probs if possible
-            if x_va is not None and y_va is not None and hasattr(clf, "predict"):
-                preds = clf.predict(x_va)
-                try:
-                    acc = float(accuracy_score(y_va, preds))
-                    macro_f1 = float(f1_score(y_va, preds, average="macro"))
-                except ValueError:
-                    pass
-                if hasattr(clf, "predict_proba"):
-                    proba = clf.predict_proba(x_va)
-                    top = proba.max(axis=1)
-                    coverage = float((top >= cfg.tau_low).mean())
+            # recompute metrics with calibrated probs
+            preds = np.asarray(clf.classes_)[proba.argmax(axis=1)]
+            try:
+                acc = float(accuracy_score(y_va, preds))
+                macro_f1 = float(f1_score(y_va, preds, average="macro"))
+            except ValueError:
+                pass
+            coverage = float((proba.max(axis=1) >= cfg.tau_low).mean())
 
     stats = RetrainStats(
         n_classes=n_classes,
@@ -249,31 +310,28 @@ def train_model(
         calibration_method=calibration_method,
         cv_folds=cv_used,
         convergence_warn=convergence_warn,
+        **calib_report,
     )
 
-    return vectorizer, clf, stats
+    return vectorizer, clf, calibration_map, stats
 
 
 def atomic_save(
     models_dir: Path,
     vectorizer,
     clf,
+    calibration_map: CalibrationMap | None,
     classes: list[str],
     stats: RetrainStats,
     cfg: RetrainConfig,
-):
+) -> str:
     tmp = Path(tempfile.mkdtemp(prefix="retrain_tmp_"))
     try:
         joblib.dump(vectorizer, tmp / "tfidf.joblib")
-        # Choose filename based on calibration
-        if (
-            hasattr(clf, "classes_")
-            and hasattr(clf, "predict_proba")
-            and not isinstance(clf, LogisticRegression)
-        ):
-            joblib.dump(clf, tmp / "lr_calibrated.joblib")
-        else:
-            joblib.dump(clf, tmp / "lr.joblib")
+        joblib.dump(clf, tmp / "lr.joblib")
+        if calibration_map is not None:
+            # Arrays planos: el servicio no necesita objetos CalibratedClassifierCV
+            joblib.dump(calibration_map.to_dict(), tmp / "calibration.joblib")
         joblib.dump(classes, tmp / "classes.joblib")
         meta = {
             "stats": asdict(stats),
@@ -281,10 +339,8 @@ def atomic_save(
             "classes_checksum": hash(tuple(classes)),
         }
         (tmp / "metadata.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
-        # Move
-        models_dir.mkdir(parents=True, exist_ok=True)
-        for fname in ["tfidf.joblib", "lr.joblib", "classes.joblib", "metadata.json"]:
-            shutil.move(str(tmp / fname), str(models_dir / fname))
+        # Nueva versión models/<version>/ (manifest + sha256) y puntero current atómico
+        return model_registry.publish(models_dir, tmp, version=cfg.version, activate=cfg.activate)
     finally:
         shutil.rmtree(tmp, ignore_errors=True)
 
@@ -323,6 +379,12 @@ def parse_args() -> RetrainConfig:
         default=TAU_DEFAULT,
         help="Umbral para coverage@tau (solo métrica offline)",
     )
+    p.add_argument("--version", default=None, help="Nombre de versión (default: timestamp UTC)")
+    p.add_argument(
+        "--no-activate",
+        action="store_true",
+        help="Publica la versión sin mover el puntero models/current",
+    )
     a = p.parse_args()
     return RetrainConfig(
         lang=a.lang.lower(),
@@ -337,6 +399,8 @@ def parse_args() -> RetrainConfig:
         calibration=a.calibration,
         cv_folds=a.cv_folds,
         tau_low=a.tau_low,
+        version=a.version,
+        activate=not a.no_activate,
     )
 
 
@@ -353,7 +417,7 @@ def main() -> int:
         print("ERROR: No se generaron textos para entrenamiento", file=sys.stderr)
         return 2
 
-    vec, clf, stats = train_model(x_texts, y, cfg)
+    vec, clf, calibration_map, stats = train_model(x_texts, y, cfg)
     classes = sorted(list({c for c in y}))
 
     print("=== Retraining Stats ===")
@@ -365,8 +429,9 @@ def main() -> int:
         print("Dry-run: artefactos no guardados.")
         return 0
 
-    atomic_save(Path(cfg.models_dir), vec, clf, classes, stats, cfg)
-    print(f"Model artifacts saved to {cfg.models_dir}")
+    version = atomic_save(Path(cfg.models_dir), vec, clf, calibration_map, classes, stats, cfg)
+    state = "active" if cfg.activate else "inactive"
+    print(f"Model artifacts saved to {cfg.models_dir}/{version} ({state})")
     return 0
 
 
@@ -0,0 +1,35 @@
+import json
+import shutil
+
+from app.core.settings import settings
+from app.services import retrieval_bm25
+
+
+def test_bm25_index_persisted_and_invalidated(tmp_path, monkeypatch):
+    taxo = tmp_path / "taxonomy.json"
+    shutil.copy("data/taxonomy.json", taxo)
+    monkeypatch.setattr(settings, "bm25_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "bm25_cache", True)
+    lang = "zz"  # idioma propio: no interfiere con los índices de otros tests
+    try:
+        retrieval_bm25.build_or_get(lang, taxonomy_path=str(taxo))
+        path = retrieval_bm25.cache_path(lang, str(taxo))
+        assert path.exists()
+        built = retrieval_bm25.topk_batch(["telefono movil", "zapatos"], lang=lang, k=5)
+
+        # Segundo arranque: se carga del disco sin tokenizar
+        retrieval_bm25.reset(lang)
+        monkeypatch.setattr(retrieval_bm25, "_doc_fields", lambda *a: 1 / 0)
+        retrieval_bm25.build_or_get(lang, taxonomy_path=str(taxo))
+        assert retrieval_bm25.topk_batch(["telefono movil", "zapatos"], lang=lang, k=5) == built
+        monkeypatch.undo()
+        monkeypatch.setattr(settings, "bm25_cache_dir", str(tmp_path / "cache"))
+
+        # Taxonomía modificada -> clave distinta -> se reconstruye
+        rows = json.loads(taxo.read_text(encoding="utf-8"))[:10]
+        taxo.write_text(json.dumps(rows), encoding="utf-8")
+        retrieval_bm25.reset(lang)
+        retrieval_bm25.build_or_get(lang, taxonomy_path=str(taxo))
+        assert len(retrieval_bm25.index_ids(lang)) == 10
+    finally:
+        retrieval_bm25.reset(lang)
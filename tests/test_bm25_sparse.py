@@ -0,0 +1,62 @@
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from app.services import retrieval_bm25
+
+
+def test_sparse_bm25_matches_rank_bm25():
+    rng = np.random.default_rng(0)
+    # "w0" aparece en casi todos los documentos: idf negativo -> suelo epsilon
+    docs = [["w0"] + [f"w{w}" for w in rng.zipf(1.5, size=rng.integers(1, 12)) % 40]
+            for _ in range(300)]
+    docs.append([""])
+    ref = BM25Okapi(docs)
+    eng = retrieval_bm25.SparseBM25F([{"text": d} for d in docs], {"text": 1.0})
+    for q in (["w0"], ["w1", "w2", "w1"], ["w3", "nope"], [], [""]):
+        assert np.allclose(ref.get_scores(q), eng.get_scores(q), rtol=1e-6, atol=1e-9)
+
+
+def test_topk_batch_matches_topk():
+    retrieval_bm25.build_or_get("es", taxonomy_path="data/taxonomy.json")
+    qs = ["telefono movil", "zapatillas running", "xyz"]
+    assert retrieval_bm25.topk_batch(qs, lang="es", k=5) == [
+        retrieval_bm25.topk(q, lang="es", k=5) for q in qs
+    ]
+
+
+def test_bm25f_single_field_is_okapi_and_weights_apply_without_rebuild():
+    rng = np.random.default_rng(1)
+    docs = [[f"w{w}" for w in rng.zipf(1.5, size=rng.integers(1, 12)) % 40] for _ in range(200)]
+    ref = BM25Okapi(docs)
+    single = retrieval_bm25.SparseBM25F([{"pref": d} for d in docs], {"pref": 1.0})
+    for q in (["w1", "w2", "w1"], ["w0"], ["nope"]):
+        assert np.allclose(single.get_scores(q), ref.get_scores(q), rtol=1e-6, atol=1e-9)
+
+    fields = [{"pref": d[:2], "alt": d[2:]} for d in docs]
+    idx = retrieval_bm25.SparseBM25F(fields, {"pref": 2.0, "alt": 1.0})
+    idx.set_field_weights({"pref": 0.5, "alt": 3.0})
+    rebuilt = retrieval_bm25.SparseBM25F(fields, {"pref": 0.5, "alt": 3.0})
+    assert np.allclose(idx.get_scores(["w1", "w3"]), rebuilt.get_scores(["w1", "w3"]))
+    back = retrieval_bm25.SparseBM25F.from_arrays(idx.to_arrays())
+    assert np.allclose(back.get_scores(["w1", "w3"]), rebuilt.get_scores(["w1", "w3"]))
+
+
+def test_bm25f_matches_formula_across_fields():
+    # "a" en varios campos del mismo doc (máscara de campos) y un tf > 255 (tf uint16)
+    docs = [{"pref": ["a", "b"], "alt": ["a"] * 300, "path": ["c", "a"]},
+            {"alt": ["b", "c"]}, {"pref": ["c"], "path": ["a", "a", "b"]}]
+    weights = {"pref": 2.0, "alt": 1.5, "path": 0.5}
+    idx = retrieval_bm25.SparseBM25F(docs, weights)
+    k1, b = idx.k1, idx.b
+    avg = {f: np.mean([len(d.get(f, [])) for d in docs]) for f in weights}
+    df = [sum(any(t in toks for toks in d.values()) for d in docs) for t in idx.vocab]
+    assert np.allclose(idx.idf, retrieval_bm25._okapi_idf(np.array(df), len(docs), 0.25))
+    for term in ("a", "b", "c"):
+        idf = idx.idf[idx.vocab[term]]
+        expected = []
+        for d in docs:
+            tf = sum(w * d.get(f, []).count(term) / (1 - b + b * len(d.get(f, [])) / avg[f])
+                     for f, w in weights.items())
+            expected.append(idf * tf * (k1 + 1) / (tf + k1))
+        assert np.allclose(idx.get_scores([term]), expected, rtol=1e-6)
+    assert idx.tf.dtype == np.uint16 and idx.gmask.dtype == np.uint8
@@ -0,0 +1,54 @@
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from app.services.calibration import CalibrationMap
+from app.services.classifier import _ClassifierState
+
+TEXTS = [
+    "iphone 13 128gb", "smartphone barato", "movil libre", "auriculares bluetooth",
+    "airpods pro", "cascos inalambricos", "chocolate negro", "bombones surtidos",
+    "cacao puro", "tablet samsung", "ipad air", "tableta android",
+]
+LABELS = ["tel"] * 3 + ["aud"] * 3 + ["cho"] * 3 + ["tab"] * 3
+QUERIES = ["auriculares samsung", "chocolate negro", "tablet barata", "zzz", ""]
+
+
+def _calibrated_state(method: str, texts=TEXTS, labels=LABELS):
+    vec = TfidfVectorizer().fit(texts)
+    x = vec.transform(texts)
+    calib = CalibratedClassifierCV(
+        LogisticRegression(max_iter=500), method=method, cv=3, ensemble=False
+    ).fit(x, labels)
+    st = _ClassifierState()
+    st.tfidf = vec
+    st.model = calib.calibrated_classifiers_[0].estimator
+    st.calibration = CalibrationMap.from_dict(CalibrationMap.from_calibrated(calib).to_dict())
+    st.calibrated = True
+    st.classes = [str(c) for c in calib.classes_]
+    st._compile_linear()
+    return st, calib
+
+
+def test_calibration_map_matches_calibrated_classifier():
+    for method in ("sigmoid", "isotonic"):
+        st, calib = _calibrated_state(method)
+        assert st.features is not None and st.supports_candidates()
+        expected = calib.predict_proba(st.tfidf.transform(QUERIES))
+        assert np.abs(st.scores_batch(QUERIES) - expected).max() < 1e-6
+        st.features = None  # ruta sklearn: decision_function + mapa
+        assert np.abs(st.scores_batch(QUERIES) - expected).max() < 1e-6
+
+
+def test_calibrated_candidates_match_full_scores():
+    st, _ = _calibrated_state("sigmoid")
+    full = st.scores("auriculares samsung")
+    ids, sc = st.scores_for_batch(["auriculares samsung"], [["tab", "aud"]])[0]
+    assert np.allclose(sc, full[[st.classes.index(c) for c in ids]], atol=1e-5)
+
+
+def test_calibration_map_binary():
+    st, calib = _calibrated_state("isotonic", TEXTS[:6], LABELS[:6])
+    expected = calib.predict_proba(st.tfidf.transform(QUERIES))
+    assert np.abs(st.scores_batch(QUERIES) - expected).max() < 1e-6
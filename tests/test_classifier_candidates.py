@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from app.services.classifier import _ClassifierState
+
+TEXTS = [
+    "iphone 13 128gb", "smartphone barato", "auriculares bluetooth", "airpods pro",
+    "chocolate negro", "bombones surtidos", "tablet samsung", "ipad air",
+]
+LABELS = ["tel", "tel", "aud", "aud", "cho", "cho", "tab", "tab"]
+
+
+def _state(texts=TEXTS, labels=LABELS) -> _ClassifierState:
+    st = _ClassifierState()
+    st.tfidf = TfidfVectorizer().fit(texts)
+    st.model = LogisticRegression(max_iter=500).fit(st.tfidf.transform(texts), labels)
+    st.classes = [str(c) for c in st.model.classes_]
+    st._compile_linear()
+    return st
+
+
+def test_candidate_scores_match_predict_proba():
+    st = _state()
+    assert st.supports_candidates()
+    full = st.scores("auriculares samsung")
+    cands = ["tab", "aud", "zzz_unknown"]
+    ids, sc = st.scores_for_batch(["auriculares samsung"], [cands])[0]
+    assert ids == ["tab", "aud"]
+    # Mismo denominador que predict_proba: sin renormalizar sobre los candidatos
+    assert np.allclose(sc, full[[st.classes.index(c) for c in ids]], atol=1e-5)
+    assert sc.sum() < 1.0
+
+
+def test_candidate_scores_binary_model():
+    st = _state(TEXTS[:4], LABELS[:4])
+    full = st.scores("airpods")
+    ids, sc = st.scores_for_batch(["airpods"], [["tel", "aud"]])[0]
+    assert np.allclose(sc, full[[st.classes.index(c) for c in ids]], atol=1e-5)
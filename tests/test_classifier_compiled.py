@@ -0,0 +1,56 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import FeatureUnion
+
+from app.services.classifier import _ClassifierState
+
+TEXTS = [
+    "iphone 13 128gb", "smartphone barato", "auriculares bluetooth", "airpods pro",
+    "chocolate negro", "bombones surtidos", "tablet samsung", "ipad air",
+]
+LABELS = ["tel", "tel", "aud", "aud", "cho", "cho", "tab", "tab"]
+QUERIES = [
+    "auriculares samsung", "Chocolate NEGRO negro 70%", "tablet", "zzz sin vocabulario", "",
+    "smartphone samsung barato con auriculares bluetooth",
+]
+
+
+def _state(vectorizer, model, texts=TEXTS, labels=LABELS) -> _ClassifierState:
+    st = _ClassifierState()
+    st.tfidf = vectorizer.fit(texts)
+    st.model = model.fit(st.tfidf.transform(texts), labels)
+    st.classes = [str(c) for c in st.model.classes_]
+    st._compile_linear()
+    return st
+
+
+def _assert_matches_sklearn(st: _ClassifierState) -> None:
+    assert st.features is not None
+    expected = st.model.predict_proba(st.tfidf.transform(QUERIES))
+    assert np.abs(st.scores_batch(QUERIES) - expected).max() < 1e-6
+    x = st.tfidf.transform(QUERIES).toarray()
+    for r, q in enumerate(QUERIES):
+        feats, vals = st.features.transform(q)
+        dense = np.zeros(x.shape[1])
+        dense[feats] = vals
+        assert np.abs(dense - x[r]).max() < 1e-12
+
+
+def test_compiled_word_tfidf_matches_predict_proba():
+    vec = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+    _assert_matches_sklearn(_state(vec, LogisticRegression(max_iter=500)))
+
+
+def test_compiled_feature_union_char_ngrams():
+    # Vectorizador de scripts/retrain_classifier.py --char-ngrams
+    vec = FeatureUnion([
+        ("w", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+        ("c", TfidfVectorizer(analyzer="char", ngram_range=(3, 5), sublinear_tf=True)),
+    ])
+    _assert_matches_sklearn(_state(vec, LogisticRegression(max_iter=500)))
+
+
+def test_compiled_binary_model():
+    st = _state(TfidfVectorizer(), LogisticRegression(max_iter=500), TEXTS[:4], LABELS[:4])
+    _assert_matches_sklearn(st)
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import result_cache
+
+client = TestClient(app)
+
+
+def test_batch_matches_single_classify(monkeypatch):
+    monkeypatch.setattr(result_cache._state.cache, "max_size", 0)  # /classify sin caché
+    queries = ["tablet samsung", "chocolates", "iphone 13 128gb"]
+    r = client.post("/classify/batch", json={"queries": queries, "lang": "es", "top_k": 3})
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert len(results) == len(queries)
+    for q, item in zip(queries, results, strict=True):
+        single = client.post("/classify", json={"query": q, "lang": "es", "top_k": 3}).json()
+        assert item["abstained"] == single["abstained"]
+        assert (item["prediction"] or {}).get("id") == (single["prediction"] or {}).get("id")
+        assert [a["id"] for a in item["alternatives"]] == [
+            a["id"] for a in single["alternatives"]
+        ]
+
+
+def test_batch_rejects_empty_query():
+    r = client.post("/classify/batch", json={"queries": ["ok", "  "], "lang": "es"})
+    assert r.status_code == 400
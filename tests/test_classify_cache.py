@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import result_cache
+
+client = TestClient(app)
+
+
+def test_cache_hit_and_admin_reload_invalidation(monkeypatch):
+    payload = {"query": "Chocolates ", "lang": "es", "top_k": 3}
+    first = client.post("/classify", json=payload)
+    assert first.status_code == 200, first.text
+    gen = result_cache.generation()
+    calls = []
+    from app.services import retrieval_bm25
+    orig = retrieval_bm25.topk
+    monkeypatch.setattr(
+        retrieval_bm25, "topk", lambda q, **kw: calls.append(q) or orig(q, **kw)
+    )
+    # Misma query normalizada -> servida desde caché (sin recomputar señales)
+    again = client.post("/classify", json={**payload, "query": "chocolate"})
+    assert again.status_code == 200
+    assert again.json()["prediction"] == first.json()["prediction"]
+    assert calls == []
+    r = client.post("/admin/reload")
+    assert r.status_code == 200
+    assert result_cache.generation() == gen + 1
+    after = client.post("/classify", json=payload)
+    assert after.status_code == 200, after.text
+    assert len(calls) == 1
+
+
+def test_cache_key_resolves_default_top_k(monkeypatch):
+    payload = {"query": "galletas con chocolate", "lang": "es"}
+    first = client.post("/classify", json={**payload, "top_k": None})
+    assert first.status_code == 200, first.text
+    from app.services import retrieval_bm25
+    calls = []
+    orig = retrieval_bm25.topk
+    monkeypatch.setattr(
+        retrieval_bm25, "topk", lambda q, **kw: calls.append(q) or orig(q, **kw)
+    )
+    again = client.post("/classify", json={**payload, "top_k": 5})
+    assert again.status_code == 200
+    assert calls == []  # None y el default resuelto comparten entrada
+
+
+def test_cache_hit_skips_stages(monkeypatch):
+    from app.routers import classify
+
+    payload = {"query": "auriculares inalambricos", "lang": "es", "top_k": 2}
+    assert client.post("/classify", json=payload).status_code == 200
+    calls = []
+    orig = classify._run_stages
+    monkeypatch.setattr(classify, "_run_stages", lambda st: calls.append(st) or orig(st))
+    assert client.post("/classify", json=payload).status_code == 200
+    assert calls == []
+
+def test_ttl_cache_lru_eviction():
+    cache = result_cache.TTLCache(max_size=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" pasa a ser el más reciente
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    expired = result_cache.TTLCache(max_size=2, ttl_s=-1)
+    expired.put("x", 1)
+    assert expired.get("x") is None
@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from app.core.settings import settings
+from app.main import app
+from app.routers import classify
+from app.services import result_cache
+
+client = TestClient(app)
+
+
+def test_parallel_stages_match_sequential(monkeypatch):
+    payload = {"query": "tablet samsung", "lang": "es", "top_k": 3}
+    # sin caché de resultados: la segunda llamada debe recorrer las etapas en paralelo
+    monkeypatch.setattr(result_cache._state.cache, "max_size", 0)
+    modes = []
+    orig = classify._run_stages
+    monkeypatch.setattr(
+        classify, "_run_stages",
+        lambda stages: modes.append(settings.classify_parallel) or orig(stages),
+    )
+    monkeypatch.setattr(settings, "classify_parallel", False)
+    seq = client.post("/classify", json=payload)
+    monkeypatch.setattr(settings, "classify_parallel", True)
+    par = client.post("/classify", json=payload)
+    assert seq.status_code == par.status_code == 200, par.text
+    assert False in modes and True in modes
+    s, p = seq.json(), par.json()
+    assert s["abstained"] == p["abstained"]
+    assert (s["prediction"] or {}).get("id") == (p["prediction"] or {}).get("id")
+    assert [a["id"] for a in s["alternatives"]] == [a["id"] for a in p["alternatives"]]
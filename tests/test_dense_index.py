@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+from app.services import dense_index
+
+
+def test_flat_faiss_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(1)
+    embs = rng.normal(size=(300, 32)).astype(np.float32)
+    emb_path = tmp_path / "class_embeddings_es.npy"
+    np.save(emb_path, embs)
+    # Sin índice persistido (o sin faiss) se cae a fuerza bruta
+    fallback = dense_index.open_index(embs, str(emb_path), "flat")
+    assert fallback.kind == "brute" or not dense_index.faiss_available()
+    if not dense_index.faiss_available():
+        return
+    dense_index.write_faiss(
+        dense_index.build_faiss(embs, "flat"), dense_index.faiss_path(emb_path, "flat")
+    )
+    flat = dense_index.open_index(embs, str(emb_path), "flat")
+    assert flat.kind == "flat"
+    q = rng.normal(size=(4, 32)).astype(np.float32)
+    s_b, i_b = dense_index.BruteForceIndex(embs).search(q, 10)
+    s_f, i_f = flat.search(q, 10)
+    assert (i_b == i_f).all()
+    assert np.allclose(s_b, s_f, atol=1e-4)
+    # Embeddings regenerados (mismas filas, otro encoder): el índice faiss queda obsoleto
+    np.save(emb_path, embs[::-1])
+    stamp = os.stat(emb_path).st_mtime + 10
+    os.utime(emb_path, (stamp, stamp))
+    assert dense_index.open_index(embs[::-1], str(emb_path), "flat").kind == "brute"
+
+
+def test_quantized_brute_force_close_to_float32():
+    rng = np.random.default_rng(2)
+    embs = rng.normal(size=(500, 64)).astype(np.float64)  # artefactos antiguos float64
+    q = rng.normal(size=(3, 64)).astype(np.float32)
+    ref = dense_index.BruteForceIndex(embs)
+    assert ref.matrix.dtype == np.float32
+    s_ref, i_ref = ref.search(q, 10)
+    assert (np.diff(s_ref, axis=1) <= 0).all()
+    for dtype, tol in (("float16", 1e-3), ("int8", 2e-2)):
+        idx = dense_index.BruteForceIndex(embs, dtype=dtype)
+        assert idx.nbytes < ref.nbytes
+        s, i = idx.search(q, 10)
+        assert np.abs(s[:, 0] - s_ref[:, 0]).max() < tol
+        assert (i[:, 0] == i_ref[:, 0]).all()
+
+
+def test_mmap_format_matches_legacy_load(tmp_path):
+    from app.services import retrieval
+
+    rng = np.random.default_rng(3)
+    embs = rng.normal(size=(200, 16)).astype(np.float32)
+    ids = [f"C{i:03d}-ñ" for i in range(200)]
+    emb_path, ids_path = tmp_path / "class_embeddings_es.npy", tmp_path / "class_ids.npy"
+    np.save(emb_path, embs)
+    np.save(ids_path, np.array(ids, dtype=object))
+    q = rng.normal(size=(16,)).astype(np.float32)
+    try:
+        retrieval.load_index(str(emb_path), str(ids_path), backend="brute")
+        legacy = retrieval.topk(q, k=5)
+        dense_index.write_normalized(embs, emb_path)
+        dense_index.write_string_table(ids, ids_path)
+        table = dense_index.open_string_table(ids_path)
+        assert list(table) == ids and table[-1] == ids[-1] and table[1:3] == ids[1:3]
+        retrieval.load_index(str(emb_path), str(ids_path), backend="brute")
+        assert isinstance(retrieval.index_ids(), dense_index.StringTable)
+        assert isinstance(retrieval._state.indexes["es"].index.matrix.base, np.memmap)
+        mapped = retrieval.topk(q, k=5)
+        assert [c for c, _ in mapped] == [c for c, _ in legacy]
+        assert np.allclose([s for _, s in mapped], [s for _, s in legacy], atol=1e-6)
+        # class_ids.npy regenerado (mismo número de ids, otro orden): la tabla queda obsoleta
+        np.save(ids_path, np.array(ids[::-1], dtype=object))
+        stamp = os.stat(ids_path).st_mtime + 10
+        os.utime(ids_path, (stamp, stamp))
+        assert dense_index.open_string_table(ids_path) is None
+        retrieval.load_index(str(emb_path), str(ids_path), backend="brute")
+        assert list(retrieval.index_ids()) == ids[::-1]
+    finally:
+        retrieval.reset_index()
@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+from app.core.settings import settings
+from app.services import embedding_cache, embeddings
+from app.services.taxonomy_store import TaxonomyStore
+
+
+class _FakeModel:
+    """Sustituto de SentenceTransformer: vector determinista por texto."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def encode(self, texts, normalize_embeddings=True, batch_size=32):
+        self.calls.append(list(texts))
+        out = np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+def test_embedding_cache_roundtrip(tmp_path):
+    model = _FakeModel()
+    path = embedding_cache.cache_path("org/model v1", tmp_path)
+    assert path.name == "embeddings_org_model_v1.npz"
+    cache = embedding_cache.EmbeddingCache(path)
+    texts = ["hola", "adiós", "hola", ""]
+    first = cache.embed(texts, model.encode)
+    assert model.calls == [["hola", "adiós", ""]]
+    assert np.array_equal(first, model.encode(texts))
+
+    again = embedding_cache.EmbeddingCache(path)  # otro proceso: se lee del disco
+    model.calls.clear()
+    assert np.array_equal(again.embed(["adiós", "nuevo", "hola"], model.encode)[[0, 2]],
+                          first[[1, 0]])
+    assert model.calls == [["nuevo"]]
+    assert len(embedding_cache.EmbeddingCache(path)) == 4
+
+
+def test_embedding_cache_dim_change_reencodes_hits(tmp_path):
+    path = tmp_path / "embeddings_m.npz"
+    embedding_cache.EmbeddingCache(path).embed(["hola", "adiós"], _FakeModel().encode)
+
+    class _Wider(_FakeModel):
+        def encode(self, texts, normalize_embeddings=True, batch_size=32):
+            out = super().encode(texts)
+            return np.hstack([out, out])
+
+    model = _Wider()
+    cache = embedding_cache.EmbeddingCache(path)
+    # "hola" era un acierto y "nuevo" un fallo: tras el cambio de dim se recodifican ambos
+    got = cache.embed(["hola", "nuevo", "hola"], model.encode)
+    assert got.shape == (3, 6)
+    assert np.array_equal(got, model.encode(["hola", "nuevo", "hola"]))
+    assert sorted(t for call in model.calls[:2] for t in call) == ["hola", "nuevo"]
+    assert len(embedding_cache.EmbeddingCache(path)) == 2
+
+def test_taxonomy_load_batches_and_reuses_disk_cache(tmp_path, monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr(settings, "taxo_w_vec", 5.0)
+    monkeypatch.setattr(settings, "embeddings_backend", "st")
+    monkeypatch.setattr(settings, "embeddings_cache", True)
+    monkeypatch.setattr(settings, "embeddings_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(embeddings._state, "model", model)
+    embedding_cache.reset()
+    rows = [
+        {"id": "1", "prefLabel": {"es": "Chocolate", "en": "Chocolate"},
+         "altLabel": {"es": ["Cacao"], "en": ["Cocoa"]}},
+        {"id": "2", "prefLabel": {"es": "Galletas", "en": "Cookies"}},
+    ]
+    (tmp_path / "taxonomy.json").write_text(json.dumps(rows), encoding="utf-8")
+    try:
+        store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+        store.load()
+        # Una sola llamada con las etiquetas distintas de todos los idiomas
+        assert len(model.calls) == 1
+        assert sorted(model.calls[0]) == ["Cacao", "Chocolate", "Cocoa", "Cookies", "Galletas"]
+        mats = {lang: mat.copy() for lang, mat in store._emb_lang_mats.items()}
+
+        # Reinicio: la caché en disco evita volver a codificar
+        embedding_cache.reset()
+        model.calls.clear()
+        store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+        store.load()
+        assert model.calls == []
+        for lang, mat in mats.items():
+            assert np.array_equal(store._emb_lang_mats[lang], mat)
+        assert [c.id for c in store.search("chocolate", "es")] == ["1"]
+    finally:
+        embedding_cache.reset()
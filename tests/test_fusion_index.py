@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.services.fusion import FusionIndex, combine_triple
+
+
+def test_fusion_index_matches_combine_triple_topk():
+    rng = np.random.default_rng(0)
+    classes = [f"c{i}" for i in range(50)]
+    valid = set(classes[:45])  # c45..c49: clases históricas fuera de la taxonomía
+    sem = [(f"c{i}", float(rng.random())) for i in rng.choice(60, 10, replace=False)]
+    bm25 = [(f"c{i}", float(rng.random())) for i in rng.choice(50, 10, replace=False)]
+    cls = rng.random(50).astype("float32")
+    cls[3] = np.nan
+    weights = dict(w_sem=0.5, w_bm25=0.3, w_clf=0.2)
+
+    ref = combine_triple(sem, bm25, cls, classes, **weights)
+    ref = [(cid, sc) for cid, sc in ref if cid in valid][:6]
+    idx = FusionIndex.build(classes, [cid for cid, _ in sem], valid=valid)
+    got = idx.combine(sem, bm25, cls, classes, **weights, k=6)
+    assert [cid for cid, _ in got] == [cid for cid, _ in ref]
+    assert np.allclose([sc for _, sc in got], [sc for _, sc in ref])
+
+
+def test_fusion_index_per_request_class_lists_do_not_share_state():
+    classes = [f"c{i}" for i in range(10)]
+    idx = FusionIndex.build(valid=set(classes), classes=classes)
+    weights = dict(w_sem=1e-9, w_bm25=1e-9, w_clf=1.0)
+    full = np.arange(10, dtype="float32")
+    # Candidatas por request (CLF_CANDIDATE_SCORING): cada lista se mapea por separado
+    for cand, best in ((["c2", "c7"], "c7"), (["c7", "c2"], "c7"), (classes, "c9")):
+        vec = full[[int(c[1:]) for c in cand]]
+        got = idx.combine([], [], vec, cand, **weights, k=1)
+        assert got[0][0] == best
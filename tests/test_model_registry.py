@@ -0,0 +1,81 @@
+import time
+
+import joblib
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from app.core.settings import settings
+from app.main import app
+from app.services import classifier, model_registry
+
+TEXTS = ["iphone 13", "smartphone barato", "auriculares bluetooth", "airpods pro",
+         "chocolate negro", "bombones surtidos"]
+
+
+def _artifacts(path, labels):
+    path.mkdir()
+    vec = TfidfVectorizer().fit(TEXTS)
+    model = LogisticRegression(max_iter=500).fit(vec.transform(TEXTS), labels)
+    joblib.dump(vec, path / "tfidf.joblib")
+    joblib.dump(model, path / "lr.joblib")
+    joblib.dump([str(c) for c in model.classes_], path / "classes.joblib")
+    return path
+
+
+def test_publish_verify_and_current_pointer(tmp_path):
+    root = tmp_path / "models"
+    src = _artifacts(tmp_path / "out", ["tel", "tel", "aud", "aud", "cho", "cho"])
+    v1 = model_registry.publish(root, src, version="v1")
+    v2 = model_registry.publish(root, src, version="v1", activate=False)
+    assert (v1, v2) == ("v1", "v1-2")
+    assert model_registry.list_versions(root) == ["v1", "v1-2"]
+    assert model_registry.resolve(root) == root / "v1"
+    manifest = model_registry.verify(root / "v1")
+    assert set(manifest["files"]) == {"tfidf.joblib", "lr.joblib", "classes.joblib"}
+
+    (root / "v1-2" / "classes.joblib").write_bytes(b"corrupt")
+    try:
+        model_registry.verify(root / "v1-2")
+        raise AssertionError("checksum mismatch not detected")
+    except ValueError as e:
+        assert "classes.joblib" in str(e)
+    try:
+        model_registry.set_current(root, "../out")
+        raise AssertionError("unknown version accepted")
+    except ValueError:
+        pass
+
+
+def test_hot_swap_keeps_snapshot_and_admin_activate(tmp_path, monkeypatch):
+    # El estado global del clasificador se restaura al terminar
+    monkeypatch.setattr(classifier, "_state", classifier._state)
+    monkeypatch.setattr(classifier, "_generation", classifier._generation)
+    root = tmp_path / "models"
+    model_registry.publish(root, _artifacts(tmp_path / "a", ["x", "x", "y", "y", "z", "z"]), "a")
+    model_registry.publish(
+        root, _artifacts(tmp_path / "b", ["p", "p", "q", "q", "q", "q"]), "b", activate=False
+    )
+    classifier.load(str(root))
+    old = classifier.snapshot()
+    gen = classifier.generation()
+    assert old.version == "a" and old.class_ids() == ["x", "y", "z"]
+
+    model_registry.set_current(root, "b")
+    classifier.load_async(str(root)).join()
+    assert classifier.generation() == gen + 1
+    assert classifier.snapshot().class_ids() == ["p", "q"]
+    # una request en curso sigue con su snapshot completo y coherente
+    assert old.scores("chocolate").shape == (3,)
+
+    monkeypatch.setattr(settings, "models_dir", str(root))
+    client = TestClient(app)
+    assert client.post("/admin/models/activate", params={"version": "nope"}).status_code == 404
+    r = client.post("/admin/models/activate", params={"version": "a"})
+    assert r.status_code == 200
+    deadline = time.time() + 10
+    while classifier.version() != "a" and time.time() < deadline:
+        time.sleep(0.01)
+    assert classifier.version() == "a"
+    listing = client.get("/admin/models").json()
+    assert listing["current"] == "a" and [v["version"] for v in listing["versions"]] == ["a", "b"]
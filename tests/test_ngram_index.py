@@ -0,0 +1,33 @@
+import random
+
+from app.services.ngram_index import NGramIndex
+from app.services.taxonomy_store import TaxonomyStore
+
+KEYS = ["chocolates y bombone", "chocolate negro", "cacao", "bombon", "", "te", "ñandu", "ab"]
+
+
+def test_find_matches_linear_scan():
+    index = NGramIndex(KEYS)
+    rng = random.Random(0)
+    queries = ["choc", "olate", "bombon", "cacao", "te", "a", "", "zzz", "ñan", "o n"]
+    queries += [k[i : i + rng.randint(1, 6)] for k in KEYS for i in range(len(k))]
+    for q in queries:
+        assert index.find(q) == [i for i, k in enumerate(KEYS) if q in k], q
+    # la query corta no filtra; un n-grama ausente descarta todo
+    assert index.candidates("te") is None
+    assert index.candidates("xyz").size == 0
+
+
+def test_store_search_same_with_and_without_index(monkeypatch):
+    from app.core.settings import settings
+
+    results = {}
+    for enabled in (False, True):
+        monkeypatch.setattr(settings, "taxo_ngram_index", enabled)
+        store = TaxonomyStore("data/taxonomy.json")
+        store.load()
+        assert bool(store._inv_grams) == enabled
+        results[enabled] = [
+            [c.id for c in store.search(q, "es")] for q in ("choco", "bebida", "de", "zzz")
+        ]
+    assert results[False] == results[True]
@@ -0,0 +1,75 @@
+import random
+
+from app.services.prefix_trie import PrefixTrie, WordPrefixIndex
+
+
+def _brute(keys, rank, prefix, limit):
+    ids = [i for i, k in enumerate(keys) if k.startswith(prefix)]
+    return sorted(ids, key=lambda i: rank[i])[:limit]
+
+
+def test_prefix_trie_matches_brute_force():
+    rng = random.Random(0)
+    keys = sorted("".join(rng.choice("abc ") for _ in range(rng.randint(1, 7))) for _ in range(400))
+    rank = [rng.randint(-50, 50) * 1000 + i for i in range(len(keys))]
+    trie = PrefixTrie(keys, rank, k=8)
+    prefixes = {k[:n] for k in keys for n in range(len(k) + 1)} | {"zz", "abcabcabc", "d"}
+    for prefix in prefixes:
+        for limit in (1, 5, 8, 20):
+            assert trie.top(prefix, limit) == _brute(keys, rank, prefix, limit), (prefix, limit)
+        lo, hi = trie.range(prefix)
+        assert list(range(lo, hi)) == [i for i, k in enumerate(keys) if k.startswith(prefix)]
+
+
+def test_prefix_trie_cursor_narrows_per_keystroke():
+    rng = random.Random(2)
+    keys = sorted("".join(rng.choice("abc") for _ in range(rng.randint(1, 8))) for _ in range(500))
+    rank = [rng.randint(-50, 50) * 1000 + i for i in range(len(keys))]
+    trie = PrefixTrie(keys, rank, k=8)
+    for key in rng.sample(keys, 60) + ["abcabcabcz"]:
+        cursor = None
+        for n in range(len(key) + 1):
+            prefix = key[:n]
+            cursor = trie.cursor(prefix, cursor)
+            assert cursor[:2] == trie.range(prefix)
+            for limit in (1, 8, 20):
+                expected = _brute(keys, rank, prefix, limit)
+                assert trie.top(prefix, limit, cursor) == expected, (prefix, limit)
+
+def test_word_prefix_index_matches_brute_force():
+    rng = random.Random(1)
+    texts = [
+        " ".join("".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+                 for _ in range(rng.randint(1, 4)))
+        for _ in range(300)
+    ]
+    rank = [rng.randint(-5, 5) * 1000 + i for i in range(len(texts))]
+    index = WordPrefixIndex(texts, rank, k=8)
+
+    def brute(tokens, limit, exclude):
+        hits = []
+        for i, text in enumerate(texts):
+            words = text.split()
+            if i in exclude or not all(any(w.startswith(t) for w in words) for t in tokens):
+                continue
+            pos = next(p for p, w in enumerate(words) if w.startswith(tokens[0]))
+            hits.append(((pos, len(text), rank[i]), i))
+        return [i for _, i in sorted(hits)][:limit]
+
+    queries = [["a"], ["ab"], ["cab"], ["b", "a"], ["ab", "c"], ["a", "b", "c"], ["d"], ["a", "d"]]
+    for tokens in queries:
+        for limit in (1, 5, 20, 400):
+            for exclude in (set(), set(range(0, 300, 3))):
+                assert index.search(tokens, limit, exclude) == brute(tokens, limit, exclude), (
+                    tokens, limit
+                )
+        assert index.matches(tokens).tolist() == brute(tokens, len(texts), set()), tokens
+    # narrow: filtrar las coincidencias de ["a", "b"] da las de queries que la extienden
+    prev = index.matches(["a", "b"])
+    assert len(prev) > 64  # camino de máscaras (además del de texto, más abajo)
+    for extra in (["bc"], ["b", "c"], ["bca"], ["bb", "ac"]):
+        expected = brute(["a"] + extra, len(texts), set())
+        assert index.narrow(prev, extra).tolist() == expected, extra
+        assert index.narrow(index.matches(["a"] + extra), ["bcab"]).tolist() == brute(
+            ["a", *extra, "bcab"], len(texts), set()
+        )
@@ -0,0 +1,66 @@
+import json
+import random
+import re
+import unicodedata
+from pathlib import Path
+
+from app.services import preprocessing
+from app.services.preprocessing import normalize
+
+_ws = re.compile(r"\s+")
+_non_alnum = re.compile(r"[^0-9a-záéíóúüñ ]", flags=re.IGNORECASE)
+
+
+def _reference(text, accents=True, singular=True):
+    # Implementación original (regex + generador NFKD) como oráculo
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _non_alnum.sub(" ", text)
+    text = _ws.sub(" ", text).strip()
+    if accents:
+        nk = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in nk if not unicodedata.combining(ch))
+    if singular:
+        text = " ".join(t[:-1] if len(t) > 4 and t.endswith("s") else t for t in text.split())
+    return text
+
+
+def _check(texts):
+    preprocessing._normalize.cache_clear()
+    for text in texts:
+        for accents in (True, False):
+            for singular in (True, False):
+                got = normalize(text, accents=accents, singular=singular)
+                assert got == _reference(text, accents, singular), (text, accents, singular)
+
+
+def test_normalize_identical_for_every_bmp_char():
+    chars = [chr(c) for c in range(0x10000) if not 0xD800 <= c <= 0xDFFF]
+    # Cada carácter aislado y entre letras (plural incluido)
+    _check([f"casas{ch}meses" for ch in chars[:0x3000]])
+    _check(chars)
+
+
+def test_normalize_identical_on_taxonomy_labels_and_noise():
+    p = Path("data/taxonomy.json")
+    texts = []
+    if p.exists():
+        for c in json.loads(p.read_text(encoding="utf-8")):
+            for field in ("prefLabel", "altLabel", "hiddenLabel"):
+                for v in (c.get(field) or {}).values():
+                    texts.extend(v if isinstance(v, list) else [v])
+    rng = random.Random(0)
+    pool = "aAáÁñÑüÜçÇİıſKﬁ½²  \t\n-_/.,'́  0123456789sS"
+    texts += ["".join(rng.choice(pool) for _ in range(rng.randint(0, 24))) for _ in range(3000)]
+    texts += ["", "   ", "Teléfonos Móviles", "ÁRBOLES  de\tNavidad", "İstanbul kebabs"]
+    _check(texts)
+    # Segunda pasada servida desde el memo
+    _check(texts)
+
+
+def test_long_texts_bypass_memo():
+    preprocessing._normalize.cache_clear()
+    long_text = "Zapatillas Running " * 100
+    assert normalize(long_text) == _reference(long_text, True, True)
+    assert preprocessing._normalize.cache_info().currsize == 0
+    normalize("Zapatillas Running")
+    assert preprocessing._normalize.cache_info().currsize == 1
@@ -0,0 +1,46 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.core.settings import settings
+from app.main import app
+from app.services import dense_index, retrieval
+
+
+def test_languages_stay_resident_and_score_own_vectors():
+    retrieval.reset_index()
+    for lang in ("es", "en"):
+        retrieval.load_lang(lang)
+    assert set(retrieval.loaded_langs()) == {"es", "en"}
+    q = retrieval.embed_query("telefono movil")
+    for lang in ("es", "en"):
+        embs = np.load(f"{settings.data_dir}/class_embeddings_{lang}.npy")
+        _, idx = dense_index.BruteForceIndex(embs).search(q, 5)
+        ids = retrieval.index_ids(lang)
+        assert [c for c, _ in retrieval.topk(q, k=5, lang=lang)] == [ids[int(i)] for i in idx[0]]
+    # Resetear un idioma no desaloja al otro
+    retrieval.reset_index("en")
+    assert retrieval.is_loaded("es") and not retrieval.is_loaded("en")
+
+
+def test_ready_reports_languages_after_mixed_traffic():
+    client = TestClient(app)
+    for lang in ("es", "en", "es"):
+        r = client.post("/classify", json={"query": "telefono movil", "lang": lang})
+        assert r.status_code in (200, 503)
+    assert retrieval.is_loaded("es") and retrieval.is_loaded("en")
+    body = client.get("/ready").text
+    assert "'langs'" in body and "'dense': True" in body
+
+
+def test_admin_reload_clears_language_flags():
+    from app.routers.ready import _LANG_FLAGS, _READY_FLAGS
+
+    client = TestClient(app)
+    for lang in ("es", "en"):
+        r = client.post("/classify", json={"query": "telefono movil", "lang": lang})
+        assert r.status_code in (200, 503)
+    assert client.post("/admin/reload", params={"lang": "en"}).status_code == 200
+    assert _LANG_FLAGS["en"] == {"dense": False, "bm25": False}
+    assert _LANG_FLAGS["es"]["bm25"] and _READY_FLAGS["bm25_loaded"]
+    assert client.post("/admin/reload").status_code == 200
+    assert not _READY_FLAGS["bm25_loaded"]
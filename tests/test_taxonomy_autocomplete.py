@@ -14,3 +14,111 @@ def test_autocomplete_choc_returns_chocolates():
     assert any("chocolates" in lbl for lbl in labels[:3]), (
         f"'chocolates' not in top suggestions: {labels}"
     )
+
+
+def test_autocomplete_ranks_by_feedback_popularity(tmp_path):
+    import json
+
+    from app.services.taxonomy_store import AutocompleteHit, TaxonomyStore
+
+    rows = [
+        {"id": "1", "prefLabel": {"es": "Chocolate", "en": "Chocolate"}},
+        {"id": "2", "prefLabel": {"es": "Chocolates y bombones", "en": "Sweets"},
+         "altLabel": {"es": ["Bombones"], "en": []}},
+        {"id": "3", "prefLabel": {"es": "Chocolatinas", "en": "Candy bars"}},
+    ]
+    (tmp_path / "taxonomy.json").write_text(json.dumps(rows), encoding="utf-8")
+    store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+    store.load()
+    assert [h.concept_id for h in store.autocomplete("choco", "es")] == ["1", "2", "3"]
+
+    feedback = tmp_path / "feedback"
+    feedback.mkdir()
+    lines = [{"query": "bombones", "predicted_id": "1", "correct_id": "2"}] * 2
+    lines += [{"query": "chocolatinas", "predicted_id": "3", "correct_id": None}]
+    (feedback / "2025-10-14.jsonl").write_text(
+        "\n".join(json.dumps(x) for x in lines), encoding="utf-8"
+    )
+    (feedback / "feedback_consolidated.jsonl").write_text(
+        "\n".join([json.dumps({"correct_id": "1"})] * 9),
+        encoding="utf-8",
+    )
+    store.load()
+    assert store.popularity == {"2": 2, "3": 1}
+    hits = store.autocomplete("choco", "es", limit=2)
+    assert hits == [
+        AutocompleteHit("2", "Chocolates y bombones", "pref", "chocolate y bombone"),
+        AutocompleteHit("3", "Chocolatinas", "pref", "chocolatina"),
+    ]
+
+
+def test_autocomplete_tie_break_matches_original_order(tmp_path):
+    import json
+
+    from app.services.taxonomy_store import TaxonomyStore
+
+    rows = [
+        {"id": "1", "prefLabel": {"es": "Accesorios"}},
+        {"id": "2", "prefLabel": {"es": "Accesorios de cocina"},
+         "altLabel": {"es": ["Accesorios"]}},
+    ]
+    (tmp_path / "taxonomy.json").write_text(json.dumps(rows), encoding="utf-8")
+    store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+    store.load()
+    # Misma clave: longitud de "kind|label", así que "alt|Accesorios" va antes
+    hits = store.autocomplete("acc", "es")
+    assert [(h.concept_id, h.kind) for h in hits] == [("2", "alt"), ("1", "pref"), ("2", "pref")]
+
+
+def test_autocomplete_matches_word_starts(tmp_path):
+    import json
+
+    from app.services.taxonomy_store import TaxonomyStore
+
+    rows = [
+        {"id": "1", "prefLabel": {"es": "Auriculares bluetooth"}},
+        {"id": "2", "prefLabel": {"es": "Bluetooth"}},
+        {"id": "3", "prefLabel": {"es": "Altavoces portátiles bluetooth"}},
+        {"id": "4", "prefLabel": {"es": "Auriculares con cable"}},
+    ]
+    (tmp_path / "taxonomy.json").write_text(json.dumps(rows), encoding="utf-8")
+    store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+    store.load()
+    # Primero el prefijo de la etiqueta completa; después por posición y longitud
+    assert [h.concept_id for h in store.autocomplete("blue", "es")] == ["2", "1", "3"]
+    assert [h.concept_id for h in store.autocomplete("auri blue", "es")] == ["1"]
+    assert [h.concept_id for h in store.autocomplete("cable", "es")] == ["4"]
+    assert [h.concept_id for h in store.autocomplete("blue", "es", limit=1)] == ["2"]
+
+
+def test_autocomplete_session_matches_plain_autocomplete():
+    import random
+
+    from app.core.settings import settings
+    from app.services.taxonomy_store import TaxonomyStore
+
+    store = TaxonomyStore(f"{settings.data_dir}/taxonomy.json")
+    store.load()
+    rng = random.Random(0)
+    labels = [h.label for h in store._ac_labels["es"]]
+    for _ in range(40):
+        text = rng.choice(labels)
+        if rng.random() < 0.5:  # empezar a mitad de etiqueta (inicios de palabra)
+            text = text[rng.randrange(len(text)):]
+        cursor = ""
+        for n in list(range(1, len(text) + 1)) + [len(text) - 2, len(text)]:
+            lang = "en" if rng.random() < 0.1 else "es"
+            hits, cursor = store.autocomplete_session(text[:n], lang, 10, cursor)
+            assert cursor
+            assert hits == store.autocomplete(text[:n], lang, 10), (text[:n], lang)
+
+
+def test_autocomplete_endpoint_returns_cursor():
+    r = client.get("/taxonomy/autocomplete", params={"q": "cho", "lang": "es", "cursor": ""})
+    cursor = r.json()["cursor"]
+    assert cursor
+    r = client.get("/taxonomy/autocomplete", params={"q": "choc", "lang": "es", "cursor": cursor})
+    plain = client.get("/taxonomy/autocomplete", params={"q": "choc", "lang": "es"}).json()
+    assert r.json()["results"] == plain["results"]
+    assert r.json()["cursor"] == cursor
+    assert plain["cursor"] is None
@@ -17,3 +17,41 @@ def test_fuzzy_typo_chocoolates():
     assert any("chocolates" in lbl for lbl in labels[:3]), (
         f"Fuzzy didn't surface chocolates: {labels}"
     )
+
+
+def test_fuzzy_fallback_batched_matches_loop(monkeypatch):
+    from rapidfuzz import fuzz
+
+    from app.services import preprocessing
+    from app.services.taxonomy_store import TaxonomyStore
+
+    store = TaxonomyStore("data/taxonomy.json")
+    store.load()
+    monkeypatch.setattr(settings, "taxo_fuzzy_min_overlap", 0.0)
+    for q in ("chocoolates", "bebidsa", "zapatoss", "xq"):
+        q_norm = preprocessing.normalize(q)
+        expected = {}
+        for cid, nf in store._norm["es"].items():
+            ratio = fuzz.partial_ratio(q_norm, nf.pref_any)
+            if ratio >= settings.taxo_fuzzy_min_ratio:
+                expected[cid] = ratio
+        assert store._fuzzy_fallback(q_norm, "es") == expected
+    # Con prefiltro de bigramas el typo sigue encontrando su concepto
+    monkeypatch.setattr(settings, "taxo_fuzzy_min_overlap", 0.2)
+    found = store._fuzzy_fallback(preprocessing.normalize("chocoolates"), "es")
+    assert any("chocolate" in store._norm["es"][cid].pref for cid in found)
+
+
+def test_fuzzy_does_not_rerank_exact_or_prefix_matches(monkeypatch):
+    from app.services.taxonomy_store import TaxonomyStore
+
+    store = TaxonomyStore("data/taxonomy.json")
+    store.load()
+    labels = sorted({nf.pref for nf in store._norm["es"].values() if len(nf.pref) > 6})[:40]
+    queries = labels + [lbl[:4] for lbl in labels]
+    monkeypatch.setattr(settings, "taxo_w_fuzzy", 0.0)
+    plain = [[c.id for c in store.search(q, "es", limit=10)] for q in queries]
+    monkeypatch.setattr(settings, "taxo_w_fuzzy", 10.0)
+    assert [[c.id for c in store.search(q, "es", limit=10)] for q in queries] == plain
+    # Sin coincidencias léxicas el fuzzy sigue siendo el fallback
+    assert store.search("chocoolates", "es", limit=5)
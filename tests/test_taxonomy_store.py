@@ -1,6 +1,7 @@
 from pathlib import Path
 import json
 
+from app.services import preprocessing
 from app.services.taxonomy_store import TaxonomyStore
 
 
@@ -24,3 +25,56 @@ def test_taxonomy_store_load_and_search():
     token = term.split()[0][:6]  # substring para búsqueda parcial
     res = store.search(token, "es")
     assert res, "Sin resultados para término derivado del primer concepto"
+
+
+def test_search_uses_precomputed_normalized_fields(monkeypatch):
+    store = TaxonomyStore("data/taxonomy.json")
+    store.load()
+    expected = [c.id for c in store.search("chocolate", "es")]
+    assert expected
+    calls = []
+    real = preprocessing.normalize
+
+    def counting(text, **kw):
+        calls.append(text)
+        return real(text, **kw)
+
+    monkeypatch.setattr(preprocessing, "normalize", counting)
+    # Solo la query se normaliza por petición; los campos vienen de load()
+    assert [c.id for c in store.search("chocolate", "es")] == expected
+    assert calls == ["chocolate"]
+
+
+def test_vector_similarity_uses_concept_row_ranges(tmp_path, monkeypatch):
+    import numpy as np
+
+    from app.core.settings import settings
+    from app.services.embeddings import embed_text
+
+    monkeypatch.setattr(settings, "taxo_w_vec", 5.0)
+    rows = [
+        {"id": "1", "prefLabel": {"es": "Chocolate"}, "altLabel": {"es": ["Cacao"]}},
+        {"id": "2", "prefLabel": {}, "altLabel": {"es": ["Bombones", "Trufas", "Pralinés"]}},
+        {"id": "3", "prefLabel": {"es": "Galletas"}},
+        {"id": "4", "prefLabel": {}},
+    ]
+    (tmp_path / "taxonomy.json").write_text(json.dumps(rows), encoding="utf-8")
+    store = TaxonomyStore(str(tmp_path / "taxonomy.json"))
+    store.load()
+    mat = store._emb_lang_mats["es"]
+    assert np.allclose(np.linalg.norm(mat, axis=1), 1.0, atol=1e-5)
+
+    def cos(a, b):
+        return float(a @ b / ((np.linalg.norm(a) + 1e-8) * (np.linalg.norm(b) + 1e-8)))
+
+    q = embed_text("chocolates")
+    # prefLabel si existe; si no, el máximo de sus altLabel; -1 sin filas
+    expected = [
+        cos(embed_text("Chocolate"), q),
+        max(cos(embed_text(t), q) for t in ("Bombones", "Trufas", "Pralinés")),
+        cos(embed_text("Galletas"), q),
+        -1.0,
+    ]
+    got = store._vec_sims(q / (np.linalg.norm(q) + 1e-8), "es", ["1", "2", "3", "4"])
+    assert np.allclose(got, expected, atol=1e-5)
+    assert store._vec_sims(q, "es", []).shape == (0,)